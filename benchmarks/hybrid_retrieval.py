@@ -0,0 +1,101 @@
+"""Recall and latency of dense-only versus hybrid (dense + BM25, fused with RRF) search.
+
+Builds a synthetic code corpus of functions with many similar identifiers,
+each calling a few others, and asks for each function two ways: by its exact
+identifier and by a description of what it does. The dense model is
+simulated by hashed character trigrams, which like a real embedding model
+blurs near-identical identifiers together.
+
+    python -m benchmarks.hybrid_retrieval --functions 2000 --queries 300
+"""
+import argparse
+import random
+import time
+import zlib
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from src.agent_project.infrastructure.databases.vector_database import \
+    QdrantVectorStore
+
+DIMENSION = 256
+VERBS = ["load", "save", "parse", "build", "fetch", "update", "delete", "render", "validate", "sync", "merge", "resolve"]
+NOUNS = ["user", "users", "config", "configs", "session", "token", "cache", "record", "records", "schema", "index", "report"]
+SUFFIXES = ["", "_v2", "_async", "_batch", "_safe", "_legacy", "_fast", "_from_disk"]
+DESCRIPTIONS = {
+    "load": "read", "save": "write", "parse": "decode", "build": "construct", "fetch": "download",
+    "update": "modify", "delete": "remove", "render": "draw", "validate": "check", "sync": "synchronize",
+    "merge": "combine", "resolve": "look up",
+}
+
+
+class TrigramEmbeddings(Embeddings):
+    """Normalized hashed character trigram counts, a stand-in for a dense model"""
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._vector(text)
+
+    def _vector(self, text: str) -> List[float]:
+        vector = np.zeros(DIMENSION, dtype=np.float32)
+        text = f"  {text.lower()} "
+        for i in range(len(text) - 2):
+            vector[zlib.crc32(text[i:i + 3].encode()) % DIMENSION] += 1
+        return (vector / (np.linalg.norm(vector) or 1)).tolist()
+
+
+def make_corpus(size: int, rng: random.Random):
+    names = [f"{verb}_{noun}_{other}{suffix}" for verb in VERBS for noun in NOUNS for other in NOUNS for suffix in SUFFIXES]
+    names = rng.sample(names, size)
+    chunks = []
+    for name in names:
+        verb, noun, other = name.split("_")[:3]
+        calls = "\n".join(f"    {callee}(item)" for callee in rng.sample(names, 2))
+        chunks.append(f'def {name}(item):\n    """{DESCRIPTIONS[verb].capitalize()} the {noun} {other}."""\n{calls}\n')
+    return names, chunks
+
+
+def recall_and_latency(store: QdrantVectorStore, queries, k: int):
+    found = 0
+    start = time.perf_counter()
+    for query, target in queries:
+        hits = store._search(query, k)
+        found += any(hit.payload["text"] == target for hit in hits)
+    elapsed = time.perf_counter() - start
+    return found / len(queries), elapsed / len(queries) * 1000
+
+
+def run(num_functions: int, num_queries: int, k: int, backend: str) -> None:
+    rng = random.Random(7)
+    names, chunks = make_corpus(num_functions, rng)
+    picked = rng.sample(range(num_functions), num_queries)
+    identifier_queries = [(names[i], chunks[i]) for i in picked]
+    description_queries = []
+    for i in picked:
+        verb, noun, other = names[i].split("_")[:3]
+        description_queries.append((f"function that {DESCRIPTIONS[verb]}s the {noun} {other}", chunks[i]))
+
+    print(f"{num_functions} functions, {num_queries} queries of each kind, recall@{k}, {backend} backend")
+    for hybrid in (False, True):
+        store = QdrantVectorStore(host="", api_key="", embeddings=TrigramEmbeddings(), backend=backend,
+                                  collection_name="bench", hybrid=hybrid, batch_size=256)
+        store.add_texts(chunks)
+        label = "hybrid (RRF)" if hybrid else "dense only  "
+        for kind, queries in (("identifier", identifier_queries), ("description", description_queries)):
+            recall, latency = recall_and_latency(store, queries, k)
+            print(f"  {label} {kind:<12} recall@{k} {recall:6.1%}  {latency:7.2f} ms/query")
+        store.client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--functions", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--backend", default="numpy", choices=["numpy", "memory"])
+    args = parser.parse_args()
+    run(args.functions, args.queries, args.k, args.backend)
@@ -0,0 +1,52 @@
+"""Throughput of PersistentShell output capture.
+
+Writes a large ASCII file, runs `cat` on it inside a persistent shell session
+and measures how fast its output comes through the reader thread.
+
+    python -m benchmarks.shell_throughput --size-mb 100
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from src.agent_project.core.tools.shell import PersistentShell
+
+
+def _make_file(path: str, size_mb: int) -> int:
+    line = ("x" * 79 + "\n").encode()
+    lines_per_mb = (1024 * 1024) // len(line)
+    block = line * lines_per_mb
+    with open(path, "wb") as f:
+        for _ in range(size_mb):
+            f.write(block)
+    return os.path.getsize(path)
+
+
+def run(size_mb: int) -> float:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "big.txt")
+        size = _make_file(path, size_mb)
+
+        shell = PersistentShell("/bin/sh")
+        shell.start_session()
+        try:
+            start = time.perf_counter()
+            shell._write_input(f'cat "{path}"\n')
+            received = 0
+            while received < size:
+                received += sum(len(chunk) for chunk in shell._drain_output(timeout=5))
+            elapsed = time.perf_counter() - start
+        finally:
+            shell.stop_session()
+
+    throughput = size / elapsed / (1024 * 1024)
+    print(f"cat {size_mb} MB: {elapsed:.2f}s, {throughput:.1f} MB/s")
+    return throughput
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=100)
+    args = parser.parse_args()
+    run(args.size_mb)
@@ -0,0 +1,162 @@
+"""Memory, latency and recall of the collection storage options.
+
+Fills one collection per configuration with the same clustered random
+vectors, roughly like embeddings of code chunks, and compares it against
+exact float32 search. Memory is how much the resident set of the process
+holding the vectors grew while the collection was filled and queried: the
+Qdrant server's, read from its /metrics endpoint, or this process's for the
+embedded backends. It is approximate, an allocator may keep memory a
+deleted collection freed. Quantization, on-disk originals and HNSW are
+only applied by a Qdrant server, the embedded backends search exactly and
+are measured as a float32 baseline:
+
+    python -m benchmarks.vector_quantization --backend remote --host http://localhost:6333
+    python -m benchmarks.vector_quantization --backend local --points 20000
+"""
+import argparse
+import gc
+import os
+import tempfile
+import time
+import urllib.request
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from qdrant_client.models import (CollectionStatus, PointStruct,
+                                  QuantizationSearchParams, SearchParams)
+
+from src.agent_project.infrastructure.databases.vector_database import (
+    QUANTIZATION_OVERSAMPLING, collection_options, create_vector_client)
+
+BATCH_SIZE = 5000
+CONFIGURATIONS: Dict[str, Dict] = {
+    "float32": {},
+    "float32, on disk": {"on_disk": True},
+    "int8": {"quantization": "int8", "rescore": False},
+    "int8 + rescore": {"quantization": "int8"},
+    "int8 + rescore, originals on disk": {"quantization": "int8", "on_disk": True},
+    "int8 + rescore, m=8": {"quantization": "int8", "on_disk": True, "hnsw_m": 8, "hnsw_ef": 64},
+    "int8 + rescore, m=32": {"quantization": "int8", "on_disk": True, "hnsw_m": 32, "hnsw_ef_construct": 200, "hnsw_ef": 128},
+}
+# seconds to wait for a server to finish indexing a collection
+INDEXING_TIMEOUT = 600
+
+
+def make_vectors(count: int, dimension: int, rng: np.random.Generator) -> np.ndarray:
+    centers = rng.normal(size=(max(count // 200, 1), dimension))
+    vectors = centers[rng.integers(len(centers), size=count)] + 0.5 * rng.normal(size=(count, dimension))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+
+def exact_neighbours(vectors: np.ndarray, queries: np.ndarray, k: int) -> List[set]:
+    scores = queries @ vectors.T
+    return [set(np.argpartition(-row, k)[:k].tolist()) for row in scores]
+
+
+def search_params(config: Dict) -> Optional[SearchParams]:
+    if not config.get("quantization") and not config.get("hnsw_ef"):
+        return None
+    quantization = None
+    if config.get("quantization"):
+        rescore = config.get("rescore", True)
+        quantization = QuantizationSearchParams(rescore=rescore, oversampling=QUANTIZATION_OVERSAMPLING if rescore else None)
+    return SearchParams(hnsw_ef=config.get("hnsw_ef"), quantization=quantization)
+
+
+def process_memory() -> Optional[int]:
+    """Resident set size of this process, None where /proc is missing"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return None
+
+
+def server_memory(host: str, api_key: str) -> Callable[[], Optional[int]]:
+    """Reads the resident set size a Qdrant server reports in its metrics"""
+    def read() -> Optional[int]:
+        request = urllib.request.Request(f"{host.rstrip('/')}/metrics", headers={"api-key": api_key} if api_key else {})
+        with urllib.request.urlopen(request) as response:
+            for line in response.read().decode().splitlines():
+                if line.startswith("memory_resident_bytes "):
+                    return int(float(line.split()[1]))
+        return None
+    return read
+
+
+def wait_until_indexed(client, name: str) -> None:
+    """Waits for a server's optimizers, the HNSW graph and quantized vectors are built in the background"""
+    if not hasattr(client, "get_collection"):
+        return
+    deadline = time.monotonic() + INDEXING_TIMEOUT
+    while client.get_collection(name).status != CollectionStatus.GREEN and time.monotonic() < deadline:
+        time.sleep(0.5)
+
+
+def measure(client, memory: Callable[[], Optional[int]], name: str, config: Dict, vectors: np.ndarray, queries: np.ndarray, truth: List[set], k: int) -> Dict:
+    options = collection_options(
+        vectors.shape[1],
+        quantization=config.get("quantization"),
+        on_disk=config.get("on_disk", False),
+        hnsw_m=config.get("hnsw_m"),
+        hnsw_ef_construct=config.get("hnsw_ef_construct"),
+    )
+    if client.collection_exists(name):
+        client.delete_collection(name)
+    gc.collect()
+    memory_before = memory()
+    client.create_collection(name, **options)
+    start = time.perf_counter()
+    for offset in range(0, len(vectors), BATCH_SIZE):
+        batch = vectors[offset:offset + BATCH_SIZE]
+        client.upsert(name, points=[PointStruct(id=offset + i, vector=vector.tolist()) for i, vector in enumerate(batch)])
+    wait_until_indexed(client, name)
+    load_time = time.perf_counter() - start
+
+    params = search_params(config)
+    found = 0
+    start = time.perf_counter()
+    for query, expected in zip(queries, truth):
+        hits = client.query_points(name, query=query.tolist(), limit=k, search_params=params).points
+        found += len(expected & {hit.id for hit in hits})
+    latency = (time.perf_counter() - start) / len(queries) * 1000
+    gc.collect()
+    memory_after = memory()
+    client.delete_collection(name)
+    grown = memory_after - memory_before if memory_before is not None and memory_after is not None else None
+    return {"memory": grown, "latency": latency, "recall": found / (len(queries) * k), "load": load_time}
+
+
+def run(num_points: int, dimension: int, num_queries: int, k: int, backend: str, host: str, api_key: str) -> None:
+    rng = np.random.default_rng(3)
+    vectors = make_vectors(num_points, dimension, rng)
+    queries = make_vectors(num_queries, dimension, rng)
+    truth = exact_neighbours(vectors, queries, k)
+
+    if backend == "remote":
+        configurations, memory = CONFIGURATIONS, server_memory(host, api_key)
+    else:
+        configurations, memory = {"float32": CONFIGURATIONS["float32"]}, process_memory
+    with tempfile.TemporaryDirectory() as path:
+        client = create_vector_client(backend=backend, host=host, api_key=api_key, path=path)
+        print(f"{num_points} vectors of {dimension} dimensions, {num_queries} queries, recall@{k}, {backend} backend\n")
+        print(f"{'configuration':36} {'RAM':>10} {'latency':>10} {'recall':>8} {'load':>8}")
+        for index, (label, config) in enumerate(configurations.items()):
+            result = measure(client, memory, f"benchmark_{index}", config, vectors, queries, truth, k)
+            used = f"{result['memory'] / 2**20:.1f} MiB" if result["memory"] is not None else "n/a"
+            print(f"{label:36} {used:>10} {result['latency']:>7.2f} ms {result['recall']:>7.1%} {result['load']:>6.1f} s")
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--points", type=int, default=100000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--backend", choices=["remote", "local", "numpy"], default="remote")
+    parser.add_argument("--host", default="http://localhost:6333")
+    parser.add_argument("--api-key", default="")
+    args = parser.parse_args()
+    run(args.points, args.dimension, args.queries, args.k, args.backend, args.host, args.api_key)
@@ -0,0 +1,105 @@
+"""Throughput of QdrantVectorStore.add_texts.
+
+Indexes synthetic code chunks into an in-memory Qdrant collection with an
+embedding model and a network that are simulated by fixed delays: a cost
+per embedding call, a smaller cost per text and a round trip per upsert.
+Compares the old one-embed_query-per-text loop with batched, pipelined
+embedding and upserts.
+
+    python -m benchmarks.vector_store_throughput --texts 2000 --batch-size 64
+"""
+import argparse
+import random
+import time
+from typing import List
+from uuid import uuid4
+
+from langchain_core.embeddings import Embeddings
+from qdrant_client import QdrantClient
+from qdrant_client.models import PointStruct
+
+from src.agent_project.infrastructure.databases import vector_database
+from src.agent_project.infrastructure.databases.vector_database import \
+    QdrantVectorStore
+
+DIMENSION = 384
+
+
+class SimulatedEmbeddings(Embeddings):
+    """Deterministic vectors with the latency profile of a local model"""
+
+    def __init__(self, call_overhead: float, per_text: float) -> None:
+        self.call_overhead = call_overhead
+        self.per_text = per_text
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(self.call_overhead + self.per_text * len(texts))
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def _vector(self, text: str) -> List[float]:
+        rng = random.Random(text)
+        return [rng.uniform(-1, 1) for _ in range(DIMENSION)]
+
+
+class SlowClient(QdrantClient):
+    """In-memory Qdrant with a network round trip added to every upsert"""
+
+    round_trip = 0.0
+
+    def upsert(self, *args, **kwargs):
+        time.sleep(self.round_trip)
+        return super().upsert(*args, **kwargs)
+
+
+def _corpus(size: int) -> List[str]:
+    return [f"def function_{i}(value):\n    return value * {i} + helper_{i % 97}(value)\n" for i in range(size)]
+
+
+def _make_store(embeddings: Embeddings, batch_size: int, round_trip: float) -> QdrantVectorStore:
+    SlowClient.round_trip = round_trip
+    vector_database.QdrantClient = lambda **kwargs: SlowClient(**kwargs)
+    return QdrantVectorStore(host="", api_key="", embeddings=embeddings, batch_size=batch_size, backend="memory")
+
+
+def _add_texts_unbatched(store: QdrantVectorStore, texts: List[str]) -> None:
+    """The previous implementation, kept as the baseline"""
+    encoded = [(text, store.embeddings.embed_query(text)) for text in texts]
+    store._ensure_collection(DIMENSION)
+    store.client.upsert(
+        collection_name=store.collection_name,
+        points=[PointStruct(id=str(uuid4()), vector=embedding, payload={"text": text}) for text, embedding in encoded],
+    )
+
+
+def run(num_texts: int, batch_size: int, call_overhead: float, per_text: float, round_trip: float) -> None:
+    texts = _corpus(num_texts)
+    embeddings = SimulatedEmbeddings(call_overhead, per_text)
+
+    store = _make_store(embeddings, batch_size, round_trip)
+    start = time.perf_counter()
+    _add_texts_unbatched(store, texts)
+    baseline = num_texts / (time.perf_counter() - start)
+
+    store = _make_store(embeddings, batch_size, round_trip)
+    start = time.perf_counter()
+    store.add_texts(texts)
+    batched = num_texts / (time.perf_counter() - start)
+    assert store.client.count(store.collection_name).count == num_texts
+
+    print(f"{num_texts} texts, batch size {batch_size}")
+    print(f"  embed_query per text: {baseline:8.1f} texts/sec")
+    print(f"  batched + pipelined:  {batched:8.1f} texts/sec ({batched / baseline:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--call-overhead-ms", type=float, default=5.0)
+    parser.add_argument("--per-text-ms", type=float, default=0.5)
+    parser.add_argument("--round-trip-ms", type=float, default=20.0)
+    args = parser.parse_args()
+    run(args.texts, args.batch_size, args.call_overhead_ms / 1000, args.per_text_ms / 1000, args.round_trip_ms / 1000)
@@ -34,6 +34,9 @@ def main():
             EMBEDDINGS_PROVIDER=user_settings.get("EMBEDDINGS_PROVIDER"),
             LLM_API_KEY=os.getenv("LLM_API_KEY",""),
             EMBEDDINGS_API_KEY=os.getenv("EMBEDDINGS_API_KEY",""), 
+            VECTOR_STORE_BACKEND=user_settings.get("VECTOR_STORE_BACKEND","local"),
+            QDRANT_HOST=os.getenv("QDRANT_HOST","http://localhost:6333"),
+            QDRANT_API_KEY=os.getenv("QDRANT_API_KEY",""),
         )
         
         # Create the application instance directly
@@ -5,6 +5,7 @@ from uuid import uuid4
 
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 from langchain_core.runnables import RunnableConfig
+from langchain_huggingface import HuggingFaceEmbeddings
 from langfuse.langchain.CallbackHandler import LangchainCallbackHandler
 from langgraph.graph.state import CompiledStateGraph
 from langgraph.types import StateSnapshot
@@ -14,11 +15,21 @@ from ..config.config import AppSettings
 from ..core.graph.graph import create_graph
 from ..core.prompts.system_prompt import get_system_prompt, get_title_prompt
 from ..core.states.AppStates import AppState
+from ..core.tools.shell_cache import initialize_shell_cache
+from ..core.tools.shell_jobs import initialize_job_manager
+from ..core.tools.shell_output import set_shell_log_dir
+from ..core.tools.shell_pool import initialize_shell_pool
+from ..infrastructure.databases.embedding_models import LazyEmbeddings
+from ..infrastructure.databases.message_codec import message_text
 from ..infrastructure.databases.sql_database import (DataBaseManager,
-                                                     get_database_manager)
+                                                     initialize_database)
+from ..infrastructure.databases.vector_database import initialize_vector_store
 from ..infrastructure.llm_clients.llms import LLMConfig, ModelProvider, get_llm
 from ..infrastructure.monitoring.tracing import get_langfuse_handler
+from ..infrastructure.workspace.checkpoints import (get_checkpoints,
+                                                    initialize_checkpoints)
 from ..utilities.logger import init_logger
+from .chat_turns import save_turn
 
 # this is the application where everything starts
 # lets work it out till only memory_node with the cli
@@ -38,21 +49,42 @@ class Application(BaseModel):
         log=init_logger(enable_logging=self.settings.LOGGING, log_file=self.settings.LOG_FILE)
         log.info("Warming up...")
         #intilialize chats db
-        self.database = get_database_manager(self.settings.HISTORY_DB_FILE)
+        self.database = initialize_database(self.settings.HISTORY_DB_FILE)
+        # undo snapshots of the files touched by the agent, stored per thread
+        initialize_checkpoints(database=self.database, storage_dir=self.settings.CHECKPOINTS_DIR)
+        # shell sessions for the agent's commands, rooted in the workspace
+        set_shell_log_dir(self.settings.SHELL_LOG_DIR)
+        initialize_shell_pool(max_parallel=self.settings.SHELL_MAX_PARALLEL, idle_timeout=self.settings.SHELL_IDLE_TIMEOUT, cwd=os.getcwd())
+        initialize_job_manager(cwd=os.getcwd())
+        initialize_shell_cache(enabled=self.settings.SHELL_RESULT_CACHE, ttl=self.settings.SHELL_RESULT_CACHE_TTL, root=os.getcwd())
         
         #intilialize vector store with error handling
-        # try:
-        #     embedding_model = HuggingFaceEmbeddings(model_name=self.settings.EMBEDDINGS_MODEL_NAME)
-        #     initialize_vector_store(
-        #         host=self.settings.QDRANT_HOST, 
-        #         api_key=self.settings.QDRANT_API_KEY, 
-        #         embeddings=embedding_model,
-        #         collection_name=self.settings.QDRANT_COLLECTION
-        #     )
-        #     log.info("Qdrant vector store initialized successfully")
-        # except Exception as e:
-        #     log.warning(f"Could not initialize Qdrant vector store: {e}")
-        #     log.info("Continuing without vector store functionality")
+        try:
+            # the sentence-transformer is loaded on a background thread, not here
+            model_name = self.settings.EMBEDDINGS_MODEL_NAME
+            embedding_model = LazyEmbeddings(lambda: HuggingFaceEmbeddings(model_name=model_name), model_name=model_name)
+            initialize_vector_store(
+                host=self.settings.QDRANT_HOST, 
+                api_key=self.settings.QDRANT_API_KEY, 
+                embeddings=embedding_model,
+                collection_name=self.settings.QDRANT_COLLECTION,
+                batch_size=self.settings.EMBEDDINGS_BATCH_SIZE,
+                embedding_cache_path=self.settings.EMBEDDINGS_CACHE_FILE,
+                backend=self.settings.VECTOR_STORE_BACKEND,
+                path=self.settings.VECTOR_STORE_PATH,
+                hybrid=self.settings.VECTOR_STORE_HYBRID,
+                quantization=self.settings.VECTOR_STORE_QUANTIZATION or None,
+                on_disk=self.settings.VECTOR_STORE_ON_DISK,
+                hnsw_m=self.settings.VECTOR_STORE_HNSW_M,
+                hnsw_ef_construct=self.settings.VECTOR_STORE_HNSW_EF_CONSTRUCT,
+                hnsw_ef=self.settings.VECTOR_STORE_HNSW_EF,
+                query_cache_size=self.settings.VECTOR_STORE_QUERY_CACHE_SIZE,
+                warm_up=True
+            )
+            log.info(f"Vector store initialized with the {self.settings.VECTOR_STORE_BACKEND} backend")
+        except Exception as e:
+            log.warning(f"Could not initialize vector store: {e}")
+            log.info("Continuing without vector store functionality")
         
         try:
             llm_config = LLMConfig(provider=ModelProvider.GROQ, model_name=self.settings.LLM_NAME, api_key=self.settings.LLM_API_KEY)
@@ -96,8 +128,6 @@ class Application(BaseModel):
         while True:
             # user input
             query=input("Enter your query please : ")
-            # add message to the data base
-            self.database.add_human_message(thread_id=thread_id,message_id=str(uuid4()),content=query)
             current_state:StateSnapshot=self.graph.get_state(config=config)
             # accquire previous messages
             current_messages=current_state.values['messages']
@@ -105,24 +135,30 @@ class Application(BaseModel):
             
             if query.lower() in {"bye","exit"}:
                 print("Exiting the world...:(")
+                # messages are written behind the chat loop, wait for them
+                self.database.flush()
                 break
             else:
+                # every turn gets its own checkpoint so its file changes can be undone
+                get_checkpoints().begin(thread_id=thread_id, label=query[:80])
                 # run the graph with prompt history
                 # append messages in the prompt with System Prompt
                 if self.graph:
                     if first_chat:
                         first_chat=False
                         output=self.graph.invoke(AppState(type="execution_node",query=query,messages=[SystemMessage(content=SYSTEM_PROMPT)]),config)
-                        output=output.get("content")
-                        print(output)     
-                        self.database.add_ai_message(thread_id=thread_id,message_id=str(uuid4()),content=str(output))
-                        output_title=self.llm.invoke(input=[SystemMessage(content=get_title_prompt()),HumanMessage(content=query),AIMessage(content=str(output))])
+                        # the human message and the whole answer, tool calls included
+                        reply=save_turn(self.database,thread_id,query,output)
+                        answer=message_text(reply) if reply else ""
+                        print(answer)
+                        output_title=self.llm.invoke(input=[SystemMessage(content=get_title_prompt()),HumanMessage(content=query),AIMessage(content=answer)])
                         self.database.alter_thread_title(thread_id,str(output_title.content))
                     else :
                         output=self.graph.invoke(AppState(type=type,query=query,messages=current_messages))
-                        print(output.get("content"))
-                        self.database.add_ai_message(thread_id=thread_id,message_id=str(uuid4()),content=str(output.get("content")))
+                        reply=save_turn(self.database,thread_id,query,output)
+                        print(message_text(reply) if reply else "")
                 else:
+                    self.database.add_human_message(thread_id=thread_id,message_id=str(uuid4()),content=query)
                     print("LLM not available. Please check your configuration.")
                 
                 
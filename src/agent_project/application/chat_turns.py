@@ -0,0 +1,31 @@
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+from ..infrastructure.databases.sql_database import DataBaseManager
+
+
+def turn_messages(messages: Sequence[BaseMessage], query: str) -> List[BaseMessage]:
+    """The messages of the last turn, from the human message of the query on
+
+    The graph returns the whole conversation, earlier turns may have been
+    summarized into system messages, so the turn is found by its query
+    rather than by the length of the previous state.
+    """
+    for index in range(len(messages) - 1, -1, -1):
+        message = messages[index]
+        if isinstance(message, HumanMessage) and message.content == query:
+            return list(messages[index:])
+    return [HumanMessage(content=query)]
+
+
+def save_turn(database: DataBaseManager, thread_id: str, query: str, output: Dict[str, Any]) -> Optional[AIMessage]:
+    """Store the human message and everything the graph answered with, tool calls included
+
+    Returns:
+        The reply of the turn, None when the graph did not answer
+    """
+    messages = turn_messages(output.get("messages", []), query)
+    database.add_messages(thread_id, messages)
+    replies = [message for message in messages if isinstance(message, AIMessage)]
+    return replies[-1] if replies else None
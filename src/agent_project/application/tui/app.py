@@ -1,16 +1,36 @@
 
+from typing import Optional
+
 from textual.app import App
 
+from ...config.config import AppSettings
+from ...infrastructure.databases.sql_database import (DataBaseManager,
+                                                      get_database,
+                                                      initialize_database)
+from ...infrastructure.workspace.checkpoints import initialize_checkpoints
+from .chat_history_screen import ChatHistoryScreen
 from .main_screen import MainScreen
 
 
+def _open_history() -> DataBaseManager:
+    """The conversation store, opened at the default paths when the TUI runs on its own"""
+    try:
+        return get_database()
+    except RuntimeError:
+        defaults = AppSettings.model_fields
+        database = initialize_database(defaults["HISTORY_DB_FILE"].default)
+        # deleting a thread from the history also drops its checkpoint files
+        initialize_checkpoints(database=database, storage_dir=defaults["CHECKPOINTS_DIR"].default)
+        return database
+
+
 class AnonymousCoderApp(App):
     """A Textual app for coding through CLI"""
 
     BINDINGS = [
         # ("s", "push_screen('settings')", "Settings"),
         # ("m", "push_screen('memories')", "Memories"),
-        # ("h", "push_screen('history')", "History"),
+        ("h", "history", "History"),
         ("ctrl+c", "quit", "Quit"),
         ("ctrl+d", "toggle_dark", "Toggle Dark Mode"),
     ]
@@ -19,14 +39,23 @@ class AnonymousCoderApp(App):
     # SCREENS = {
     #     "settings": SettingsScreen,
     #     "memories": MemoryManagementScreen,
-    #     "history": ChatHistoryScreen,
     # }
 
+    def __init__(self, database: Optional[DataBaseManager] = None):
+        super().__init__()
+        self.database = database
+
     def on_mount(self) -> None:
         """Called when app starts."""
+        if self.database is None:
+            self.database = _open_history()
         self.install_screen(MainScreen(), name="main")
         self.push_screen("main")
 
+    def action_history(self) -> None:
+        """Open the chat history, a new screen each time so the thread list is current."""
+        self.push_screen(ChatHistoryScreen(self.database))
+
     def action_toggle_dark(self) -> None:
         """Toggle dark mode."""
         self.dark = not self.dark
@@ -35,4 +64,3 @@ class AnonymousCoderApp(App):
 if __name__ == "__main__":
     app = AnonymousCoderApp()
     app.run()
-    
\ No newline at end of file
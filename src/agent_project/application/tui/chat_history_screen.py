@@ -1,51 +1,45 @@
+from typing import List, Optional, Tuple
+
+from textual.app import ComposeResult
+from textual.containers import Container, HorizontalGroup
+from textual.screen import Screen
+from textual.widgets import (Button, Input, Label, ListItem, ListView, Static,
+                             TextArea)
+
+from ...infrastructure.databases.sql_database import (THREAD_PAGE_SIZE,
+                                                      DataBaseManager,
+                                                      ThreadSummary)
+from ...infrastructure.workspace.checkpoints import delete_thread
+
+
+def _thread_item(thread: ThreadSummary) -> ListItem:
+    last_message = " ".join(thread.last_message.split())
+    return ListItem(
+        Label(f"[bold]{thread.title or 'Untitled'}[/bold]"),
+        Label(f"Created: {thread.created_at[:16].replace('T', ' ')} | Messages: {thread.message_count}"),
+        Label(f"Last: {last_message[:50]}..."),
+    )
+
+
 class ChatHistoryScreen(Screen):
     """Screen for managing chat history"""
-    
+
     BINDINGS = [
         ("escape", "app.pop_screen", "Back"),
         ("d", "delete_thread", "Delete Thread"),
         ("r", "rename_thread", "Rename Thread"),
     ]
-    
-    def __init__(self):
+
+    def __init__(self, database: DataBaseManager, page_size: int = THREAD_PAGE_SIZE):
         super().__init__()
-        self.chat_threads = [
-            {
-                "id": str(uuid.uuid4()),
-                "title": "Python Debugging Session",
-                "created": "2024-01-16 09:00",
-                "message_count": 15,
-                "last_message": "Thanks for helping with the bug fix!"
-            },
-            {
-                "id": str(uuid.uuid4()),
-                "title": "Database Schema Design",
-                "created": "2024-01-15 14:30",
-                "message_count": 8,
-                "last_message": "The normalized schema looks good now."
-            },
-            {
-                "id": str(uuid.uuid4()),
-                "title": "API Development Questions",
-                "created": "2024-01-14 11:15",
-                "message_count": 23,
-                "last_message": "Perfect! The REST endpoints are working."
-            }
-        ]
-    
+        self.database = database
+        self.page_size = page_size
+        # threads are fetched a page at a time, "Load More" fetches the next
+        self.chat_threads: List[ThreadSummary] = []
+        self._cursor: Optional[Tuple[str, str]] = None
+        self._has_more = True
+
     def compose(self) -> ComposeResult:
-        # Create list view for chat threads
-        list_view = ListView(id="chat_threads_list")
-        
-        for thread in self.chat_threads:
-            list_view.append(
-                ListItem(
-                    Label(f"[bold]{thread['title']}[/bold]"),
-                    Label(f"Created: {thread['created']} | Messages: {thread['message_count']}"),
-                    Label(f"Last: {thread['last_message'][:50]}..."),
-                )
-            )
-        
         yield Container(
             Static("[bold green]Chat History[/bold green]", classes="title"),
             HorizontalGroup(
@@ -55,19 +49,24 @@ class ChatHistoryScreen(Screen):
                 Button("Export Thread", variant="default", id="export_thread_btn"),
                 classes="button-group"
             ),
-            list_view,
+            Input(placeholder="Search past messages...", id="history_search"),
+            ListView(id="chat_threads_list"),
             TextArea(
                 text="Select a chat thread to view details...",
                 id="thread_preview",
                 read_only=True
             ),
             HorizontalGroup(
+                Button("Load More", variant="default", id="load_more_btn"),
                 Button("Back", variant="default", id="back_button"),
                 classes="bottom-buttons"
             ),
             id="history_container"
         )
-    
+
+    def on_mount(self) -> None:
+        self.load_next_page()
+
     def on_button_pressed(self, event: Button.Pressed) -> None:
         if event.button.id == "back_button":
             self.app.pop_screen()
@@ -75,29 +74,52 @@ class ChatHistoryScreen(Screen):
             self.load_selected_thread()
         elif event.button.id == "delete_thread_btn":
             self.delete_selected_thread()
-    
+        elif event.button.id == "load_more_btn":
+            self.load_next_page()
+
+    def on_input_submitted(self, event: Input.Submitted) -> None:
+        """Show the messages matching the search in the preview"""
+        if event.input.id != "history_search" or not event.value.strip():
+            return
+        hits = self.database.search_messages(event.value)
+        preview_area = self.query_one("#thread_preview", TextArea)
+        if not hits:
+            preview_area.text = f"No messages found for '{event.value}'"
+            return
+        preview_area.text = "\n\n".join(
+            f"{hit.thread_title or 'Untitled'} ({hit.thread_id}) - {hit.role}, {hit.created_at[:16].replace('T', ' ')}\n{hit.snippet}"
+            for hit in hits
+        )
+
     def on_list_view_selected(self, event: ListView.Selected) -> None:
         """Show thread preview when selected"""
-        if event.item and hasattr(event.item, 'index'):
-            thread = self.chat_threads[event.item.index]
+        list_view = self.query_one("#chat_threads_list", ListView)
+        if list_view.index is not None and list_view.index < len(self.chat_threads):
+            thread = self.chat_threads[list_view.index]
             preview_area = self.query_one("#thread_preview", TextArea)
-            preview_area.text = f"Thread: {thread['title']}\nCreated: {thread['created']}\nMessages: {thread['message_count']}\n\nLast Message: {thread['last_message']}"
-    
+            preview_area.text = f"Thread: {thread.title}\nCreated: {thread.created_at}\nMessages: {thread.message_count}\n\nLast Message: {thread.last_message}"
+
+    def load_next_page(self) -> None:
+        if not self._has_more:
+            return
+        page = self.database.list_threads(limit=self.page_size, after=self._cursor)
+        if page:
+            self._cursor = page[-1].cursor
+            self.chat_threads.extend(page)
+            self.query_one("#chat_threads_list", ListView).extend(_thread_item(thread) for thread in page)
+        self._has_more = len(page) == self.page_size
+        self.query_one("#load_more_btn", Button).disabled = not self._has_more
+
     def load_selected_thread(self) -> None:
         self.notify("Thread loaded successfully!", severity="information")
         self.app.pop_screen()
-    
+
     def delete_selected_thread(self) -> None:
         list_view = self.query_one("#chat_threads_list", ListView)
-        if list_view.index is not None:
-            del self.chat_threads[list_view.index]
-            list_view.clear()
-            for thread in self.chat_threads:
-                list_view.append(
-                    ListItem(
-                        Label(f"[bold]{thread['title']}[/bold]"),
-                        Label(f"Created: {thread['created']} | Messages: {thread['message_count']}"),
-                        Label(f"Last: {thread['last_message'][:50]}..."),
-                    )
-                )
+        if list_view.index is not None and list_view.index < len(self.chat_threads):
+            index = list_view.index
+            # checkpoint files of the thread go with it
+            delete_thread(self.database, self.chat_threads[index].thread_id)
+            del self.chat_threads[index]
+            list_view.remove_items([index])
             self.notify("Thread deleted successfully!", severity="information")
@@ -7,6 +7,12 @@ from textual.screen import Screen
 from textual.widget import Widget
 from textual.widgets import Footer, Input
 
+from ...core.tools.async_shell import AsyncShellSession
+from ...core.tools.shell_cache import invalidate_shell_cache
+
+# seconds a `ter:` command may run before it is interrupted
+TERMINAL_COMMAND_TIMEOUT = 120
+
 
 class IntroHeader(Widget):
 
@@ -65,6 +71,7 @@ class MainScreen(Screen):
     def __init__(self):
         super().__init__()
         self.chat_messages = []
+        self.shell: AsyncShellSession | None = None
 
     def compose(self) -> ComposeResult:
         yield VerticalScroll(
@@ -89,13 +96,38 @@ class MainScreen(Screen):
             elif event.value.startswith("search:"):
                 self.add_message("assistant", "Memory search feature coming soon!")
             elif event.value.startswith("ter:"):
-                self.add_message("assistant", "Terminal command execution coming soon!")
+                command = event.value[len("ter:"):].strip()
+                self.add_message("user", f"$ {command}")
+                self.run_worker(self.run_terminal_command(command), group="terminal")
             else:
                 self.add_message("user", event.value)
                 
             # Clear input
             event.input.value = ""
 
+    async def run_terminal_command(self, command: str) -> None:
+        """Run a `ter:` command in the screen's shell session without blocking the UI"""
+        try:
+            if self.shell is None or not self.shell.is_running:
+                self.shell = AsyncShellSession()
+                await self.shell.start()
+            result = await self.shell.run(command, timeout=TERMINAL_COMMAND_TIMEOUT)
+        except RuntimeError as e:
+            self.add_message("assistant", f"Could not run command: {e}")
+            return
+        finally:
+            # the user may have changed the workspace behind the agent's back
+            invalidate_shell_cache()
+        if result.timed_out:
+            status = f"interrupted after {TERMINAL_COMMAND_TIMEOUT}s"
+        else:
+            status = f"exit code {result.exit_code}"
+        self.add_message("assistant", f"{result.output.rstrip()}\n[{status}]")
+
+    async def on_unmount(self) -> None:
+        if self.shell is not None:
+            await self.shell.close()
+
     def add_message(
         self,
         role: str,
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import BaseModel, Field
 
 
@@ -9,20 +11,43 @@ class AppSettings(BaseModel):
     LANGFUSE_PUBLIC_KEY: str
     LANGFUSE_SECRET_KEY: str
     LANGFUSE_HOST: str
-    #TODO:  QDRANT_HOST: str = Field(default="localhost:6333")
-    #TODO: QDRANT_API_KEY: str = Field(default="")
-    #TODO: QDRANT_COLLECTION: str = Field(default="app_documents")
+    # remote, local (embedded Qdrant), memory or numpy, see VECTOR_BACKENDS
+    VECTOR_STORE_BACKEND: str = Field(default="local")
+    VECTOR_STORE_PATH: str = Field(default="user_space/vector_store")
+    # BM25 sparse vectors next to the dense ones, only applies to new collections
+    VECTOR_STORE_HYBRID: bool = Field(default=False)
+    # storage options of new collections: "int8" quantization, originals on
+    # disk and HNSW graph parameters, None keeps the Qdrant defaults. Only a
+    # Qdrant server applies them, the embedded backends search exactly
+    VECTOR_STORE_QUANTIZATION: str = Field(default="")
+    VECTOR_STORE_ON_DISK: bool = Field(default=False)
+    VECTOR_STORE_HNSW_M: Optional[int] = Field(default=None)
+    VECTOR_STORE_HNSW_EF_CONSTRUCT: Optional[int] = Field(default=None)
+    VECTOR_STORE_HNSW_EF: Optional[int] = Field(default=None)
+    # recent similarity searches kept in memory, 0 disables the cache
+    VECTOR_STORE_QUERY_CACHE_SIZE: int = Field(default=256)
+    QDRANT_HOST: str = Field(default="http://localhost:6333")
+    QDRANT_API_KEY: str = Field(default="")
+    QDRANT_COLLECTION: str = Field(default="app_documents")
     #TODO: TYPE THE ENTIRE SYSTEM TO ACCEPT THE DEFINED PROVIDERS
     LLM_PROVIDER:str
     LLM_NAME:str
     EMBEDDINGS_PROVIDER:str
     EMBEDDINGS_MODEL_NAME: str = Field(default="sentence-transformers/all-mpnet-base-v2")
+    EMBEDDINGS_BATCH_SIZE: int = Field(default=64)
+    EMBEDDINGS_CACHE_FILE: str = Field(default="user_space/embeddings.db")
     LLM_API_KEY: str
     EMBEDDINGS_API_KEY:str
     #TODO: VOICE_AGENTS
     #TODO: VOICE_MODE
     #TODO: ADD MCP SUPPORT
     HISTORY_DB_FILE: str = Field(default="user_space/threads.db")
+    CHECKPOINTS_DIR: str = Field(default="user_space/checkpoints")
+    SHELL_MAX_PARALLEL: int = Field(default=4)
+    SHELL_IDLE_TIMEOUT: float = Field(default=300.0)
+    SHELL_LOG_DIR: str = Field(default="user_space/shell_logs")
+    SHELL_RESULT_CACHE: bool = Field(default=False)
+    SHELL_RESULT_CACHE_TTL: float = Field(default=60.0)
     # TO REMOVE IN DEVELOPMENT
     LOG_FILE: str = Field(default="user_space/app.log")
 
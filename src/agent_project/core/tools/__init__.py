@@ -1,4 +1,7 @@
 from .ask_user_tool import *
+from .async_shell import *
+from .chat_history_tools import *
+from .checkpoint_tools import *
 from .create_or_delete_files import *
 from .diff_files import *
 from .edit_file import *
@@ -11,6 +14,10 @@ from .grep_code import *
 from .read_file import *
 from .scaflod_projects import *
 from .shell import *
+from .shell_cache import *
+from .shell_jobs import *
+from .shell_output import *
+from .shell_pool import *
 from .user_memory import get_user_memory, update_memories
 from .vector_database_tools import *
 from .window_power_shell import *
@@ -19,15 +26,9 @@ from .write_code_to_file_path import *
 FILE_SYS_TOOLS=[
     create_file,delete_file,
     show_diff,edit_file,
+    list_checkpoints,restore_checkpoint,
 ]
 
-# Shell tools for persistent shell sessions
-# SHELL_TOOLS = [
-#     use_shell,
-#     get_shell_working_directory,
-#     reset_shell_directory,
-# ]
-
 # PowerShell tools for Windows systems
 POWERSHELL_TOOLS = [
     use_powershell,
@@ -38,7 +39,8 @@ POWERSHELL_TOOLS = [
 
 MEMORY_TOOLS=[
     update_memories,
-    get_user_memory
+    get_user_memory,
+    search_chat_history
 ]
 
 VECTOR_STORE_TOOLS=[
@@ -48,7 +50,15 @@ VECTOR_STORE_TOOLS=[
     similarity_search
 ]
 
-
+# Shell tools for persistent shell sessions, leased from a pool so
+# commands in different sessions run in parallel, and for background jobs
 SHELL_TOOLS=[
-    
+    use_shell,
+    get_shell_working_directory,
+    reset_shell_directory,
+    read_shell_log,
+    start_background_job,
+    get_job_status,
+    tail_job_output,
+    kill_job,
 ]
\ No newline at end of file
@@ -0,0 +1,226 @@
+import asyncio
+import os
+import shutil
+import signal
+from typing import Callable, Dict, Optional
+
+from .shell import (READ_CHUNK_SIZE, CommandResult, MarkerScanner,
+                    make_output_decoder, new_marker, wrap_command)
+
+# seconds to wait for the shell to come back after an interrupt
+RESYNC_TIMEOUT = 5
+
+
+class AsyncShellSession:
+    """Persistent shell running on a pseudo-terminal, driven by the asyncio loop
+
+    Programs see a real TTY on stdin/stdout/stderr, output is read when the
+    event loop reports the pty readable and every command returns as soon
+    as its end marker arrives. Commands are serialized per session, use a
+    pool of sessions to run commands in parallel.
+
+    Usage from a graph node or the Textual app:
+
+        async with AsyncShellSession(cwd=project_dir) as shell:
+            result = await shell.run("pytest -q", timeout=600)
+    """
+
+    def __init__(self, shell_type: Optional[str] = None, cwd: Optional[str] = None, env: Optional[Dict[str, str]] = None) -> None:
+        self.shell_type = shell_type or shutil.which("bash") or "/bin/sh"
+        self.cwd = cwd or os.getcwd()
+        self.env = env
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self._master_fd: Optional[int] = None
+        self._output: Optional[asyncio.Queue] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def is_running(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    async def __aenter__(self) -> "AsyncShellSession":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def start(self) -> None:
+        """Spawn the shell on a fresh pseudo-terminal"""
+        if os.name == 'nt':
+            raise RuntimeError("AsyncShellSession needs a pseudo-terminal, use PersistentShell on Windows")
+        import pty
+        import termios
+
+        if self.is_running:
+            await self.close()
+
+        master_fd, slave_fd = pty.openpty()
+        # no echo of what we type, no CRLF translation and no line-length limit on input
+        attrs = termios.tcgetattr(slave_fd)
+        attrs[1] &= ~termios.ONLCR
+        attrs[3] &= ~(termios.ECHO | termios.ICANON)
+        attrs[6][termios.VMIN] = 1
+        attrs[6][termios.VTIME] = 0
+        termios.tcsetattr(slave_fd, termios.TCSANOW, attrs)
+
+        env = dict(os.environ if self.env is None else self.env)
+        env.update({"PS1": "", "PS2": "", "TERM": env.get("TERM", "dumb")})
+        env.pop("PROMPT_COMMAND", None)
+        args = [self.shell_type]
+        if os.path.basename(self.shell_type) == "bash":
+            args += ["--noprofile", "--norc", "--noediting"]
+        args.append("-i")
+
+        def make_controlling_tty() -> None:
+            import fcntl
+            fcntl.ioctl(0, termios.TIOCSCTTY, 0)
+
+        try:
+            self.process = await asyncio.create_subprocess_exec(
+                *args,
+                stdin=slave_fd,
+                stdout=slave_fd,
+                stderr=slave_fd,
+                cwd=self.cwd,
+                env=env,
+                start_new_session=True,
+                preexec_fn=make_controlling_tty,
+            )
+        finally:
+            os.close(slave_fd)
+
+        os.set_blocking(master_fd, False)
+        self._master_fd = master_fd
+        self._output = asyncio.Queue()
+        decoder = make_output_decoder()
+        output = self._output
+        loop = asyncio.get_running_loop()
+
+        def on_readable() -> None:
+            try:
+                data = os.read(master_fd, READ_CHUNK_SIZE)
+            except BlockingIOError:
+                return
+            except OSError:
+                # EIO once the shell and all its children closed the pty
+                data = b""
+            if data:
+                text = decoder.decode(data)
+                if text:
+                    output.put_nowait(text)
+            else:
+                loop.remove_reader(master_fd)
+                output.put_nowait(decoder.decode(b"", final=True))
+                output.put_nowait(None)
+
+        loop.add_reader(master_fd, on_readable)
+
+    async def run(self, command: str, timeout: Optional[float] = None, on_output: Optional[Callable[[str], None]] = None) -> CommandResult:
+        """Run a command and wait for it to finish
+
+        Args:
+            command: Shell command to execute
+            timeout: Seconds before the command is interrupted with Ctrl-C
+            on_output: Called with each piece of output as it arrives
+
+        Returns:
+            Command output with its exit code and the shell's working directory
+
+        Cancelling the awaiting task interrupts the command as well.
+        """
+        async with self._lock:
+            if not self.is_running:
+                raise RuntimeError("Shell session not started")
+            self._discard_output()
+            scanner = MarkerScanner(new_marker())
+            await self._write(wrap_command(command, scanner.marker, self.shell_type))
+            try:
+                await asyncio.wait_for(self._collect(scanner, on_output), timeout)
+            except asyncio.TimeoutError:
+                scanner.flush()
+                await asyncio.shield(self._interrupt())
+                return scanner.result(exit_code=None, cwd=self.cwd, timed_out=True)
+            except asyncio.CancelledError:
+                scanner.capture.close()
+                await asyncio.shield(self._interrupt())
+                raise
+
+            if scanner.done:
+                self.cwd = scanner.cwd
+                return scanner.result(exit_code=scanner.exit_code, cwd=self.cwd)
+            # the command ended the shell itself, e.g. `exit`
+            await self.process.wait()
+            return scanner.result(exit_code=self.process.returncode, cwd=self.cwd)
+
+    async def send_input(self, text: str) -> None:
+        """Type text into the running command, e.g. an answer to a prompt"""
+        await self._write(text)
+
+    async def close(self) -> None:
+        """Stop the shell and every process it started"""
+        if self.process is None:
+            return
+        if self.process.returncode is None:
+            self._signal_session(signal.SIGHUP)
+            try:
+                await asyncio.wait_for(self.process.wait(), 5)
+            except asyncio.TimeoutError:
+                self._signal_session(signal.SIGKILL)
+                await self.process.wait()
+        if self._master_fd is not None:
+            asyncio.get_running_loop().remove_reader(self._master_fd)
+            os.close(self._master_fd)
+            self._master_fd = None
+        self.process = None
+
+    async def _collect(self, scanner: MarkerScanner, on_output: Optional[Callable[[str], None]]) -> None:
+        while not scanner.done:
+            text = await self._output.get()
+            if text is None:
+                # end of output, the shell is gone
+                self._output.put_nowait(None)
+                text = scanner.flush()
+                if text and on_output is not None:
+                    on_output(text)
+                return
+            text = scanner.feed(text)
+            if text and on_output is not None:
+                on_output(text)
+
+    async def _interrupt(self) -> None:
+        """Ctrl-C the foreground command and wait until the shell is back"""
+        if not self.is_running:
+            return
+        await self._write("\x03")
+        # whatever the interrupted command still prints is dropped
+        scanner = MarkerScanner(new_marker(), keep_output=False)
+        await self._write(wrap_command(":", scanner.marker, self.shell_type))
+        try:
+            await asyncio.wait_for(self._collect(scanner, None), RESYNC_TIMEOUT)
+        except asyncio.TimeoutError:
+            # the command ignores SIGINT, start over in the same directory
+            await self.close()
+            await self.start()
+
+    async def _write(self, text: str) -> None:
+        data = text.encode("utf-8")
+        while data:
+            try:
+                written = os.write(self._master_fd, data)
+                data = data[written:]
+            except BlockingIOError:
+                await asyncio.sleep(0.01)
+
+    def _discard_output(self) -> None:
+        """Drop output left over from an interrupted command"""
+        while not self._output.empty():
+            if self._output.get_nowait() is None:
+                self._output.put_nowait(None)
+                return
+
+    def _signal_session(self, sig: int) -> None:
+        try:
+            os.killpg(self.process.pid, sig)
+        except (ProcessLookupError, PermissionError):
+            pass
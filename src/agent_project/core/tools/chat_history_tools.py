@@ -0,0 +1,30 @@
+from langchain_core.tools import tool
+
+from ...infrastructure.databases.sql_database import get_database
+
+
+@tool
+def search_chat_history(query: str, limit: int = 10, offset: int = 0) -> str:
+    """
+    Search past conversations with the user for messages containing every word
+    of the query, to recall earlier decisions, code or preferences.
+
+    Args:
+        query: Words to look for, the last one also matches as a prefix
+        limit: Maximum number of messages to return
+        offset: Number of best matches to skip, to page through results
+
+    Returns:
+        One line per message, best match first, with its thread and a snippet
+        where matched words are marked with **
+    """
+    try:
+        hits = get_database().search_messages(query, limit=limit, offset=offset)
+        if not hits:
+            return f"No past messages found for '{query}'"
+        return "\n".join(
+            f"Thread: {hit.thread_id} ({hit.thread_title or 'Untitled'}), {hit.role} at {hit.created_at}: {hit.snippet}"
+            for hit in hits
+        )
+    except Exception as e:
+        return f"❌ Error: {e}"
@@ -0,0 +1,47 @@
+from langchain_core.tools import tool
+
+from ...infrastructure.workspace.checkpoints import get_checkpoints
+from .shell_cache import invalidate_shell_cache
+
+
+@tool
+def list_checkpoints() -> str:
+    """
+    List the workspace checkpoints of the current chat thread, newest first.
+    A checkpoint holds the files changed by the file tools during one turn.
+    
+    Returns:
+        One line per checkpoint with its id, time, number of files and label
+    """
+    try:
+        checkpoints = get_checkpoints().list_checkpoints()
+        if not checkpoints:
+            return "No checkpoints recorded for this thread"
+        return "\n".join(
+            f"ID: {c['checkpoint_id']}, Created: {c['created_at']}, Files: {c['file_count']}, Label: {c['label']}"
+            for c in checkpoints
+        )
+    except Exception as e:
+        return f"❌ Error: {e}"
+
+
+@tool
+def restore_checkpoint(checkpoint_id: str) -> str:
+    """
+    Undo file changes by restoring every file recorded in a checkpoint.
+    Files that were created after the checkpoint are deleted again.
+    
+    Args:
+        checkpoint_id: The ID of the checkpoint to restore (see list_checkpoints)
+        
+    Returns:
+        The restored file paths or error message
+    """
+    try:
+        restored = get_checkpoints().restore(checkpoint_id)
+        invalidate_shell_cache()
+        if not restored:
+            return f"Checkpoint {checkpoint_id} has no recorded files"
+        return f"✅ Restored {len(restored)} files:\n" + "\n".join(restored)
+    except Exception as e:
+        return f"❌ Error restoring checkpoint {checkpoint_id}: {e}"
@@ -1,8 +1,13 @@
 import logging
+import os
+import tempfile
 from pathlib import Path
 
 from langchain_core.tools import tool
 
+from ...infrastructure.workspace.checkpoints import record_before_write
+from .shell_cache import invalidate_shell_cache
+
 
 @tool
 def create_file(path: str, content:str,overwrite: bool = False) -> str:
@@ -29,12 +34,25 @@ def create_file(path: str, content:str,overwrite: bool = False) -> str:
         if file_path.exists() and not overwrite:
             raise FileExistsError(f"File '{path}' already exists. Use overwrite=True to overwrite.")
         
+        # Snapshot the current state so the turn can be undone
+        record_before_write(path)
+        
         # Create parent directories if they don't exist
         file_path.parent.mkdir(parents=True, exist_ok=True)
         
-        # Write content to file
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        # Write to a temp file and swap it in, checkpoints may hardlink the old inode
+        mode = file_path.stat().st_mode & 0o777 if file_path.exists() else 0o644
+        fd, temp_path = tempfile.mkstemp(dir=file_path.parent, prefix=f".{file_path.name}.")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.chmod(temp_path, mode)
+            os.replace(temp_path, file_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        invalidate_shell_cache()
         
         return f"Successfully created file {path} and written {len(content)} characters to it"
         
@@ -80,8 +98,12 @@ def delete_file(path: str, force: bool = False) -> str:
         if not file_path.is_file():
             raise OSError(f"'{path}' is not a file (it might be a directory).")
         
+        # Snapshot the file so the turn can be undone
+        record_before_write(path)
+        
         # Delete the file
         file_path.unlink()
+        invalidate_shell_cache()
         
         return f"Successfully deleted file '{path}'."
         
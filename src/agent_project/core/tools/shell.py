@@ -1,9 +1,136 @@
+import codecs
+import io
 import os
 import queue
+import re
 import select
+import signal
 import subprocess
 import threading
-from typing import Optional
+import time
+from typing import Callable, List, Optional
+from uuid import uuid4
+
+from pydantic import BaseModel
+
+from .shell_output import OutputCapture
+
+# bytes requested per os.read call on the shell's stdout
+READ_CHUNK_SIZE = 64 * 1024
+# seconds a non-interactive command may run before the session is restarted
+NON_INTERACTIVE_TIMEOUT = 30
+
+
+class CommandResult(BaseModel):
+    """Outcome of a command run in a shell session"""
+    output: str
+    exit_code: Optional[int] = None
+    cwd: Optional[str] = None
+    timed_out: bool = False
+    # id of the full output log when the output was summarized
+    log_id: Optional[str] = None
+
+
+def make_output_decoder() -> io.IncrementalNewlineDecoder:
+    """Incremental UTF-8 decoder that also normalizes CRLF and CR to LF"""
+    return io.IncrementalNewlineDecoder(
+        codecs.getincrementaldecoder('utf-8')(errors='replace'),
+        translate=True
+    )
+
+
+def new_marker() -> str:
+    """Unique end marker for one command"""
+    return f"__ANON_CODER_DONE_{uuid4().hex}__"
+
+
+def wrap_command(command: str, marker: str, shell_type: str) -> str:
+    """Append the end marker echo, with exit code and cwd, to a command"""
+    if shell_type.lower().endswith(('cmd', 'cmd.exe')):
+        # %errorlevel% is expanded when its own line is parsed, after the command ran
+        return f"{command}\r\necho {marker} %errorlevel% %cd%\r\n"
+    # the braces make the shell parse the whole line before running anything,
+    # so a command reading stdin can't swallow the marker echo
+    return f"{{ {command}\n}}; printf '%s %s %s\\n' '{marker}' \"$?\" \"$PWD\"\n"
+
+
+class MarkerScanner:
+    """Splits streamed shell output into command output and the end marker line
+
+    The command output goes into a bounded OutputCapture, so `output` is a
+    head/tail summary for large outputs.
+    """
+
+    def __init__(self, marker: str, keep_output: bool = True) -> None:
+        self.marker = marker
+        self.sentinel = re.compile(re.escape(marker) + r" (-?\d+) ([^\n]*)\n")
+        self.keep_output = keep_output
+        self.capture = OutputCapture()
+        self.exit_code: Optional[int] = None
+        self.cwd: Optional[str] = None
+        # unconsumed output, it may hold a marker split across two reads
+        self._pending = ""
+
+    @property
+    def done(self) -> bool:
+        return self.exit_code is not None
+
+    @property
+    def output(self) -> str:
+        return self.capture.summary()
+
+    def result(self, **fields) -> CommandResult:
+        """Close the capture and build the command's result"""
+        self.capture.close()
+        return CommandResult(output=self.capture.summary(), log_id=self.capture.log_id, **fields)
+
+    def feed(self, text: str) -> str:
+        """Consume output, returns the part that is known to be command output"""
+        emitted: List[str] = []
+        pending = self._pending + text
+        while True:
+            index = pending.find(self.marker)
+            if index == -1:
+                # hold back only a tail that could be the start of a split marker
+                safe = len(pending) - self._marker_prefix_length(pending)
+                emitted.append(pending[:safe])
+                pending = pending[safe:]
+                break
+            emitted.append(pending[:index])
+            pending = pending[index:]
+            newline = pending.find('\n')
+            if newline == -1:
+                break
+            match = self.sentinel.match(pending[:newline + 1])
+            if match:
+                self.exit_code = int(match.group(1))
+                self.cwd = match.group(2)
+                pending = ""
+                break
+            # an echoed command line (cmd.exe) rather than the marker itself
+            emitted.append(pending[:newline + 1])
+            pending = pending[newline + 1:]
+        self._pending = pending
+        text = self._emit(''.join(emitted))
+        if self.done:
+            self.capture.close()
+        return text
+
+    def flush(self) -> str:
+        """Give up on the marker, everything held back is output"""
+        pending, self._pending = self._pending, ""
+        return self._emit(pending)
+
+    def _marker_prefix_length(self, text: str) -> int:
+        for length in range(min(len(self.marker) - 1, len(text)), 0, -1):
+            if text.endswith(self.marker[:length]):
+                return length
+        return 0
+
+    def _emit(self, text: str) -> str:
+        if self.keep_output:
+            self.capture.write(text)
+        return text
 
 
 class PersistentShell:
@@ -14,6 +141,8 @@ class PersistentShell:
         self.output_queue = queue.Queue()
         self.input_queue = queue.Queue()
         self.is_running = False
+        # working directory reported by the last command
+        self.cwd: Optional[str] = None
         
     def _detect_shell(self) -> str:
         """Auto-detect appropriate shell"""
@@ -22,20 +151,24 @@ class PersistentShell:
         else:  # Unix-like
             return os.environ.get('SHELL', '/bin/bash')
     
-    def start_session(self):
+    def start_session(self, cwd: Optional[str] = None):
         """Start a new persistent shell session"""
         if self.is_running:
             self.stop_session()
+        # output of a previous session must not leak into this one
+        self.output_queue = queue.Queue()
+        self.cwd = cwd or os.getcwd()
             
-        # Start shell process with pseudo-terminal for interactivity
+        # Start shell process, stdout is read as raw bytes from its file descriptor
         self.process = subprocess.Popen(
             self.shell_type,
             stdin=subprocess.PIPE,
             stdout=subprocess.PIPE,
             stderr=subprocess.STDOUT,
-            text=True,
+            cwd=self.cwd,
             bufsize=0,  # Unbuffered
-            universal_newlines=True
+            # own process group so stopping the session also stops its children
+            start_new_session=os.name != 'nt',
         )
         
         self.is_running = True
@@ -53,117 +186,187 @@ class PersistentShell:
         """Stop current shell session"""
         if self.process and self.is_running:
             self.is_running = False
-            self.process.terminate()
+            self._signal_session(signal.SIGTERM)
             try:
                 self.process.wait(timeout=5)
             except subprocess.TimeoutExpired:
-                self.process.kill()
+                self._signal_session(signal.SIGKILL if os.name != 'nt' else signal.SIGTERM)
             print("✓ Shell session stopped")
     
+    def _signal_session(self, sig: int) -> None:
+        """Signal the shell and, on Unix, every process it started"""
+        try:
+            if os.name != 'nt':
+                os.killpg(self.process.pid, sig)
+            else:
+                self.process.send_signal(sig)
+        except (ProcessLookupError, PermissionError):
+            pass
+    
+    def restart_session(self):
+        """Replace the shell process, keeping the last known working directory"""
+        cwd = self.cwd if self.cwd and os.path.isdir(self.cwd) else None
+        self.stop_session()
+        self.start_session(cwd=cwd)
+    
     def _read_output(self):
-        """Read shell output in background thread"""
-        while self.is_running and self.process.poll() is None:
+        """Read shell output in background thread
+
+        Output is read in chunks of up to READ_CHUNK_SIZE bytes straight from the
+        file descriptor and decoded incrementally, so a multi-byte character or a
+        CRLF pair split across two reads still comes out right.
+        """
+        # bound once, a restarted session gets its own process and queue
+        process = self.process
+        output_queue = self.output_queue
+        fd = process.stdout.fileno()
+        use_select = hasattr(select, 'select') and os.name != 'nt'
+        if use_select:
+            os.set_blocking(fd, False)
+        decoder = make_output_decoder()
+
+        while self.is_running and self.process is process:
             try:
-                # Use select on Unix, polling on Windows
-                if hasattr(select, 'select') and os.name != 'nt':
-                    ready, _, _ = select.select([self.process.stdout], [], [], 0.1)
-                    if ready:
-                        output = self.process.stdout.read(1)
-                        if output:
-                            self.output_queue.put(output)
-                else:
-                    # Windows fallback - read with timeout
-                    output = self.process.stdout.read(1)
-                    if output:
-                        self.output_queue.put(output)
-            except:
+                # Use select on Unix, blocking reads on Windows
+                if use_select:
+                    ready, _, _ = select.select([fd], [], [], 0.1)
+                    if not ready:
+                        if process.poll() is not None:
+                            break
+                        continue
+                try:
+                    data = os.read(fd, READ_CHUNK_SIZE)
+                except BlockingIOError:
+                    continue
+                if not data:
+                    # EOF, the shell exited
+                    break
+                output = decoder.decode(data)
+                if output:
+                    output_queue.put(output)
+            except OSError:
                 break
-    
-    def execute_command(self, command: str, interactive: bool = True) -> str:
+
+        remaining = decoder.decode(b'', final=True)
+        if remaining:
+            output_queue.put(remaining)
+
+    def _drain_output(self, timeout: float = 0.1) -> List[str]:
+        """Wait up to timeout for output and return every chunk queued so far"""
+        try:
+            chunks = [self.output_queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while True:
+            try:
+                chunks.append(self.output_queue.get_nowait())
+            except queue.Empty:
+                return chunks
+
+    def _write_input(self, text: str) -> None:
+        """Send text to the shell's stdin"""
+        self.process.stdin.write(text.encode('utf-8'))
+        self.process.stdin.flush()
+
+    def execute_command(self, command: str, interactive: bool = True, timeout: Optional[float] = None) -> CommandResult:
         """Execute command in persistent shell
         
+        The command is followed by an echo of a unique end marker carrying the
+        exit code and working directory, the call returns as soon as that
+        marker shows up in the output.
+        
         Args:
             command: Shell command to execute
             interactive: If True, allows human interaction for prompts
+            timeout: Seconds to wait for the command, defaults to 30 for
+                non-interactive commands and no limit for interactive ones
         
         Returns:
-            Command output
+            Command output with its exit code and the shell's working directory
         """
         if not self.is_running:
             raise RuntimeError("Shell session not started")
         
-        print(f"$ {command}")
+        if timeout is None and not interactive:
+            timeout = NON_INTERACTIVE_TIMEOUT
         
-        # Send command to shell
-        self.process.stdin.write(command + '\n')
-        self.process.stdin.flush()
+        print(f"$ {command}")
         
-        output_buffer = ""
+        # Send command to shell followed by the end marker
+        marker = new_marker()
+        self._write_input(wrap_command(command, marker, self.shell_type))
         
         if interactive:
-            return self._handle_interactive_command(output_buffer)
+            on_output = lambda text: print(text, end='', flush=True)
         else:
-            return self._handle_non_interactive_command(output_buffer)
+            on_output = None
+        result = self._wait_for_marker(marker, timeout, interactive, on_output)
+        if not interactive:
+            print(result.output)
+        return result
     
-    def _handle_interactive_command(self, output_buffer: str) -> str:
-        """Handle commands that may need user interaction"""
-        import time
+    def run_command(self, command: str, timeout: Optional[float] = None, on_output: Optional[Callable[[str], None]] = None, keep_output: bool = True) -> CommandResult:
+        """Run a command quietly, without prompts and without a default timeout
         
-        last_output_time = time.time()
-        waiting_for_input = False
+        Args:
+            command: Shell command to execute
+            timeout: Seconds to wait before the session is restarted, None waits forever
+            on_output: Called with each piece of output as it arrives
+            keep_output: False when on_output already stores the output, the
+                result's output is then empty and no shell log is written
         
-        while True:
-            # Check for new output
-            while not self.output_queue.empty():
-                char = self.output_queue.get()
-                output_buffer += char
-                print(char, end='', flush=True)
-                last_output_time = time.time()
-                waiting_for_input = False
+        Returns:
+            Command output with its exit code and the shell's working directory
+        """
+        if not self.is_running:
+            raise RuntimeError("Shell session not started")
+        marker = new_marker()
+        self._write_input(wrap_command(command, marker, self.shell_type))
+        return self._wait_for_marker(marker, timeout, False, on_output, keep_output)
+    
+    def _wait_for_marker(self, marker: str, timeout: Optional[float], interactive: bool, on_output: Optional[Callable[[str], None]] = None, keep_output: bool = True) -> CommandResult:
+        """Collect output until the end marker of the command shows up"""
+        scanner = MarkerScanner(marker, keep_output=keep_output)
+        start_time = time.time()
+        last_output_time = start_time
+        
+        def emit(text: str) -> None:
+            if text and on_output is not None:
+                on_output(text)
+        
+        while not scanner.done:
+            if timeout is not None and time.time() - start_time > timeout:
+                emit(scanner.flush())
+                # the command is still running, start over in the same directory
+                self.restart_session()
+                return scanner.result(exit_code=None, cwd=self.cwd, timed_out=True)
             
-            # Check if we might be waiting for user input
-            current_time = time.time()
-            if current_time - last_output_time > 2:  # 2 second timeout
-                if not waiting_for_input:
-                    # Check if last line looks like a prompt
-                    lines = output_buffer.strip().split('\n')
-                    if lines and self._looks_like_prompt(lines[-1]):
-                        waiting_for_input = True
+            # blocks for at most 0.1s
+            new_chunks = self._drain_output()
+            if not new_chunks:
+                if self.process.poll() is not None:
+                    # the command ended the shell itself, e.g. `exit`
+                    emit(scanner.flush())
+                    self.is_running = False
+                    return scanner.result(exit_code=self.process.returncode, cwd=self.cwd)
+                
+                # Check if we might be waiting for user input
+                if interactive and time.time() - last_output_time > 2:  # 2 second idle
+                    last_line = scanner.capture.last_line
+                    if last_line and self._looks_like_prompt(last_line):
                         print("\n[Waiting for input...]")
                         user_input = input()
                         
                         # Send user input to shell
-                        self.process.stdin.write(user_input + '\n')
-                        self.process.stdin.flush()
-                        last_output_time = time.time()
-                        waiting_for_input = False
-                else:
-                    # Command seems to be finished
-                    break
+                        self._write_input(user_input + '\n')
+                    last_output_time = time.time()
+                continue
             
-            time.sleep(0.1)
-        
-        return output_buffer
-    
-    def _handle_non_interactive_command(self, output_buffer: str) -> str:
-        """Handle non-interactive commands with timeout"""
-        import time
-        
-        start_time = time.time()
-        timeout = 30  # 30 second timeout
-        
-        while time.time() - start_time < timeout:
-            while not self.output_queue.empty():
-                output_buffer += self.output_queue.get()
-            
-            # Simple heuristic: if no output for 1 second, assume done
-            if output_buffer and time.time() - start_time > 1:
-                break
-                
-            time.sleep(0.1)
+            last_output_time = time.time()
+            emit(scanner.feed(''.join(new_chunks)))
         
-        print(output_buffer)
-        return output_buffer
+        self.cwd = scanner.cwd
+        return scanner.result(exit_code=scanner.exit_code, cwd=self.cwd)
     
     def _looks_like_prompt(self, line: str) -> bool:
         """Heuristic to detect if line is asking for input"""
@@ -181,9 +384,9 @@ class PersistentShell:
             result = self.execute_command('cd', interactive=False)
         else:
             result = self.execute_command('pwd', interactive=False)
-        return result.strip()
+        return result.cwd or result.output.strip()
     
-    def change_directory(self, path: str) -> str:
+    def change_directory(self, path: str) -> CommandResult:
         """Change directory in persistent shell"""
         return self.execute_command(f'cd "{path}"', interactive=False)
 
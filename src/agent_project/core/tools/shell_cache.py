@@ -0,0 +1,176 @@
+import os
+import shlex
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from .shell import CommandResult
+
+# read-only commands whose result only depends on the workspace, matched on
+# their leading words. Only what the fingerprint can see change is listed:
+# git status, diff and show read tracked file contents, tree and ls -R whole
+# subtrees and pip site-packages, none of which are stat'ed
+CACHEABLE_COMMANDS: Tuple[Tuple[str, ...], ...] = (
+    ("ls",),
+    ("pwd",),
+    ("git", "log"),
+    ("git", "branch"),
+    ("git", "remote"),
+    ("git", "rev-parse"),
+    ("python", "--version"),
+)
+# anything that could chain, redirect or expand into another command
+_UNSAFE_CHARACTERS = set(";&|<>`$(){}*?[]!~\n\\")
+# git files that change with the index, HEAD or refs
+_GIT_STATE_FILES = ("HEAD", "index", "packed-refs", "refs/heads", "FETCH_HEAD")
+
+CacheKey = Tuple[str, str, Tuple]
+
+
+def is_cacheable(command: str) -> bool:
+    """True for a plain allowlisted command without shell syntax"""
+    if _UNSAFE_CHARACTERS.intersection(command):
+        return False
+    try:
+        words = shlex.split(command)
+    except ValueError:
+        return False
+    if words[:1] == ["ls"] and any(_is_recursive_option(word) for word in words[1:]):
+        return False
+    return any(tuple(words[:len(prefix)]) == prefix for prefix in CACHEABLE_COMMANDS)
+
+
+def _is_recursive_option(word: str) -> bool:
+    return word == "--recursive" or (word.startswith("-") and not word.startswith("--") and "R" in word)
+
+
+def _listed_paths(command: str, cwd: str) -> List[str]:
+    """Directories an `ls` lists besides the working directory"""
+    words = shlex.split(command)
+    if words[:1] != ["ls"]:
+        return []
+    return [os.path.join(cwd, word) for word in words[1:] if not word.startswith("-")]
+
+
+def _find_git_dir(path: str) -> Optional[str]:
+    path = os.path.abspath(path)
+    while True:
+        candidate = os.path.join(path, ".git")
+        if os.path.isdir(candidate):
+            return candidate
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+
+
+def _stat_signature(path: str) -> Tuple:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return (path, None)
+    return (path, stat.st_mtime_ns, stat.st_size)
+
+
+def workspace_fingerprint(cwd: str, root: Optional[str] = None) -> Tuple:
+    """Cheap signature of the workspace state, a few stat calls
+
+    Covers the directory the command runs in, the workspace root and the
+    git metadata. Changes deep inside the tree that do not touch these are
+    caught by the write tools invalidating the cache instead.
+    """
+    paths = [cwd]
+    if root and root != cwd:
+        paths.append(root)
+    git_dir = _find_git_dir(cwd)
+    if git_dir is not None:
+        paths.extend(os.path.join(git_dir, name) for name in _GIT_STATE_FILES)
+    return tuple(_stat_signature(path) for path in paths)
+
+
+class ShellResultCache:
+    """Results of idempotent shell commands, reused while the workspace is unchanged
+
+    Entries are keyed by command, working directory and workspace
+    fingerprint and expire after `ttl` seconds. Any command that is not
+    allowlisted and every write tool clears the whole cache, since either
+    may have changed what the cached commands would print.
+    """
+
+    def __init__(self, enabled: bool = False, ttl: float = 60.0, max_entries: int = 256, root: Optional[str] = None) -> None:
+        self.enabled = enabled
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.root = root or os.getcwd()
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[CacheKey, Tuple[float, CommandResult]]" = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, command: str, cwd: str) -> Optional[CommandResult]:
+        if not self.enabled or not is_cacheable(command):
+            return None
+        key = self._key(command, cwd)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def generation(self) -> int:
+        """Changes on every invalidation, pass it to `put` to drop racing results"""
+        return self._generation
+
+    def put(self, command: str, cwd: str, result: CommandResult, generation: Optional[int] = None) -> None:
+        if not self.enabled or not is_cacheable(command):
+            return
+        if result.timed_out or result.exit_code != 0 or result.log_id is not None:
+            return
+        key = self._key(command, cwd)
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                # the workspace was written to while the command ran
+                return
+            self._entries[key] = (time.monotonic(), result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def _key(self, command: str, cwd: str) -> CacheKey:
+        # the listed paths are stat'ed too, an `ls src` sees files added to src
+        listed = tuple(_stat_signature(path) for path in _listed_paths(command, cwd))
+        return (command.strip(), cwd, workspace_fingerprint(cwd, self.root) + listed)
+
+
+_cache = ShellResultCache()
+
+
+def initialize_shell_cache(enabled: bool = False, ttl: float = 60.0, root: Optional[str] = None) -> ShellResultCache:
+    """Initialize the shell result cache singleton instance."""
+    global _cache
+    _cache = ShellResultCache(enabled=enabled, ttl=ttl, root=root)
+    return _cache
+
+
+def get_shell_cache() -> ShellResultCache:
+    """Get the shell result cache, disabled unless initialized with enabled=True."""
+    return _cache
+
+
+def invalidate_shell_cache() -> None:
+    """Forget cached command results, call after anything writes to the workspace"""
+    _cache.invalidate()
@@ -0,0 +1,326 @@
+import atexit
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+from uuid import uuid4
+
+from langchain_core.tools import tool
+from pydantic import BaseModel
+
+from .shell import PersistentShell
+from .shell_cache import invalidate_shell_cache
+from .shell_output import get_shell_log_path
+
+# bytes read per step when looking for the last lines of a job log
+TAIL_BLOCK_SIZE = 8 * 1024
+
+
+class JobInfo(BaseModel):
+    job_id: str
+    command: str
+    cwd: str
+    status: str  # running, finished, failed or killed
+    exit_code: Optional[int] = None
+    started_at: float
+    finished_at: Optional[float] = None
+
+    @property
+    def runtime(self) -> float:
+        return (self.finished_at or time.time()) - self.started_at
+
+
+class ShellJob:
+    """A command running in the background on its own PersistentShell
+
+    Output is appended to the job's shell log as it arrives, so it can be
+    tailed while the command runs and paged through with `read_shell_log`
+    once it is done.
+    """
+
+    def __init__(self, command: str, cwd: Optional[str] = None, shell_type: Optional[str] = None) -> None:
+        self.job_id = uuid4().hex
+        self.command = command
+        self.cwd = cwd or os.getcwd()
+        self.status = "running"
+        self.exit_code: Optional[int] = None
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.log_path = get_shell_log_path(self.job_id)
+        self._shell = PersistentShell(shell_type)
+        self._killed = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+        # the log exists from the start so tailing a silent job works
+        open(self.log_path, 'w', encoding='utf-8').close()
+        self._shell.start_session(cwd=self.cwd)
+        self._thread = threading.Thread(target=self._run, name=f"shell-job-{self.job_id[:8]}", daemon=True)
+        self._thread.start()
+
+    def kill(self) -> bool:
+        """Stop the command and everything it started
+
+        Returns:
+            False when the job had already finished
+        """
+        if self.status != "running":
+            return False
+        self._killed = True
+        self._shell.stop_session()
+        return True
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the job is done, returns False on timeout"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.status != "running"
+
+    def info(self) -> JobInfo:
+        return JobInfo(
+            job_id=self.job_id,
+            command=self.command,
+            cwd=self.cwd,
+            status=self.status,
+            exit_code=self.exit_code,
+            started_at=self.started_at,
+            finished_at=self.finished_at,
+        )
+
+    def tail(self, num_lines: int = 50) -> str:
+        """Last lines of the job's output, read backwards from the end of its log"""
+        if num_lines <= 0:
+            return ""
+        with open(self.log_path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            data = b""
+            # one extra newline so a trailing newline does not count as a line
+            while position > 0 and data.count(b"\n") <= num_lines:
+                step = min(TAIL_BLOCK_SIZE, position)
+                position -= step
+                f.seek(position)
+                data = f.read(step) + data
+        lines = data.decode('utf-8', errors='replace').splitlines(keepends=True)
+        return ''.join(lines[-num_lines:])
+
+    def _run(self) -> None:
+        try:
+            with open(self.log_path, 'a', encoding='utf-8') as log:
+                def write(text: str) -> None:
+                    log.write(text)
+                    log.flush()
+
+                # the job log is the full output, no second copy in a shell log
+                result = self._shell.run_command(self.command, on_output=write, keep_output=False)
+            self.exit_code = result.exit_code
+            if self._killed:
+                self.status = "killed"
+            else:
+                self.status = "finished" if result.exit_code == 0 else "failed"
+        except Exception as e:
+            self.status = "killed" if self._killed else "failed"
+            with open(self.log_path, 'a', encoding='utf-8') as log:
+                log.write(f"\n[job error: {e}]\n")
+        finally:
+            self.finished_at = time.time()
+            if self._shell.is_running:
+                self._shell.stop_session()
+
+
+class JobManager:
+    """Background shell jobs of the application, by job id"""
+
+    def __init__(self, cwd: Optional[str] = None, shell_type: Optional[str] = None) -> None:
+        self.cwd = cwd or os.getcwd()
+        self.shell_type = shell_type
+        self._jobs: Dict[str, ShellJob] = {}
+        self._lock = threading.Lock()
+
+    def start(self, command: str, cwd: Optional[str] = None) -> str:
+        """Start a command in the background
+
+        Returns:
+            The job id used to poll, tail or kill the job
+        """
+        invalidate_shell_cache()
+        job = ShellJob(command, cwd=cwd or self.cwd, shell_type=self.shell_type)
+        with self._lock:
+            self._jobs[job.job_id] = job
+        job.start()
+        return job.job_id
+
+    def get(self, job_id: str) -> ShellJob:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            raise KeyError(f"No background job with id {job_id}")
+        return job
+
+    def status(self, job_id: str) -> JobInfo:
+        return self.get(job_id).info()
+
+    def tail(self, job_id: str, num_lines: int = 50) -> str:
+        return self.get(job_id).tail(num_lines)
+
+    def kill(self, job_id: str) -> bool:
+        return self.get(job_id).kill()
+
+    def list_jobs(self) -> List[JobInfo]:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job.info() for job in jobs]
+
+    def has_running_jobs(self) -> bool:
+        with self._lock:
+            return any(job.status == "running" for job in self._jobs.values())
+
+    def kill_all(self) -> None:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            job.kill()
+
+
+_manager: Optional[JobManager] = None
+_manager_lock = threading.Lock()
+
+
+def initialize_job_manager(cwd: Optional[str] = None) -> JobManager:
+    """Initialize the job manager singleton instance."""
+    global _manager
+    with _manager_lock:
+        if _manager is not None:
+            _manager.kill_all()
+        _manager = JobManager(cwd=cwd)
+        return _manager
+
+
+def get_job_manager() -> JobManager:
+    """Get the job manager instance, created with defaults on first use."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager()
+        return _manager
+
+
+def shutdown_jobs() -> None:
+    """Kill every background job still running"""
+    if _manager is not None:
+        _manager.kill_all()
+
+
+atexit.register(shutdown_jobs)
+
+
+def format_job_info(info: JobInfo) -> str:
+    icons = {"running": "⏳", "finished": "✅", "failed": "❌", "killed": "🛑"}
+    output_parts = [
+        f"{icons.get(info.status, '•')} Job {info.job_id}: {info.status}",
+        f"🔧 Command: {info.command}",
+        f"📁 Directory: {info.cwd}",
+        f"⏱️  Runtime: {info.runtime:.1f}s",
+    ]
+    if info.exit_code is not None:
+        output_parts.append(f"Exit code: {info.exit_code}")
+    return "\n".join(output_parts)
+
+
+@tool
+def start_background_job(command: str, cwd: Optional[str] = None) -> str:
+    """
+    Start a long-running shell command in the background, e.g. a dev server or a long test suite.
+
+    Returns immediately with a job id. Use get_job_status, tail_job_output and kill_job
+    with that id to follow the command. Use use_shell instead for commands that finish quickly.
+
+    Args:
+        command: The shell command to run
+        cwd: Directory to run the command in (default: the workspace root)
+
+    Returns:
+        The job id or error message
+    """
+    try:
+        job_id = get_job_manager().start(command, cwd=cwd)
+        return f"🚀 Started background job {job_id}\n🔧 Command: {command}"
+    except Exception as e:
+        return f"❌ Error starting job '{command}': {e}"
+
+
+@tool
+def get_job_status(job_id: Optional[str] = None) -> str:
+    """
+    Get the status of a background job, or of all jobs when no id is given.
+
+    Args:
+        job_id: The id returned by start_background_job (default: all jobs)
+
+    Returns:
+        Status, runtime and exit code of the job(s) or error message
+    """
+    try:
+        manager = get_job_manager()
+        if job_id:
+            return format_job_info(manager.status(job_id))
+        jobs = manager.list_jobs()
+        if not jobs:
+            return "No background jobs"
+        return "\n\n".join(format_job_info(info) for info in jobs)
+    except KeyError as e:
+        return f"❌ Error: {e.args[0]}"
+    except Exception as e:
+        return f"❌ Error: {e}"
+
+
+@tool
+def tail_job_output(job_id: str, num_lines: int = 50) -> str:
+    """
+    Show the last lines of output of a background job, while it runs or after it finished.
+
+    The full output can be paged through with read_shell_log using the job id.
+
+    Args:
+        job_id: The id returned by start_background_job
+        num_lines: Number of lines to show (default: 50)
+
+    Returns:
+        The job status followed by its last output lines or error message
+    """
+    try:
+        manager = get_job_manager()
+        info = manager.status(job_id)
+        output = manager.tail(job_id, num_lines)
+        header = f"Job {job_id}: {info.status}"
+        if info.exit_code is not None:
+            header += f" (exit code {info.exit_code})"
+        return f"{header}\n📤 Output:\n{output}" if output else f"{header}\n(no output yet)"
+    except KeyError as e:
+        return f"❌ Error: {e.args[0]}"
+    except Exception as e:
+        return f"❌ Error: {e}"
+
+
+@tool
+def kill_job(job_id: str) -> str:
+    """
+    Stop a background job and every process it started.
+
+    Args:
+        job_id: The id returned by start_background_job
+
+    Returns:
+        Confirmation message or error message
+    """
+    try:
+        manager = get_job_manager()
+        if not manager.kill(job_id):
+            return f"Job {job_id} already {manager.status(job_id).status}"
+        manager.get(job_id).wait(timeout=10)
+        return f"🛑 Killed job {job_id}"
+    except KeyError as e:
+        return f"❌ Error: {e.args[0]}"
+    except Exception as e:
+        return f"❌ Error: {e}"
@@ -0,0 +1,211 @@
+import os
+import re
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+from uuid import uuid4
+
+from langchain_core.tools import tool
+
+# lines kept from the start and the end of a command's output
+HEAD_LINES = 40
+TAIL_LINES = 80
+# longer lines are cut in the summary, the log keeps them whole
+MAX_LINE_LENGTH = 1000
+# identical consecutive lines collapsed into one once there are this many
+MIN_REPEATS = 3
+# output kept in memory before it is written to the log file
+SPILL_THRESHOLD = 64 * 1024
+
+_log_dir = "user_space/shell_logs"
+_LOG_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+def set_shell_log_dir(log_dir: str) -> None:
+    """Directory where full command logs are written."""
+    global _log_dir
+    _log_dir = log_dir
+
+
+def get_shell_log_path(log_id: str) -> str:
+    if not _LOG_ID.match(log_id):
+        raise ValueError(f"Invalid log id: {log_id}")
+    return os.path.join(_log_dir, f"{log_id}.log")
+
+
+class OutputCapture:
+    """Fixed-size capture of a command's output
+
+    Keeps the first `head_lines` and a ring buffer of the last `tail_lines`
+    lines, collapses runs of identical lines and cuts very long lines. Once
+    the output is large or the summary loses anything, the full output is
+    written to a log that can be paged through with `read_shell_log`.
+    """
+
+    def __init__(self, head_lines: int = HEAD_LINES, tail_lines: int = TAIL_LINES, max_line_length: int = MAX_LINE_LENGTH) -> None:
+        self.head_lines = head_lines
+        self.max_line_length = max_line_length
+        self.head: List[Tuple[str, int]] = []
+        self.tail: Deque[Tuple[str, int]] = deque(maxlen=tail_lines)
+        self.total_lines = 0
+        self.omitted_lines = 0
+        self.log_id: Optional[str] = None
+        self._lossy = False
+        # current run of identical lines and the unterminated last line
+        self._run: Optional[Tuple[str, int]] = None
+        self._partial: List[str] = []
+        self._partial_length = 0
+        self._partial_dropped = 0
+        self._buffer: Optional[List[str]] = []
+        self._buffered = 0
+        self._log = None
+
+    @property
+    def last_line(self) -> str:
+        """Last line seen so far, used for prompt detection"""
+        if self._partial_length:
+            return ''.join(self._partial)
+        if self._run is not None:
+            return self._run[0]
+        return ""
+
+    def write(self, text: str) -> None:
+        if not text:
+            return
+        self._spill(text)
+        lines = text.split('\n')
+        for piece in lines[:-1]:
+            self._extend_partial(piece)
+            self._add_line(self._partial_line())
+            self._partial = []
+            self._partial_length = 0
+            self._partial_dropped = 0
+        self._extend_partial(lines[-1])
+
+    def close(self) -> None:
+        """Finish the capture, writes the log when the summary is lossy"""
+        if self._run is not None:
+            self._push(self._run)
+            self._run = None
+        if self._partial_dropped:
+            # the unterminated last line is cut in the summary
+            self._lossy = True
+        if self._buffer is not None and self._lossy:
+            self._open_log()
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        self._buffer = None
+
+    def summary(self) -> str:
+        """Head and tail of the output with a pointer to the full log"""
+        rendered = [self._render(entry) for entry in self.head]
+        if self.omitted_lines:
+            rendered.append(f"... [{self.omitted_lines} lines omitted, {self.total_lines} lines in total] ...")
+        rendered.extend(self._render(entry) for entry in self.tail)
+        if self._run is not None:
+            rendered.append(self._render(self._run))
+        text = '\n'.join(rendered)
+        if rendered:
+            text += '\n'
+        if self._partial_length:
+            text += self._partial_line()
+        if self.log_id is not None:
+            if text and not text.endswith('\n'):
+                text += '\n'
+            text += f"[full output saved as shell log {self.log_id}, page through it with read_shell_log]"
+        return text
+
+    def _extend_partial(self, piece: str) -> None:
+        # only the start of an endless line is worth keeping in memory
+        room = max(self.max_line_length - self._partial_length, 0)
+        kept = piece[:room]
+        if kept:
+            self._partial.append(kept)
+            self._partial_length += len(kept)
+        self._partial_dropped += len(piece) - len(kept)
+
+    def _partial_line(self) -> str:
+        line = ''.join(self._partial)
+        if self._partial_dropped:
+            self._lossy = True
+            line += f"… [+{self._partial_dropped} chars]"
+        return line
+
+    def _add_line(self, line: str) -> None:
+        self.total_lines += 1
+        if self._run is not None and self._run[0] == line:
+            self._run = (line, self._run[1] + 1)
+            return
+        if self._run is not None:
+            self._push(self._run)
+        self._run = (line, 1)
+
+    def _push(self, entry: Tuple[str, int]) -> None:
+        line, count = entry
+        if count < MIN_REPEATS:
+            # short runs are kept verbatim
+            for _ in range(count):
+                self._store((line, 1))
+        else:
+            self._lossy = True
+            self._store(entry)
+
+    def _store(self, entry: Tuple[str, int]) -> None:
+        if len(self.head) < self.head_lines:
+            self.head.append(entry)
+            return
+        if len(self.tail) == self.tail.maxlen:
+            self.omitted_lines += self.tail[0][1]
+            self._lossy = True
+        self.tail.append(entry)
+
+    def _render(self, entry: Tuple[str, int]) -> str:
+        line, count = entry
+        return line if count == 1 else f"{line}  [repeated {count} times]"
+
+    def _spill(self, text: str) -> None:
+        if self._log is not None:
+            self._log.write(text)
+            return
+        self._buffer.append(text)
+        self._buffered += len(text)
+        if self._buffered > SPILL_THRESHOLD:
+            self._open_log()
+
+    def _open_log(self) -> None:
+        self.log_id = uuid4().hex
+        os.makedirs(_log_dir, exist_ok=True)
+        self._log = open(get_shell_log_path(self.log_id), 'w', encoding='utf-8')
+        self._log.writelines(self._buffer)
+        self._buffer = None
+
+
+@tool
+def read_shell_log(log_id: str, start_line: int = 1, num_lines: int = 200) -> str:
+    """
+    Page through the full output of a shell command whose output was summarized.
+
+    Args:
+        log_id: The shell log id mentioned at the end of the command output
+        start_line: First line to show, starting at 1 (default: 1)
+        num_lines: Number of lines to show (default: 200)
+
+    Returns:
+        The requested lines prefixed with their line numbers or error message
+    """
+    try:
+        start = max(start_line, 1)
+        lines = []
+        total = 0
+        with open(get_shell_log_path(log_id), 'r', encoding='utf-8', errors='replace') as f:
+            for total, line in enumerate(f, 1):
+                if start <= total < start + num_lines:
+                    lines.append(line)
+        if not lines:
+            return f"No lines at {start}, the log has {total} lines"
+        body = ''.join(f"{start + i}: {line}" for i, line in enumerate(lines))
+        return f"Showing lines {start}-{start + len(lines) - 1} of {total}\n{body}"
+    except FileNotFoundError:
+        return f"❌ Error: no shell log with id {log_id}"
+    except Exception as e:
+        return f"❌ Error: {e}"
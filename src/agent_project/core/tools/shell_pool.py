@@ -0,0 +1,296 @@
+import asyncio
+import atexit
+import itertools
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+from langchain_core.tools import tool
+
+from .async_shell import AsyncShellSession
+from .shell import CommandResult
+from .shell_cache import get_shell_cache, is_cacheable
+from .shell_jobs import get_job_manager
+
+# prefix of sessions handed out to callers that did not ask for a name
+ANONYMOUS_PREFIX = "_pool-"
+# seconds a tool call may run before it is interrupted
+SHELL_TOOL_TIMEOUT = 120
+
+
+class _PooledSession:
+    def __init__(self, session: AsyncShellSession) -> None:
+        self.session = session
+        self.leases = 0
+        self.last_used = time.monotonic()
+
+
+class ShellSessionPool:
+    """Shell sessions leased to tool calls so independent commands run in parallel
+
+    Every session is its own AsyncShellSession with an isolated cwd and
+    environment. Calls naming the same session share its state and run one
+    after another, calls on different sessions run concurrently, at most
+    `max_parallel` at a time. Sessions idle for `idle_timeout` seconds are
+    closed, a named session comes back in its last directory on next use.
+    """
+
+    def __init__(self, max_parallel: int = 4, idle_timeout: float = 300.0, cwd: Optional[str] = None, env: Optional[Dict[str, str]] = None, shell_type: Optional[str] = None) -> None:
+        self.max_parallel = max_parallel
+        self.idle_timeout = idle_timeout
+        self.cwd = cwd or os.getcwd()
+        self.env = env
+        self.shell_type = shell_type
+        self._sessions: Dict[str, _PooledSession] = {}
+        self._last_cwd: Dict[str, str] = {}
+        self._semaphore = asyncio.Semaphore(max_parallel)
+        self._lock = asyncio.Lock()
+        self._anonymous_ids = itertools.count()
+        self._reaper: Optional[asyncio.Task] = None
+
+    @asynccontextmanager
+    async def lease(self, name: Optional[str] = None) -> AsyncIterator[AsyncShellSession]:
+        """Borrow a session, by name or any idle anonymous one"""
+        async with self._semaphore:
+            entry = await self._acquire(name)
+            try:
+                yield entry.session
+            finally:
+                entry.leases -= 1
+                entry.last_used = time.monotonic()
+
+    async def run(self, command: str, session: Optional[str] = None, timeout: Optional[float] = None) -> CommandResult:
+        """Run a command on a leased session"""
+        async with self.lease(session) as shell:
+            return await shell.run(command, timeout=timeout)
+
+    async def reap_idle(self) -> int:
+        """Close sessions that have not been used for idle_timeout seconds
+
+        Returns:
+            Number of sessions closed
+        """
+        now = time.monotonic()
+        async with self._lock:
+            idle = [
+                name for name, entry in self._sessions.items()
+                if entry.leases == 0 and now - entry.last_used >= self.idle_timeout
+            ]
+            entries = [self._sessions.pop(name) for name in idle]
+        for name, entry in zip(idle, entries):
+            self._last_cwd[name] = entry.session.cwd
+            await entry.session.close()
+        return len(entries)
+
+    async def close(self) -> None:
+        """Close every session and stop reaping"""
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        async with self._lock:
+            entries = list(self._sessions.values())
+            self._sessions.clear()
+        for entry in entries:
+            await entry.session.close()
+
+    def session_cwd(self, name: str) -> str:
+        """Last known working directory of a session, without starting it"""
+        entry = self._sessions.get(name)
+        if entry is not None:
+            return entry.session.cwd
+        return self._last_cwd.get(name, self.cwd)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "sessions": len(self._sessions),
+            "busy": sum(1 for entry in self._sessions.values() if entry.leases),
+            "max_parallel": self.max_parallel,
+        }
+
+    async def _acquire(self, name: Optional[str]) -> _PooledSession:
+        async with self._lock:
+            self._ensure_reaper()
+            if name is None:
+                name = next(
+                    (key for key, entry in self._sessions.items()
+                     if key.startswith(ANONYMOUS_PREFIX) and entry.leases == 0),
+                    f"{ANONYMOUS_PREFIX}{next(self._anonymous_ids)}",
+                )
+            entry = self._sessions.get(name)
+            if entry is None or not entry.session.is_running:
+                session = AsyncShellSession(
+                    shell_type=self.shell_type,
+                    cwd=self._last_cwd.get(name, self.cwd),
+                    env=dict(os.environ if self.env is None else self.env),
+                )
+                await session.start()
+                entry = self._sessions[name] = _PooledSession(session)
+            entry.leases += 1
+            entry.last_used = time.monotonic()
+            return entry
+
+    def _ensure_reaper(self) -> None:
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.get_running_loop().create_task(self._reap_forever())
+
+    async def _reap_forever(self) -> None:
+        while True:
+            await asyncio.sleep(max(self.idle_timeout / 2, 1))
+            await self.reap_idle()
+
+
+# The tools are synchronous, the pool lives on its own event loop thread so
+# parallel tool calls from the graph share it.
+_pool: Optional[ShellSessionPool] = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_pool_lock = threading.RLock()
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    if _loop is None:
+        _loop = asyncio.new_event_loop()
+        threading.Thread(target=_loop.run_forever, name="shell-pool", daemon=True).start()
+    return _loop
+
+
+def initialize_shell_pool(max_parallel: int = 4, idle_timeout: float = 300.0, cwd: Optional[str] = None) -> ShellSessionPool:
+    """Initialize the shell pool singleton instance."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            shutdown_shell_pool()
+        _pool = ShellSessionPool(max_parallel=max_parallel, idle_timeout=idle_timeout, cwd=cwd)
+        return _pool
+
+
+def get_shell_pool() -> ShellSessionPool:
+    """Get the shell pool instance, created with defaults on first use."""
+    with _pool_lock:
+        if _pool is None:
+            return initialize_shell_pool()
+        return _pool
+
+
+def run_shell_command(command: str, session: Optional[str] = None, timeout: Optional[float] = SHELL_TOOL_TIMEOUT) -> CommandResult:
+    """Run a command on the shell pool from synchronous code"""
+    pool = get_shell_pool()
+    future = asyncio.run_coroutine_threadsafe(pool.run(command, session=session, timeout=timeout), _get_loop())
+    return future.result()
+
+
+def shutdown_shell_pool() -> None:
+    """Close every pooled session"""
+    global _pool
+    if _pool is not None and _loop is not None:
+        asyncio.run_coroutine_threadsafe(_pool.close(), _loop).result(timeout=10)
+    _pool = None
+
+
+atexit.register(shutdown_shell_pool)
+
+
+def run_cached_shell_command(command: str, session: Optional[str] = None, timeout: Optional[float] = SHELL_TOOL_TIMEOUT) -> Tuple[CommandResult, bool]:
+    """Run a command, reusing the cached result of an idempotent one
+
+    Returns:
+        The result and whether it came from the cache
+    """
+    cache = get_shell_cache()
+    if not is_cacheable(command):
+        # the command may have written anything, before and while it ran
+        cache.invalidate()
+        result = run_shell_command(command, session=session, timeout=timeout)
+        cache.invalidate()
+        return result, False
+
+    cwd = get_shell_pool().session_cwd(session) if session else None
+    # background jobs may change the workspace behind the fingerprint's back
+    if not cache.enabled or cwd is None or get_job_manager().has_running_jobs():
+        return run_shell_command(command, session=session, timeout=timeout), False
+    cached = cache.get(command, cwd)
+    if cached is not None:
+        return cached, True
+    generation = cache.generation()
+    result = run_shell_command(command, session=session, timeout=timeout)
+    cache.put(command, cwd, result, generation=generation)
+    return result, False
+
+
+def format_command_result(command: str, result: CommandResult, cached: bool = False) -> str:
+    output_parts = [f"📁 Executed in: {result.cwd}", f"🔧 Command: {command}"]
+    if result.output:
+        output_parts.append(f"📤 Output:\n{result.output}")
+    if cached:
+        output_parts.append("♻️  Cached result, the workspace has not changed since this command last ran")
+    if result.timed_out:
+        output_parts.append("⏱️  Command was interrupted after reaching its timeout")
+    elif result.exit_code == 0:
+        output_parts.append("✅ Command completed successfully")
+    else:
+        output_parts.append(f"❌ Command failed with exit code: {result.exit_code}")
+    return "\n".join(output_parts)
+
+
+@tool
+def use_shell(command: str, session: str = "main", timeout: int = SHELL_TOOL_TIMEOUT) -> str:
+    """
+    Execute a shell command in a persistent shell session.
+
+    Each session keeps its own working directory and environment variables across calls,
+    so `cd` and `export` carry over to later commands in the same session.
+    Commands in different sessions run in parallel: use separate session names
+    (e.g. "build", "tests", "lint") for independent long-running commands.
+
+    Args:
+        command: The shell command to execute
+        session: Name of the session to run in (default: "main")
+        timeout: Seconds before the command is interrupted (default: 120)
+
+    Returns:
+        The output, exit code and working directory of the command or error message
+    """
+    try:
+        result, cached = run_cached_shell_command(command, session=session, timeout=timeout)
+        return format_command_result(command, result, cached=cached)
+    except Exception as e:
+        return f"❌ Error executing command '{command}': {e}"
+
+
+@tool
+def get_shell_working_directory(session: str = "main") -> str:
+    """
+    Get the current working directory of a shell session.
+
+    Args:
+        session: Name of the session (default: "main")
+
+    Returns:
+        The current working directory path
+    """
+    try:
+        result = run_shell_command("pwd", session=session)
+        return f"📁 Current shell directory: {result.cwd}"
+    except Exception as e:
+        return f"❌ Error: {e}"
+
+
+@tool
+def reset_shell_directory(session: str = "main") -> str:
+    """
+    Reset the working directory of a shell session to the workspace root.
+
+    Args:
+        session: Name of the session (default: "main")
+
+    Returns:
+        Confirmation message with the new directory
+    """
+    try:
+        pool = get_shell_pool()
+        result = run_shell_command(f'cd "{pool.cwd}"', session=session)
+        return f"🔄 Reset shell directory to: {result.cwd}"
+    except Exception as e:
+        return f"❌ Error: {e}"
@@ -1,43 +1,45 @@
-from typing import List
+from typing import List, Optional
 
 from langchain.tools import tool
 
-from ...infrastructure.databases.vector_database import get_vector_store
+from ...infrastructure.databases.async_vector_database import \
+    run_vector_store_call
 
 
 @tool
-def add_texts(texts: List[str]) -> str:
+def add_texts(texts: List[str], kind: str = "memory") -> str:
     """
     Add texts to the Qdrant vector store.
     
     Args:
         texts: List of text strings to add to the vector store
+        kind: What the texts are, e.g. "memory", "note" or "code" (default: "memory")
         
     Returns:
         Success message with count of added texts or error message
     """
     try:
-        vector_store = get_vector_store()
-        return vector_store.add_texts(texts)
+        return run_vector_store_call(lambda store: store.add_texts(texts, kind=kind))
     except Exception as e:
         return f"❌ Error: {e}"
 
 
 @tool
-def similarity_search(text: str, k: int = 2) -> str:
+def similarity_search(text: str, k: int = 2, kind: Optional[str] = None, file_path: Optional[str] = None) -> str:
     """
     Search for similar texts in the vector store.
     
     Args:
         text: The text to search for similar matches
         k: Number of similar texts to return (default: 2)
+        kind: Only search texts of this kind, e.g. "memory" (optional)
+        file_path: Only search texts that came from this file (optional)
         
     Returns:
         List of similar texts with their IDs or error message
     """
     try:
-        vector_store = get_vector_store()
-        return vector_store.similarity_search(text, k)
+        return run_vector_store_call(lambda store: store.similarity_search(text, k, kind=kind, file_path=file_path))
     except Exception as e:
         return f"❌ Error: {e}"
 
@@ -52,11 +54,11 @@ def update_text(point_id: str, new_text: str) -> str:
         new_text: The new text content
         
     Returns:
-        Success message or error message
+        Success message with the new ID of the point, the ID follows the
+        text, or error message
     """
     try:
-        vector_store = get_vector_store()
-        return vector_store.update_text(point_id, new_text)
+        return run_vector_store_call(lambda store: store.update_text(point_id, new_text))
     except Exception as e:
         return f"❌ Error: {e}"
 
@@ -73,7 +75,6 @@ def delete_text(point_id: str) -> str:
         Success message or error message
     """
     try:
-        vector_store = get_vector_store()
-        return vector_store.delete_text(point_id)
+        return run_vector_store_call(lambda store: store.delete_text(point_id))
     except Exception as e:
         return f"❌ Error: {e}"
\ No newline at end of file
@@ -5,6 +5,8 @@ from typing import Optional
 
 from langchain_core.tools import tool
 
+from .shell_cache import invalidate_shell_cache
+
 # Global state to maintain current working directory for PowerShell
 _powershell_working_dir: Optional[str] = None
 
@@ -59,6 +61,8 @@ def use_powershell(powershell_cmd: str) -> str:
         if not _is_powershell_available():
             return "❌ Error: PowerShell is not available on this system. This tool is designed for Windows systems with PowerShell installed."
         
+        # PowerShell commands are not cached, any of them may write to the workspace
+        invalidate_shell_cache()
         current_dir = _get_powershell_working_dir()
         
         # Handle Set-Location (cd) command specially to maintain persistent directory
@@ -0,0 +1,300 @@
+import asyncio
+import logging
+import threading
+import time
+import weakref
+from typing import (Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple,
+                    TypeVar)
+
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.models import Filter, ScoredPoint
+
+from .sparse_vectors import bm25_query_vector
+from .vector_database import (DENSE_VECTOR_NAME, HYBRID_PREFETCH,
+                              ID_CHUNK_SIZE, SPARSE_VECTOR_NAME,
+                              QdrantVectorStore, VectorStoreManager,
+                              build_filter, format_hits, fuse_hits,
+                              get_vector_store_manager)
+
+T = TypeVar("T")
+
+# requests to the vector store in flight at once, per event loop
+DEFAULT_MAX_CONCURRENCY = 8
+
+
+class ThreadedAsyncClient:
+    """Async facade over a synchronous client, every call runs in a worker thread
+
+    Embedded Qdrant and the NumPy backend run in process, their calls are
+    CPU work that only has to leave the event loop. Calls run one at a time
+    since embedded Qdrant is not safe to use from several threads at once,
+    under the manager's client lock which the warm-up thread takes too.
+    The wrapped client belongs to the VectorStoreManager, closing the
+    facade leaves it open.
+    """
+
+    def __init__(self, client: Any, lock: Optional[threading.RLock] = None) -> None:
+        self._client = client
+        self._lock = lock or threading.RLock()
+
+    def __getattr__(self, name: str) -> Callable[..., Awaitable[Any]]:
+        method = getattr(self._client, name)
+
+        async def call(*args: Any, **kwargs: Any) -> Any:
+            return await self.run_sync(method, *args, **kwargs)
+        return call
+
+    async def run_sync(self, function: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run a function that uses the wrapped client, one at a time with the client's calls"""
+        def locked() -> T:
+            with self._lock:
+                return function(*args, **kwargs)
+        return await asyncio.to_thread(locked)
+
+    async def close(self) -> None:
+        pass
+
+
+def create_async_vector_client(manager: VectorStoreManager):
+    """AsyncQdrantClient for a Qdrant server, the manager's own client in a thread otherwise"""
+    options = manager.client_options
+    if options["backend"] == "remote":
+        return AsyncQdrantClient(url=options["host"], api_key=options["api_key"] or None)
+    # embedded databases can only be opened once per process
+    return ThreadedAsyncClient(manager.client, manager.client_lock)
+
+
+class AsyncQdrantVectorStore:
+    """Async handle on one collection, next to the synchronous QdrantVectorStore
+
+    Shares the synchronous handle's embeddings, query cache and collection
+    settings, so both see the same data and invalidate the same cache.
+    Batches are embedded and upserted concurrently and searches can be
+    gathered, with at most `max_concurrency` requests in flight across all
+    handles of the event loop.
+    """
+
+    def __init__(self, store: QdrantVectorStore, client: Any, semaphore: asyncio.Semaphore) -> None:
+        self.store = store
+        self.client = client
+        self._semaphore = semaphore
+
+    @property
+    def collection_name(self) -> str:
+        return self.store.collection_name
+
+    async def add_texts(self, texts: List[str], batch_size: Optional[int] = None, kind: str = "memory", file_path: Optional[str] = None, thread_id: Optional[str] = None) -> str:
+        if not texts:
+            return "No texts provided"
+
+        store = self.store
+        batch_size = batch_size or store.batch_size
+        start = time.perf_counter()
+        try:
+            points = store._identify(texts, kind=kind, file_path=file_path, thread_id=thread_id)
+            existing = await self._existing_ids([point for point, _ in points])
+            new_points = [(point, text) for point, text in points if point not in existing]
+            fields = store._payload_fields(kind=kind, file_path=file_path, thread_id=thread_id)
+            await asyncio.gather(*(
+                self._add_batch(new_points[offset:offset + batch_size], fields)
+                for offset in range(0, len(new_points), batch_size)
+            ))
+            await self._run_sync(store._persist)
+        except Exception as e:
+            return f"Error occurred while adding texts: {e}"
+
+        elapsed = time.perf_counter() - start
+        throughput = len(texts) / elapsed if elapsed > 0 else float("inf")
+        logging.info(f"Added {len(new_points)} of {len(texts)} texts in {elapsed:.2f}s ({throughput:.1f} texts/sec)")
+        message = f"Successfully added {len(new_points)} new memories ({throughput:.1f} texts/sec)"
+        if len(new_points) < len(texts):
+            message += f", {len(texts) - len(new_points)} already stored"
+        return message
+
+    async def similarity_search(self, text: str, k: int = 2, kind: Optional[str] = None, file_path: Optional[str] = None, thread_id: Optional[str] = None, since: Optional[float] = None, until: Optional[float] = None) -> str:
+        if not text:
+            return "No search text provided"
+
+        try:
+            if not await self._collection_exists():
+                return "No similar texts found"
+            query_filter = build_filter(kind=kind, file_path=file_path, thread_id=thread_id, since=since, until=until)
+            return format_hits(await self.search(text, k, query_filter))
+        except Exception as e:
+            return f"Error occurred during similarity search: {e}"
+
+    async def search(self, text: str, k: int = 2, query_filter: Optional[Filter] = None) -> List[ScoredPoint]:
+        cache = self.store.query_cache
+        key = cache.key(self.collection_name, text, k, query_filter)
+        hits = cache.get(key)
+        if hits is not None:
+            return hits
+        generation = cache.generation(self.collection_name)
+        hits = await self._query(text, k, query_filter)
+        cache.put(key, hits, generation)
+        return hits
+
+    async def search_many(self, texts: List[str], k: int = 2, query_filter: Optional[Filter] = None) -> List[List[ScoredPoint]]:
+        """Several searches at once, results in the order of `texts`"""
+        if not await self._collection_exists():
+            return [[] for _ in texts]
+        return list(await asyncio.gather(*(self.search(text, k, query_filter) for text in texts)))
+
+    async def update_text(self, point_id: str, new_text: str) -> str:
+        if not point_id or not new_text:
+            return "Point ID and new text are required"
+
+        try:
+            new_embedding = await self.store.embeddings.aembed_query(new_text)
+            await self._ensure_collection(len(new_embedding))
+            async with self._semaphore:
+                existing = await self.client.retrieve(collection_name=self.collection_name, ids=[point_id], with_payload=True)
+                point = self.store._updated_point(new_text, new_embedding, existing)
+                await self.client.upsert(collection_name=self.collection_name, points=[point])
+                if point.id != point_id:
+                    await self.client.delete(collection_name=self.collection_name, points_selector=[point_id])
+            self.store.query_cache.invalidate(self.collection_name)
+            await self._run_sync(self.store._persist)
+            return f"Point {point_id} updated successfully, new ID: {point.id}"
+        except Exception as e:
+            return f"Error updating point {point_id}: {e}"
+
+    async def delete_text(self, point_id: str) -> str:
+        if not point_id:
+            return "Point ID is required"
+
+        try:
+            async with self._semaphore:
+                await self.client.delete(collection_name=self.collection_name, points_selector=[point_id])
+            self.store.query_cache.invalidate(self.collection_name)
+            await self._run_sync(self.store._persist)
+            return f"Point {point_id} deleted successfully"
+        except Exception as e:
+            return f"Error deleting point {point_id}: {e}"
+
+    async def _add_batch(self, batch: List[Tuple[str, str]], fields: Dict[str, Any]) -> None:
+        async with self._semaphore:
+            embeddings = await self.store.embeddings.aembed_documents([text for _, text in batch])
+            await self._ensure_collection(len(embeddings[0]))
+            await self.client.upsert(
+                collection_name=self.collection_name,
+                points=self.store._point_structs(batch, embeddings, fields)
+            )
+        self.store.query_cache.invalidate(self.collection_name)
+
+    async def _query(self, text: str, k: int, query_filter: Optional[Filter]) -> List[ScoredPoint]:
+        store = self.store
+        encoded = store.query_cache.get_embedding(text)
+        if encoded is None:
+            encoded = await store.embeddings.aembed_query(text)
+            store.query_cache.put_embedding(text, encoded)
+        if not store.hybrid:
+            return await self._query_points(query=encoded, query_filter=query_filter, search_params=store._search_params, limit=k)
+
+        prefetch = max(k, HYBRID_PREFETCH)
+        dense_hits, sparse_hits = await asyncio.gather(
+            self._query_points(query=encoded, using=DENSE_VECTOR_NAME, query_filter=query_filter, search_params=store._search_params, limit=prefetch),
+            self._query_points(query=bm25_query_vector(text), using=SPARSE_VECTOR_NAME, query_filter=query_filter, limit=prefetch),
+        )
+        return fuse_hits(dense_hits, sparse_hits, k)
+
+    async def _query_points(self, **kwargs: Any) -> List[ScoredPoint]:
+        async with self._semaphore:
+            response = await self.client.query_points(collection_name=self.collection_name, **kwargs)
+        return response.points
+
+    async def _collection_exists(self) -> bool:
+        if self.store._collection_ready:
+            return True
+        # also creates the payload indexes of a collection seen for the first time
+        return await self._run_sync(self.store._collection_exists)
+
+    async def _ensure_collection(self, size: int) -> None:
+        if not self.store._collection_ready:
+            await self._run_sync(self.store._ensure_collection, size)
+
+    async def _run_sync(self, function: Callable[..., T], *args: Any) -> T:
+        """Run a call of the synchronous handle, under the lock of an embedded client"""
+        if isinstance(self.client, ThreadedAsyncClient):
+            return await self.client.run_sync(function, *args)
+        return await asyncio.to_thread(function, *args)
+
+    async def _existing_ids(self, ids: List[str]) -> Set[str]:
+        if not ids or not await self._collection_exists():
+            return set()
+
+        async def retrieve(chunk: List[str]) -> List[Any]:
+            async with self._semaphore:
+                return await self.client.retrieve(collection_name=self.collection_name, ids=chunk, with_payload=False)
+        found = await asyncio.gather(*(retrieve(ids[offset:offset + ID_CHUNK_SIZE]) for offset in range(0, len(ids), ID_CHUNK_SIZE)))
+        return {str(record.id) for records in found for record in records}
+
+
+class AsyncVectorStoreManager:
+    """Async handles on the collections of a VectorStoreManager, for one event loop
+
+    One async client and one concurrency limit are shared by every
+    collection. An async client is tied to the loop it was first used on,
+    so each loop gets its own AsyncVectorStoreManager.
+    """
+
+    def __init__(self, manager: VectorStoreManager, max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> None:
+        self.manager = manager
+        self.max_concurrency = max_concurrency
+        self._client = None
+        self._stores: Dict[str, AsyncQdrantVectorStore] = {}
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = create_async_vector_client(self.manager)
+        return self._client
+
+    def get(self, collection_name: Optional[str] = None, **options: Any) -> AsyncQdrantVectorStore:
+        store = self.manager.get(collection_name, **options)
+        handle = self._stores.get(store.collection_name)
+        if handle is None:
+            handle = self._stores[store.collection_name] = AsyncQdrantVectorStore(store, self.client, self._semaphore)
+        return handle
+
+    async def close(self) -> None:
+        client, self._client = self._client, None
+        self._stores.clear()
+        if client is not None:
+            await client.close()
+
+
+_async_managers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncVectorStoreManager]" = weakref.WeakKeyDictionary()
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def get_async_vector_store(collection_name: Optional[str] = None) -> AsyncQdrantVectorStore:
+    """Get the async handle on a collection for the running event loop, the default one unless named."""
+    loop = asyncio.get_running_loop()
+    manager = get_vector_store_manager()
+    async_manager = _async_managers.get(loop)
+    if async_manager is None or async_manager.manager is not manager:
+        async_manager = _async_managers[loop] = AsyncVectorStoreManager(manager)
+    return async_manager.get(collection_name)
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="vector-store", daemon=True).start()
+        return _loop
+
+
+def run_vector_store_call(call: Callable[[AsyncQdrantVectorStore], Awaitable[T]], collection_name: Optional[str] = None) -> T:
+    """Run an async store call from synchronous code, on the vector store's own event loop
+
+    The tools are synchronous, calls from parallel tool invocations share
+    the loop and with it the async client and the concurrency limit.
+    """
+    async def run() -> T:
+        return await call(get_async_vector_store(collection_name))
+    return asyncio.run_coroutine_threadsafe(run(), _get_loop()).result()
@@ -0,0 +1,106 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# hashes looked up per SELECT, well below SQLite's host parameter limit
+LOOKUP_CHUNK_SIZE = 500
+
+
+def embeddings_model_name(embeddings: Embeddings) -> str:
+    """Best effort name of the model behind an Embeddings instance"""
+    for attribute in ("model_name", "model", "model_id", "deployment"):
+        value = getattr(embeddings, attribute, None)
+        if isinstance(value, str) and value:
+            return value
+    return type(embeddings).__name__
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that stores every vector on disk by content hash
+
+    Vectors are kept as float32 blobs in SQLite, keyed by model name and the
+    sha256 of the text, so unchanged texts are never embedded twice, not even
+    across restarts. Query embeddings are cached apart from document
+    embeddings since some models embed the two differently.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache_path: str, model_name: Optional[str] = None) -> None:
+        self.embeddings = embeddings
+        self.model_name = model_name or embeddings_model_name(embeddings)
+        self.cache_path = cache_path
+        self.hits = 0
+        self.misses = 0
+        if os.path.dirname(cache_path):
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        self._conn = sqlite3.connect(cache_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model TEXT NOT NULL,
+                    text_hash BLOB NOT NULL,
+                    vector BLOB NOT NULL,
+                    PRIMARY KEY (model, text_hash)
+                ) WITHOUT ROWID
+            """)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts, self.model_name, self.embeddings.embed_documents)
+
+    def embed_query(self, text: str) -> List[float]:
+        embed = lambda texts: [self.embeddings.embed_query(text) for text in texts]
+        return self._embed([text], f"{self.model_name}#query", embed)[0]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            return {"entries": entries, "hits": self.hits, "misses": self.misses}
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _embed(self, texts: List[str], model: str, embed) -> List[List[float]]:
+        hashes = [hashlib.sha256(text.encode("utf-8")).digest() for text in texts]
+        found = self._lookup(model, hashes)
+
+        missing: Dict[bytes, str] = {}
+        for text_hash, text in zip(hashes, texts):
+            if text_hash not in found:
+                missing.setdefault(text_hash, text)
+        with self._lock:
+            self.hits += len(texts) - sum(1 for text_hash in hashes if text_hash not in found)
+            self.misses += len(missing)
+
+        if missing:
+            vectors = np.asarray(embed(list(missing.values())), dtype=np.float32)
+            rows = []
+            for text_hash, vector in zip(missing, vectors):
+                found[text_hash] = vector
+                rows.append((model, text_hash, vector.tobytes()))
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)",
+                    rows,
+                )
+        # fresh vectors are float32 rounded too, a hit returns exactly what a miss did
+        return [found[text_hash].tolist() for text_hash in hashes]
+
+    def _lookup(self, model: str, hashes: List[bytes]) -> Dict[bytes, np.ndarray]:
+        found: Dict[bytes, np.ndarray] = {}
+        unique = list(dict.fromkeys(hashes))
+        with self._lock:
+            for offset in range(0, len(unique), LOOKUP_CHUNK_SIZE):
+                chunk = unique[offset:offset + LOOKUP_CHUNK_SIZE]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *chunk],
+                )
+                for text_hash, vector in rows:
+                    found[text_hash] = np.frombuffer(vector, dtype=np.float32)
+        return found
@@ -0,0 +1,104 @@
+import json
+import threading
+from typing import Callable, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from .embedding_cache import embeddings_model_name
+
+# output sizes of common models, so a collection can be created without
+# loading the model just to measure one vector
+KNOWN_DIMENSIONS = {
+    "all-mpnet-base-v2": 768,
+    "all-MiniLM-L6-v2": 384,
+    "all-MiniLM-L12-v2": 384,
+    "multi-qa-mpnet-base-dot-v1": 768,
+    "multi-qa-MiniLM-L6-cos-v1": 384,
+    "paraphrase-multilingual-mpnet-base-v2": 768,
+    "bge-small-en-v1.5": 384,
+    "bge-base-en-v1.5": 768,
+    "bge-large-en-v1.5": 1024,
+    "nomic-embed-text-v1.5": 768,
+    "nomic-embed-text": 768,
+    "jina-embeddings-v2-base-code": 768,
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "text-embedding-ada-002": 1536,
+    "models/embedding-001": 768,
+    "models/text-embedding-004": 768,
+}
+
+
+class LazyEmbeddings(Embeddings):
+    """Embeddings whose model is only built on first use
+
+    Loading a sentence-transformer takes seconds, `load` can be called from
+    a background thread to have it ready before the first query.
+    """
+
+    def __init__(self, factory: Callable[[], Embeddings], model_name: str, dimension: Optional[int] = None) -> None:
+        self.factory = factory
+        self.model_name = model_name
+        self.dimension = dimension
+        self._embeddings: Optional[Embeddings] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._embeddings is not None
+
+    def load(self) -> Embeddings:
+        if self._embeddings is None:
+            with self._lock:
+                if self._embeddings is None:
+                    self._embeddings = self.factory()
+        return self._embeddings
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.load().embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.load().embed_query(text)
+
+
+def _dimension_from_hf_cache(model_name: str) -> Optional[int]:
+    """Read the size from a downloaded model's config files, without loading weights"""
+    try:
+        from huggingface_hub import try_to_load_from_cache
+    except ImportError:
+        return None
+    if "/" not in model_name:
+        model_name = f"sentence-transformers/{model_name}"
+    for filename, key in (("1_Pooling/config.json", "word_embedding_dimension"), ("config.json", "hidden_size")):
+        try:
+            path = try_to_load_from_cache(model_name, filename)
+        except Exception:
+            continue
+        if not isinstance(path, str):
+            continue
+        with open(path, encoding="utf-8") as f:
+            value = json.load(f).get(key)
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def embedding_dimension(embeddings: Embeddings) -> Optional[int]:
+    """Vector size of an embeddings model from its metadata, never runs the model
+
+    Returns:
+        The size or None when it can only be known by embedding something
+    """
+    for attribute in ("dimension", "dimensions", "embedding_dimension"):
+        value = getattr(embeddings, attribute, None)
+        if isinstance(value, int) and value > 0:
+            return value
+    # wrappers such as CachedEmbeddings
+    inner = getattr(embeddings, "embeddings", None)
+    if isinstance(inner, Embeddings):
+        dimension = embedding_dimension(inner)
+        if dimension:
+            return dimension
+    model_name = embeddings_model_name(embeddings)
+    dimension = KNOWN_DIMENSIONS.get(model_name) or KNOWN_DIMENSIONS.get(model_name.split("/")[-1])
+    return dimension or _dimension_from_hf_cache(model_name)
@@ -0,0 +1,53 @@
+from typing import Union
+
+import msgpack
+import zstandard
+from langchain_core.messages import BaseMessage, messages_from_dict
+
+# packed messages above this many bytes, mostly tool outputs, are compressed
+COMPRESSION_THRESHOLD = 1024
+COMPRESSION_LEVEL = 3
+
+# first byte of an encoded message
+_PACKED = b"\x00"
+_COMPRESSED = b"\x01"
+
+
+def encode_message(message: BaseMessage) -> bytes:
+    """Every field of a message as msgpack, zstd compressed when large
+
+    Tool calls, tool call ids, names, ids and metadata all survive, so
+    `decode_message` gives back an equal message of the same class.
+    """
+    packed = msgpack.packb({"type": message.type, "data": message.model_dump(mode="json")}, use_bin_type=True)
+    if len(packed) > COMPRESSION_THRESHOLD:
+        compressed = zstandard.ZstdCompressor(level=COMPRESSION_LEVEL).compress(packed)
+        if len(compressed) < len(packed):
+            return _COMPRESSED + compressed
+    return _PACKED + packed
+
+
+def decode_message(blob: Union[bytes, memoryview]) -> BaseMessage:
+    blob = bytes(blob)
+    header, body = blob[:1], blob[1:]
+    if header == _COMPRESSED:
+        body = zstandard.ZstdDecompressor().decompress(body)
+    elif header != _PACKED:
+        raise ValueError(f"Unknown message encoding {header!r}")
+    return messages_from_dict([msgpack.unpackb(body, raw=False)])[0]
+
+
+def message_text(message: BaseMessage) -> str:
+    """Plain text of a message, for listing and search
+
+    Only the text blocks of list content are kept, images and tool blocks
+    are left out. Built here as `BaseMessage.text` is a method in
+    langchain-core 0.3 and a property in 1.x.
+    """
+    if isinstance(message.content, str):
+        return message.content
+    return "".join(
+        block if isinstance(block, str) else block.get("text", "")
+        for block in message.content
+        if isinstance(block, str) or (isinstance(block, dict) and block.get("type") == "text")
+    )
@@ -0,0 +1,570 @@
+import atexit
+import bisect
+import json
+import math
+import os
+import tempfile
+import threading
+import uuid
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+
+import numpy as np
+from qdrant_client.http.models import (CountResult, Distance, FieldCondition,
+                                       Filter, FilterSelector, HasIdCondition,
+                                       MatchAny, MatchValue, Modifier,
+                                       PayloadSchemaType, PointIdsList,
+                                       PointStruct, QueryResponse, Record,
+                                       ScoredPoint, SparseVector,
+                                       SparseVectorParams, UpdateResult,
+                                       UpdateStatus, VectorParams)
+
+PointId = Union[int, str]
+
+# payload index types kept as an inverted index of value to point ids
+_KEYWORD_SCHEMAS = {PayloadSchemaType.KEYWORD.value, PayloadSchemaType.UUID.value, PayloadSchemaType.BOOL.value}
+# payload index types kept as a float column parallel to the vector rows
+_NUMERIC_SCHEMAS = {PayloadSchemaType.INTEGER.value, PayloadSchemaType.FLOAT.value}
+
+
+def _normalize_id(point_id: Any) -> PointId:
+    """Same id forms as Qdrant: unsigned ints or UUIDs in canonical form"""
+    if isinstance(point_id, int):
+        return point_id
+    return str(uuid.UUID(str(point_id)))
+
+
+def _id_order(point_id: PointId) -> Tuple[bool, Any]:
+    # integer ids sort before UUIDs, as in Qdrant
+    return (isinstance(point_id, str), point_id)
+
+
+def _schema_name(field_schema: Any) -> str:
+    """Index type of a PayloadSchemaType, its string or an index params object"""
+    field_schema = getattr(field_schema, "type", field_schema)
+    return getattr(field_schema, "value", field_schema)
+
+
+def _payload_values(payload: Dict[str, Any], key: str) -> List[Any]:
+    """Values of a payload field, a list field matches on any of its elements"""
+    value = payload.get(key)
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _matches(condition: FieldCondition, value: Any) -> bool:
+    match, bounds = condition.match, condition.range
+    if isinstance(match, MatchValue) and value != match.value:
+        return False
+    if isinstance(match, MatchAny) and value not in match.any:
+        return False
+    if bounds is not None:
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return False
+        if (bounds.gt is not None and not value > bounds.gt) or (bounds.gte is not None and not value >= bounds.gte):
+            return False
+        if (bounds.lt is not None and not value < bounds.lt) or (bounds.lte is not None and not value <= bounds.lte):
+            return False
+    return True
+
+
+def _top_k(scores: np.ndarray, limit: int) -> np.ndarray:
+    """Indices of the highest scores, best first, only those are sorted"""
+    limit = min(limit, len(scores))
+    if limit <= 0:
+        return np.zeros(0, dtype=np.int64)
+    top = np.argpartition(-scores, limit - 1)[:limit]
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+class _SparseIndex:
+    """Inverted index of sparse vectors, scored like Qdrant with an optional IDF modifier"""
+
+    def __init__(self, idf: bool) -> None:
+        self.idf = idf
+        self.vectors: Dict[PointId, Dict[int, float]] = {}
+        self.postings: Dict[int, Dict[PointId, float]] = defaultdict(dict)
+
+    def set(self, point_id: PointId, vector: Optional[SparseVector]) -> None:
+        self.remove(point_id)
+        if vector is None:
+            return
+        terms = dict(zip(vector.indices, vector.values))
+        self.vectors[point_id] = terms
+        for term, value in terms.items():
+            self.postings[term][point_id] = value
+
+    def remove(self, point_id: PointId) -> None:
+        for term in self.vectors.pop(point_id, {}):
+            postings = self.postings[term]
+            postings.pop(point_id, None)
+            if not postings:
+                del self.postings[term]
+
+    def search(self, query: SparseVector, total: int) -> Dict[PointId, float]:
+        scores: Dict[PointId, float] = defaultdict(float)
+        for term, weight in zip(query.indices, query.values):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            if self.idf:
+                frequency = len(postings)
+                weight *= math.log(1 + (total - frequency + 0.5) / (frequency + 0.5))
+            for point_id, value in postings.items():
+                scores[point_id] += weight * value
+        return scores
+
+
+class _Collection:
+    """Dense vectors in one growable float32 matrix, payloads in a parallel list
+
+    At most one dense vector and one sparse vector per point, either may
+    be named like in a Qdrant collection with named vectors.
+    """
+
+    def __init__(self, size: int, distance: Distance, vector_name: Optional[str] = None, sparse_name: Optional[str] = None, sparse_idf: bool = False) -> None:
+        if distance not in (Distance.COSINE, Distance.DOT):
+            raise ValueError(f"Unsupported distance for the NumPy backend: {distance}")
+        self.size = size
+        self.distance = distance
+        self.vector_name = vector_name
+        self.sparse_name = sparse_name
+        self.ids: List[PointId] = []
+        self.payloads: List[Dict[str, Any]] = []
+        self.rows: Dict[PointId, int] = {}
+        self.vectors = np.zeros((0, size), dtype=np.float32)
+        self.sparse = _SparseIndex(sparse_idf) if sparse_name else None
+        self.indexes: Dict[str, str] = {}
+        self.keyword_index: Dict[str, Dict[Any, Set[PointId]]] = {}
+        self.numeric_index: Dict[str, np.ndarray] = {}
+
+    @property
+    def count(self) -> int:
+        return len(self.ids)
+
+    def upsert(self, points: List[PointStruct]) -> None:
+        # the last write of an id wins, as in Qdrant
+        latest = {_normalize_id(point.id): point for point in points}
+        parts = [self._split_vector(point.vector) for point in latest.values()]
+        new_vectors = np.asarray([dense for dense, _ in parts], dtype=np.float32).reshape(len(latest), self.size)
+        if self.distance == Distance.COSINE:
+            # unit length once on write, a query is then a single matrix product
+            norms = np.linalg.norm(new_vectors, axis=1, keepdims=True)
+            new_vectors /= np.where(norms == 0, 1, norms)
+        appended = []
+        for (point_id, point), vector, (_, sparse) in zip(latest.items(), new_vectors, parts):
+            row = self.rows.get(point_id)
+            payload = dict(point.payload or {})
+            if row is None:
+                self.rows[point_id] = self.count
+                self.ids.append(point_id)
+                self.payloads.append(payload)
+                appended.append(vector)
+            else:
+                self._unindex_payload(point_id, self.payloads[row])
+                self.vectors[row] = vector
+                self.payloads[row] = payload
+            self._index_payload(point_id, payload)
+            if self.sparse is not None:
+                self.sparse.set(point_id, sparse)
+        if appended:
+            self._grow(len(appended))
+            self.vectors[self.count - len(appended):self.count] = appended
+        for field_name in self.numeric_index:
+            self._refresh_numeric(field_name, [self.rows[point_id] for point_id in latest])
+
+    def delete(self, point_ids: List[PointId]) -> None:
+        for point_id in point_ids:
+            point_id = _normalize_id(point_id)
+            row = self.rows.pop(point_id, None)
+            if row is None:
+                continue
+            if self.sparse is not None:
+                self.sparse.remove(point_id)
+            self._unindex_payload(point_id, self.payloads[row])
+            # move the last row into the gap
+            last = self.count - 1
+            if row != last:
+                self.vectors[row] = self.vectors[last]
+                self.ids[row] = self.ids[last]
+                self.payloads[row] = self.payloads[last]
+                self.rows[self.ids[row]] = row
+                for column in self.numeric_index.values():
+                    column[row] = column[last]
+            self.ids.pop()
+            self.payloads.pop()
+
+    def create_index(self, field_name: str, schema: str) -> None:
+        self.indexes[field_name] = schema
+        self.keyword_index.pop(field_name, None)
+        self.numeric_index.pop(field_name, None)
+        if schema in _KEYWORD_SCHEMAS:
+            self.keyword_index[field_name] = defaultdict(set)
+            for point_id, payload in zip(self.ids, self.payloads):
+                for value in _payload_values(payload, field_name):
+                    self.keyword_index[field_name][value].add(point_id)
+        elif schema in _NUMERIC_SCHEMAS:
+            self.numeric_index[field_name] = np.full(len(self.vectors), np.nan)
+            self._refresh_numeric(field_name, range(self.count))
+
+    def filter_rows(self, query_filter: Optional[Filter]) -> Optional[np.ndarray]:
+        """Rows matching a filter, None when there is no filter"""
+        if query_filter is None:
+            return None
+        return np.flatnonzero(self._mask(query_filter))
+
+    def search(self, query: Any, using: Optional[str], limit: int, query_filter: Optional[Filter] = None) -> List[ScoredPoint]:
+        if self.count == 0 or limit <= 0:
+            return []
+        candidates = self.filter_rows(query_filter)
+        if isinstance(query, SparseVector):
+            if self.sparse is None or using != self.sparse_name:
+                raise ValueError(f"No sparse vector named {using}")
+            found = self.sparse.search(query, self.count)
+            rows = np.fromiter((self.rows[point_id] for point_id in found), dtype=np.int64, count=len(found))
+            scores = np.fromiter(found.values(), dtype=np.float32, count=len(found))
+            if candidates is not None:
+                keep = np.isin(rows, candidates)
+                rows, scores = rows[keep], scores[keep]
+            return [self._scored(rows[i], scores[i]) for i in _top_k(scores, limit)]
+
+        if using != self.vector_name:
+            raise ValueError(f"No dense vector named {using}")
+        vector = np.asarray(query, dtype=np.float32)
+        if self.distance == Distance.COSINE:
+            norm = np.linalg.norm(vector)
+            vector = vector / norm if norm else vector
+        if candidates is None:
+            scores = self.vectors[:self.count] @ vector
+            return [self._scored(row, scores[row]) for row in _top_k(scores, limit)]
+        # only the matching rows are scored
+        scores = self.vectors[candidates] @ vector
+        return [self._scored(candidates[i], scores[i]) for i in _top_k(scores, limit)]
+
+    def to_meta(self) -> Dict[str, Any]:
+        meta = {
+            "size": self.size,
+            "distance": self.distance.value,
+            "vector_name": self.vector_name,
+            "sparse_name": self.sparse_name,
+            "ids": self.ids,
+            "payloads": self.payloads,
+            "indexes": self.indexes,
+        }
+        if self.sparse is not None:
+            meta["sparse_idf"] = self.sparse.idf
+            meta["sparse"] = []
+            for point_id in self.ids:
+                terms = self.sparse.vectors.get(point_id)
+                meta["sparse"].append([list(terms), list(terms.values())] if terms else None)
+        return meta
+
+    @classmethod
+    def from_meta(cls, meta: Dict[str, Any], vectors: np.ndarray) -> "_Collection":
+        collection = cls(
+            meta["size"],
+            Distance(meta["distance"]),
+            vector_name=meta.get("vector_name"),
+            sparse_name=meta.get("sparse_name"),
+            sparse_idf=meta.get("sparse_idf", False),
+        )
+        collection.ids = meta["ids"]
+        collection.payloads = meta["payloads"]
+        collection.rows = {point_id: row for row, point_id in enumerate(collection.ids)}
+        collection.vectors = np.ascontiguousarray(vectors[:len(collection.ids)], dtype=np.float32)
+        if collection.sparse is not None:
+            for point_id, sparse in zip(collection.ids, meta.get("sparse", [])):
+                if sparse is not None:
+                    collection.sparse.set(point_id, SparseVector(indices=sparse[0], values=sparse[1]))
+        for field_name, schema in meta.get("indexes", {}).items():
+            collection.create_index(field_name, schema)
+        return collection
+
+    def _mask(self, query_filter: Filter) -> np.ndarray:
+        mask = np.ones(self.count, dtype=bool)
+        for condition in self._conditions(query_filter.must):
+            mask &= self._condition_mask(condition)
+        should = self._conditions(query_filter.should)
+        if should:
+            any_mask = np.zeros(self.count, dtype=bool)
+            for condition in should:
+                any_mask |= self._condition_mask(condition)
+            mask &= any_mask
+        for condition in self._conditions(query_filter.must_not):
+            mask &= ~self._condition_mask(condition)
+        return mask
+
+    @staticmethod
+    def _conditions(conditions: Any) -> List[Any]:
+        if conditions is None:
+            return []
+        return conditions if isinstance(conditions, list) else [conditions]
+
+    def _condition_mask(self, condition: Any) -> np.ndarray:
+        if isinstance(condition, Filter):
+            return self._mask(condition)
+        mask = np.zeros(self.count, dtype=bool)
+        if isinstance(condition, HasIdCondition):
+            rows = [self.rows.get(_normalize_id(point_id)) for point_id in condition.has_id]
+            mask[[row for row in rows if row is not None]] = True
+            return mask
+        if not isinstance(condition, FieldCondition):
+            raise ValueError(f"Unsupported filter condition for the NumPy backend: {type(condition).__name__}")
+
+        keyword_index = self.keyword_index.get(condition.key)
+        if keyword_index is not None and condition.range is None and isinstance(condition.match, (MatchValue, MatchAny)):
+            values = [condition.match.value] if isinstance(condition.match, MatchValue) else condition.match.any
+            rows = [self.rows[point_id] for value in values for point_id in keyword_index.get(value, ())]
+            mask[rows] = True
+            return mask
+        column = self.numeric_index.get(condition.key)
+        if column is not None and condition.match is None and condition.range is not None:
+            values = column[:self.count]
+            mask[:] = ~np.isnan(values)
+            bounds = condition.range
+            for bound, compare in ((bounds.gt, np.greater), (bounds.gte, np.greater_equal), (bounds.lt, np.less), (bounds.lte, np.less_equal)):
+                if bound is not None:
+                    mask &= compare(values, bound)
+            return mask
+        # not indexed, scan the payloads
+        for row, payload in enumerate(self.payloads):
+            mask[row] = any(_matches(condition, value) for value in _payload_values(payload, condition.key))
+        return mask
+
+    def _index_payload(self, point_id: PointId, payload: Dict[str, Any]) -> None:
+        for field_name, index in self.keyword_index.items():
+            for value in _payload_values(payload, field_name):
+                index[value].add(point_id)
+
+    def _unindex_payload(self, point_id: PointId, payload: Dict[str, Any]) -> None:
+        for field_name, index in self.keyword_index.items():
+            for value in _payload_values(payload, field_name):
+                points = index.get(value)
+                if points is not None:
+                    points.discard(point_id)
+                    if not points:
+                        del index[value]
+
+    def _refresh_numeric(self, field_name: str, rows) -> None:
+        column = self.numeric_index[field_name]
+        if len(column) < len(self.vectors):
+            grown = np.full(len(self.vectors), np.nan)
+            grown[:len(column)] = column
+            column = self.numeric_index[field_name] = grown
+        for row in rows:
+            value = self.payloads[row].get(field_name)
+            numeric = isinstance(value, (int, float)) and not isinstance(value, bool)
+            column[row] = value if numeric else np.nan
+
+    def _split_vector(self, vector: Any):
+        """Dense and sparse part of a point's vector"""
+        if not isinstance(vector, dict):
+            return vector, None
+        return vector[self.vector_name], vector.get(self.sparse_name)
+
+    def _scored(self, row: int, score: float) -> ScoredPoint:
+        return ScoredPoint(id=self.ids[row], version=0, score=float(score), payload=self.payloads[row])
+
+    def _grow(self, extra: int) -> None:
+        needed = self.count
+        if needed > len(self.vectors):
+            capacity = max(needed, 2 * len(self.vectors), 64)
+            grown = np.zeros((capacity, self.size), dtype=np.float32)
+            grown[:needed - extra] = self.vectors[:needed - extra]
+            self.vectors = grown
+
+
+class NumpyVectorClient:
+    """Brute-force vector search in NumPy with the subset of the QdrantClient API we use
+
+    Meant for small collections that fit in memory: every query is one
+    matrix-vector product over all points, sparse vectors are scored
+    through an inverted index. Payload indexes are kept as inverted indexes
+    for keyword fields and float columns for numeric ones, so a filter only
+    scores the matching rows. With a `path` each collection is saved as a
+    `.npy` matrix plus a JSON file of ids and payloads, without one
+    everything lives in memory only.
+
+    Writes only mark a collection as changed, it is saved on `flush()`,
+    `close()` or at interpreter exit. Saving rewrites the whole collection,
+    so doing it once per batch would make indexing quadratic in I/O. Writes
+    since the last flush are lost if the process is killed, QdrantVectorStore
+    flushes at the end of each of its write calls for that reason.
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path
+        self._collections: Dict[str, _Collection] = {}
+        self._lock = threading.RLock()
+        # collections written since they were last saved
+        self._dirty: Set[str] = set()
+        if path:
+            os.makedirs(path, exist_ok=True)
+            self._load_all()
+            atexit.register(self.close)
+
+    def collection_exists(self, collection_name: str) -> bool:
+        return collection_name in self._collections
+
+    def create_collection(
+        self,
+        collection_name: str,
+        vectors_config: Union[VectorParams, Dict[str, VectorParams]],
+        sparse_vectors_config: Optional[Dict[str, SparseVectorParams]] = None,
+        **kwargs: Any,
+    ) -> bool:
+        # index and storage options of Qdrant have no meaning for a brute-force scan
+        vector_name = None
+        if isinstance(vectors_config, dict):
+            if len(vectors_config) != 1:
+                raise ValueError("The NumPy backend supports a single dense vector per point")
+            vector_name, vectors_config = next(iter(vectors_config.items()))
+        sparse_name, sparse_idf = None, False
+        if sparse_vectors_config:
+            if len(sparse_vectors_config) != 1:
+                raise ValueError("The NumPy backend supports a single sparse vector per point")
+            sparse_name, sparse_params = next(iter(sparse_vectors_config.items()))
+            sparse_idf = sparse_params.modifier == Modifier.IDF
+        with self._lock:
+            self._collections[collection_name] = _Collection(
+                vectors_config.size, vectors_config.distance,
+                vector_name=vector_name, sparse_name=sparse_name, sparse_idf=sparse_idf,
+            )
+            self._dirty.add(collection_name)
+        return True
+
+    def delete_collection(self, collection_name: str, **kwargs: Any) -> bool:
+        with self._lock:
+            if self._collections.pop(collection_name, None) is None:
+                return False
+            self._dirty.discard(collection_name)
+            if self.path:
+                for suffix in (".npy", ".json"):
+                    file_path = self._file(collection_name, suffix)
+                    if os.path.exists(file_path):
+                        os.unlink(file_path)
+        return True
+
+    def create_payload_index(self, collection_name: str, field_name: str, field_schema: Any = None, wait: bool = True, **kwargs: Any) -> UpdateResult:
+        with self._lock:
+            self._get(collection_name).create_index(field_name, _schema_name(field_schema or PayloadSchemaType.KEYWORD))
+            self._dirty.add(collection_name)
+        return UpdateResult(operation_id=0, status=UpdateStatus.COMPLETED)
+
+    def upsert(self, collection_name: str, points: List[PointStruct], wait: bool = True, **kwargs: Any) -> UpdateResult:
+        with self._lock:
+            collection = self._get(collection_name)
+            if points:
+                collection.upsert(points)
+                self._dirty.add(collection_name)
+        return UpdateResult(operation_id=0, status=UpdateStatus.COMPLETED)
+
+    def delete(self, collection_name: str, points_selector: Any, wait: bool = True, **kwargs: Any) -> UpdateResult:
+        with self._lock:
+            collection = self._get(collection_name)
+            if isinstance(points_selector, PointIdsList):
+                point_ids = points_selector.points
+            elif isinstance(points_selector, (FilterSelector, Filter)):
+                query_filter = getattr(points_selector, "filter", points_selector)
+                point_ids = [collection.ids[row] for row in collection.filter_rows(query_filter)]
+            else:
+                point_ids = list(points_selector)
+            collection.delete(point_ids)
+            self._dirty.add(collection_name)
+        return UpdateResult(operation_id=0, status=UpdateStatus.COMPLETED)
+
+    def query_points(self, collection_name: str, query: Any, using: Optional[str] = None, query_filter: Optional[Filter] = None, limit: int = 10, **kwargs: Any) -> QueryResponse:
+        with self._lock:
+            return QueryResponse(points=self._get(collection_name).search(query, using, limit, query_filter))
+
+    def retrieve(self, collection_name: str, ids: List[PointId], with_payload: bool = True, **kwargs: Any) -> List[Record]:
+        with self._lock:
+            collection = self._get(collection_name)
+            records = []
+            for point_id in ids:
+                row = collection.rows.get(_normalize_id(point_id))
+                if row is not None:
+                    payload = collection.payloads[row] if with_payload else None
+                    records.append(Record(id=collection.ids[row], payload=payload))
+            return records
+
+    def scroll(
+        self,
+        collection_name: str,
+        scroll_filter: Optional[Filter] = None,
+        limit: int = 10,
+        offset: Optional[PointId] = None,
+        with_payload: bool = True,
+        **kwargs: Any,
+    ) -> Tuple[List[Record], Optional[PointId]]:
+        """A page of points in id order and the id the next page starts at"""
+        with self._lock:
+            collection = self._get(collection_name)
+            rows = collection.filter_rows(scroll_filter)
+            ids = sorted((collection.ids[row] for row in (range(collection.count) if rows is None else rows)), key=_id_order)
+            start = 0 if offset is None else bisect.bisect_left(ids, _id_order(_normalize_id(offset)), key=_id_order)
+            page = ids[start:start + limit]
+            records = [
+                Record(id=point_id, payload=collection.payloads[collection.rows[point_id]] if with_payload else None)
+                for point_id in page
+            ]
+            next_offset = ids[start + limit] if start + limit < len(ids) else None
+            return records, next_offset
+
+    def count(self, collection_name: str, count_filter: Optional[Filter] = None, **kwargs: Any) -> CountResult:
+        with self._lock:
+            collection = self._get(collection_name)
+            if count_filter is None:
+                return CountResult(count=collection.count)
+            return CountResult(count=len(collection.filter_rows(count_filter)))
+
+    def flush(self) -> None:
+        """Save every collection written since it was last saved"""
+        with self._lock:
+            for collection_name in sorted(self._dirty):
+                self._save(collection_name)
+            self._dirty.clear()
+
+    def close(self) -> None:
+        atexit.unregister(self.close)
+        self.flush()
+
+    def _get(self, collection_name: str) -> _Collection:
+        collection = self._collections.get(collection_name)
+        if collection is None:
+            raise ValueError(f"Collection {collection_name} not found")
+        return collection
+
+    def _file(self, collection_name: str, suffix: str) -> str:
+        return os.path.join(self.path, f"{collection_name}{suffix}")
+
+    def _save(self, collection_name: str) -> None:
+        if not self.path:
+            return
+        collection = self._collections[collection_name]
+        meta = collection.to_meta()
+        # vectors first, the JSON file decides how many rows are valid
+        self._write_atomic(self._file(collection_name, ".npy"), lambda f: np.save(f, collection.vectors[:collection.count]))
+        self._write_atomic(self._file(collection_name, ".json"), lambda f: f.write(json.dumps(meta).encode("utf-8")))
+
+    def _write_atomic(self, path: str, write) -> None:
+        fd, temp_path = tempfile.mkstemp(dir=self.path, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+    def _load_all(self) -> None:
+        for name in os.listdir(self.path):
+            if not name.endswith(".json") or name.startswith("."):
+                continue
+            collection_name = name[:-len(".json")]
+            with open(self._file(collection_name, ".json"), encoding="utf-8") as f:
+                meta = json.load(f)
+            vectors = np.load(self._file(collection_name, ".npy"))
+            self._collections[collection_name] = _Collection.from_meta(meta, vectors)
@@ -0,0 +1,125 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Tuple, Union
+
+from qdrant_client.models import Filter, ScoredPoint
+
+QueryKey = Tuple[str, str, int, Optional[str]]
+
+
+def normalize_query(text: str) -> str:
+    """Query text with runs of whitespace collapsed, case is kept as models are case sensitive"""
+    return " ".join(text.split())
+
+
+def filter_key(query_filter: Optional[Filter]) -> Optional[str]:
+    return query_filter.model_dump_json(exclude_none=True) if query_filter is not None else None
+
+
+class QueryCache:
+    """LRU cache of query embeddings and search hits
+
+    Hits are keyed by collection, normalized query, k and filter, and every
+    write to a collection drops that collection's hits. Embeddings only
+    depend on the query text so they survive writes. A per-collection
+    generation lets a search that raced with a write skip storing its
+    now stale hits.
+    """
+
+    def __init__(self, max_entries: int = 256) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.embedding_hits = 0
+        self.embedding_misses = 0
+        self._results: "OrderedDict[QueryKey, List[ScoredPoint]]" = OrderedDict()
+        self._embeddings: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def key(self, collection_name: str, text: str, k: int, query_filter: Optional[Filter] = None) -> QueryKey:
+        return (collection_name, normalize_query(text), k, filter_key(query_filter))
+
+    def get(self, key: QueryKey) -> Optional[List[ScoredPoint]]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            found = self._lookup(self._results, key)
+            if found is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return found
+
+    def put(self, key: QueryKey, hits: List[ScoredPoint], generation: Optional[int] = None) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            if generation is not None and generation != self._generations.get(key[0], 0):
+                # the collection was written to while the search ran
+                return
+            self._store(self._results, key, hits)
+
+    def get_embedding(self, text: str) -> Optional[List[float]]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            found = self._lookup(self._embeddings, normalize_query(text))
+            if found is None:
+                self.embedding_misses += 1
+            else:
+                self.embedding_hits += 1
+            return found
+
+    def put_embedding(self, text: str, embedding: List[float]) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._store(self._embeddings, normalize_query(text), embedding)
+
+    def generation(self, collection_name: str) -> int:
+        """Changes on every write to the collection, pass it to `put`"""
+        return self._generations.get(collection_name, 0)
+
+    def invalidate(self, collection_name: str) -> None:
+        with self._lock:
+            self._generations[collection_name] = self._generations.get(collection_name, 0) + 1
+            for key in [key for key in self._results if key[0] == collection_name]:
+                del self._results[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            for collection_name in {key[0] for key in self._results}:
+                self._generations[collection_name] = self._generations.get(collection_name, 0) + 1
+            self._results.clear()
+            self._embeddings.clear()
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        lookups = self.hits + self.misses
+        embedding_lookups = self.embedding_hits + self.embedding_misses
+        return {
+            "entries": len(self._results),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "embedding_entries": len(self._embeddings),
+            "embedding_hits": self.embedding_hits,
+            "embedding_misses": self.embedding_misses,
+            "embedding_hit_rate": self.embedding_hits / embedding_lookups if embedding_lookups else 0.0,
+        }
+
+    def _lookup(self, entries: OrderedDict, key: Hashable):
+        found = entries.get(key)
+        if found is not None:
+            entries.move_to_end(key)
+        return found
+
+    def _store(self, entries: OrderedDict, key: Hashable, value) -> None:
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
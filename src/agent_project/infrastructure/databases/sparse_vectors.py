@@ -0,0 +1,67 @@
+import hashlib
+import re
+from collections import Counter
+from typing import Dict, Hashable, List, Sequence
+
+from qdrant_client.models import SparseVector
+
+# BM25 term-frequency saturation and length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+# assumed average document length in tokens, keeps document vectors
+# independent of the rest of the collection
+BM25_AVERAGE_LENGTH = 256
+# rank constant of reciprocal rank fusion
+RRF_K = 60
+
+_WORD = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+_CAMEL_PART = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased words, identifiers are also split into their snake/camel case parts
+
+    `parseHttpResponse` yields parsehttpresponse, parse, http and response,
+    so both the exact identifier and its words can match.
+    """
+    tokens = []
+    for word in _WORD.findall(text):
+        lowered = word.lower()
+        tokens.append(lowered)
+        parts = [part.lower() for piece in word.split("_") for part in _CAMEL_PART.findall(piece)]
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+def _term_index(token: str) -> int:
+    # stable across processes, unlike hash()
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=4).digest(), "little")
+
+
+def bm25_document_vector(text: str) -> SparseVector:
+    """Sparse vector of BM25 term weights, the IDF part is applied by the collection"""
+    counts = Counter(_term_index(token) for token in tokenize(text))
+    length = sum(counts.values())
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * length / BM25_AVERAGE_LENGTH)
+    indices = sorted(counts)
+    values = [counts[index] * (BM25_K1 + 1) / (counts[index] + norm) for index in indices]
+    return SparseVector(indices=indices, values=values)
+
+
+def bm25_query_vector(text: str) -> SparseVector:
+    indices = sorted({_term_index(token) for token in tokenize(text)})
+    return SparseVector(indices=indices, values=[1.0] * len(indices))
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Hashable]], k: int = RRF_K) -> Dict[Hashable, float]:
+    """Fuse ranked lists of ids, each id scores the sum of 1 / (k + rank)
+
+    Returns:
+        Fused scores by id, highest first
+    """
+    scores: Dict[Hashable, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, 1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return dict(sorted(scores.items(), key=lambda entry: entry[1], reverse=True))
@@ -1,13 +1,363 @@
+import atexit
+import logging
+import queue
 import sqlite3
-from datetime import datetime
-from typing import List
+import threading
+from datetime import datetime, timezone
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+from uuid import uuid4
 
-from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.messages import (AIMessage, BaseMessage, HumanMessage,
+                                     SystemMessage)
 from pydantic import BaseModel, Field
 
+from .message_codec import decode_message, encode_message, message_text
+
+# applied to every connection. WAL lets reads run next to the writer and
+# with synchronous=NORMAL commits only sync the WAL at checkpoints, a crash
+# can lose the last commits but never corrupts the database
+CONNECTION_PRAGMAS = (
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -16000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA mmap_size = 67108864",
+)
+# most statements the writer thread commits in one transaction
+WRITE_BATCH_SIZE = 256
+# threads per page of list_threads and characters of their last message
+THREAD_PAGE_SIZE = 50
+SNIPPET_LENGTH = 120
+# search hits per page and the tokens of their snippets, matches are marked with **
+SEARCH_PAGE_SIZE = 20
+SEARCH_SNIPPET_TOKENS = 16
+
+Statement = Tuple[str, Tuple[Any, ...]]
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def _now() -> str:
+    """Timestamps are stored as ISO 8601 in UTC with an explicit offset"""
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _initial_schema(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS threads (
+            thread_id TEXT PRIMARY KEY,
+            title TEXT,
+            created_at TEXT NOT NULL
+        );
+        """
+    )
+    # Messages table
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS messages (
+            message_id TEXT PRIMARY KEY,
+            thread_id TEXT NOT NULL,
+            role TEXT NOT NULL CHECK(role IN ('human','ai')),
+            content TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            FOREIGN KEY(thread_id) REFERENCES threads(thread_id) ON DELETE CASCADE
+        );
+        """
+    )
+    # Workspace checkpoints, one per agent turn, and the files recorded in them
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS checkpoints (
+            checkpoint_id TEXT PRIMARY KEY,
+            thread_id TEXT NOT NULL,
+            label TEXT,
+            created_at TEXT NOT NULL,
+            FOREIGN KEY(thread_id) REFERENCES threads(thread_id) ON DELETE CASCADE
+        );
+        """
+    )
+    # blob_path is NULL when the file did not exist at checkpoint time
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS checkpoint_files (
+            checkpoint_id TEXT NOT NULL,
+            path TEXT NOT NULL,
+            blob_path TEXT,
+            PRIMARY KEY (checkpoint_id, path),
+            FOREIGN KEY(checkpoint_id) REFERENCES checkpoints(checkpoint_id) ON DELETE CASCADE
+        );
+        """
+    )
+
+
+def _message_sequence(conn: sqlite3.Connection) -> None:
+    """Order messages by a per-thread counter instead of their timestamp strings"""
+    # threads were stamped with utcnow() and the rest with local now(), all
+    # without offset, so everything is normalized to UTC with an offset
+    conn.execute("UPDATE threads SET created_at = created_at || '+00:00' WHERE created_at NOT LIKE '%+%'")
+    for table in ("messages", "checkpoints"):
+        conn.execute(
+            f"UPDATE {table} SET created_at = strftime('%Y-%m-%dT%H:%M:%f+00:00', created_at, 'utc') "
+            "WHERE created_at NOT LIKE '%+%'"
+        )
+    conn.execute("ALTER TABLE messages ADD COLUMN seq INTEGER")
+    conn.execute(
+        """
+        CREATE TEMP TABLE message_seq AS
+        SELECT rowid AS message_rowid,
+               ROW_NUMBER() OVER (PARTITION BY thread_id ORDER BY created_at, rowid) AS seq
+        FROM messages
+        """
+    )
+    conn.execute("CREATE INDEX temp.idx_message_seq ON message_seq(message_rowid)")
+    conn.execute("UPDATE messages SET seq = (SELECT seq FROM message_seq WHERE message_rowid = messages.rowid)")
+    conn.execute("DROP TABLE temp.message_seq")
+    # a thread's messages are one range scan, already in order
+    conn.execute("CREATE UNIQUE INDEX idx_messages_thread_seq ON messages(thread_id, seq)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_checkpoints_thread ON checkpoints(thread_id, created_at)")
+
+
+def _thread_listing(conn: sqlite3.Connection) -> None:
+    # newest first pages of threads are a range scan
+    conn.execute("CREATE INDEX idx_threads_created ON threads(created_at, thread_id)")
+
+
+def _create_message_search_triggers(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TRIGGER messages_fts_insert AFTER INSERT ON messages BEGIN
+            INSERT INTO messages_fts(rowid, content) VALUES (new.rowid, new.content);
+        END
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER messages_fts_delete AFTER DELETE ON messages BEGIN
+            INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.rowid, old.content);
+        END
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER messages_fts_update AFTER UPDATE OF content ON messages BEGIN
+            INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.rowid, old.content);
+            INSERT INTO messages_fts(rowid, content) VALUES (new.rowid, new.content);
+        END
+        """
+    )
+
+
+def _message_search(conn: sqlite3.Connection) -> None:
+    """Full-text index over message contents, kept in sync by triggers
+
+    The index holds no copy of the text, it points at messages by rowid. A
+    migration that rebuilds the messages table has to run the 'rebuild'
+    command below again.
+    """
+    conn.execute(
+        """
+        CREATE VIRTUAL TABLE messages_fts USING fts5(
+            content, content='messages', content_rowid='rowid', tokenize='porter unicode61'
+        )
+        """
+    )
+    _create_message_search_triggers(conn)
+    conn.execute("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')")
+
+
+def _lossless_messages(conn: sqlite3.Connection) -> None:
+    """Store whole message objects, of every type, next to their text
+
+    SQLite can't drop a CHECK constraint, so the table is rebuilt without
+    the one limiting roles to human and ai. Rowids are kept, now as an
+    explicit INTEGER PRIMARY KEY so VACUUM can't renumber them under the
+    search index. Rows from before have no payload and are read back
+    from their role and text.
+    """
+    conn.execute(
+        """
+        CREATE TABLE messages_new (
+            id INTEGER PRIMARY KEY,
+            message_id TEXT NOT NULL UNIQUE,
+            thread_id TEXT NOT NULL,
+            role TEXT NOT NULL,
+            content TEXT NOT NULL,
+            payload BLOB,
+            created_at TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            FOREIGN KEY(thread_id) REFERENCES threads(thread_id) ON DELETE CASCADE
+        )
+        """
+    )
+    conn.execute(
+        """
+        INSERT INTO messages_new (id, message_id, thread_id, role, content, created_at, seq)
+        SELECT rowid, message_id, thread_id, role, content, created_at, seq FROM messages
+        """
+    )
+    # takes its indexes and triggers along
+    conn.execute("DROP TABLE messages")
+    conn.execute("ALTER TABLE messages_new RENAME TO messages")
+    conn.execute("CREATE UNIQUE INDEX idx_messages_thread_seq ON messages(thread_id, seq)")
+    _create_message_search_triggers(conn)
+    conn.execute("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')")
+
+
+def fts_query(text: str) -> str:
+    """FTS5 query matching messages that contain every word of `text`
+
+    Words are quoted so punctuation and FTS5 operators in user input are
+    searched for literally instead of failing to parse, the last word also
+    matches as a prefix to find results while typing.
+    """
+    words = ['"' + word.replace('"', '""') + '"' for word in text.split()]
+    if words:
+        words[-1] += "*"
+    return " ".join(words)
+
+
+# Schema migrations in order, PRAGMA user_version holds how many have run.
+# Append new ones, never edit or reorder those that shipped.
+MIGRATIONS: List[Callable[[sqlite3.Connection], None]] = [
+    _initial_schema,
+    _message_sequence,
+    _thread_listing,
+    _message_search,
+    _lossless_messages,
+]
+
+
+class ThreadSummary(BaseModel):
+    """A row of the thread listing"""
+
+    thread_id: str
+    title: str
+    created_at: str
+    message_count: int
+    last_message: str = ""
+
+    @property
+    def cursor(self) -> Tuple[str, str]:
+        """Pass the last summary's cursor to list_threads for the next page"""
+        return (self.created_at, self.thread_id)
+
+
+class WriteBehindQueue:
+    """Runs write statements on a dedicated thread and connection
+
+    Statements queue up without waiting on SQLite, the writer thread commits
+    whatever has piled up in one transaction, so a burst of messages costs
+    one commit instead of one each. A failing statement is retried alone so
+    it only loses itself, its error is raised by the next `flush`.
+
+    Every statement gets a ticket, numbered in commit order, so a caller can
+    wait for its own writes with `wait` without waiting on everyone else's.
+    """
+
+    def __init__(self, db_path: str, batch_size: int = WRITE_BATCH_SIZE) -> None:
+        self.batch_size = batch_size
+        self._conn = _connect(db_path)
+        self._queue: "queue.Queue[Optional[Statement]]" = queue.Queue()
+        self._errors: List[Exception] = []
+        self._submitted = 0
+        self._committed = 0
+        self._done = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, sql: str, params: Tuple[Any, ...] = ()) -> int:
+        """Queue a statement, returns its ticket"""
+        with self._done:
+            if not self._thread.is_alive():
+                raise RuntimeError("The database writer is closed")
+            self._submitted += 1
+            # under the lock so tickets follow queue order
+            self._queue.put((sql, params))
+            return self._submitted
+
+    def wait(self, ticket: int) -> None:
+        """Wait until the statement with this ticket and all before it are committed"""
+        with self._done:
+            self._done.wait_for(lambda: self._committed >= ticket or not self._thread.is_alive())
+
+    def flush(self) -> None:
+        """Wait until everything submitted so far is committed"""
+        self.wait(self._submitted)
+        if self._errors:
+            errors, self._errors = self._errors, []
+            raise errors[0]
+
+    def close(self) -> None:
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+            self._conn.close()
+        self.flush()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while batch[-1] is not None and len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            statements = [statement for statement in batch if statement is not None]
+            try:
+                self._commit(statements)
+            finally:
+                with self._done:
+                    self._committed += len(statements)
+                    self._done.notify_all()
+            if batch[-1] is None:
+                return
+
+    def _commit(self, statements: List[Statement]) -> None:
+        if not statements:
+            return
+        try:
+            with self._conn:
+                for sql, params in statements:
+                    self._conn.execute(sql, params)
+            return
+        except sqlite3.Error as e:
+            if len(statements) == 1:
+                logging.error(f"Database write failed: {e}")
+                self._errors.append(e)
+                return
+        for statement in statements:
+            self._commit([statement])
+
+
+class MessageHit(BaseModel):
+    """A message found by search_messages"""
+
+    message_id: str
+    thread_id: str
+    thread_title: str
+    role: str
+    created_at: str
+    snippet: str
+    rank: float
+
 
 class DataBaseManager(BaseModel):
-    """SQLite conversation store for threads and messages."""
+    """SQLite conversation store for threads and messages.
+
+    Writes are handed to a WriteBehindQueue and return immediately. Every
+    thread reads through its own connection, which WAL keeps from blocking
+    on the writer, and a read first waits for the writes its own thread
+    queued, so a thread always sees its own writes. Writes of other threads
+    show up once committed, `flush` waits for all of them. Call `flush` or
+    `close` before exiting.
+    """
 
     db_path: str = Field(default="user_space/history.db")
     
@@ -19,71 +369,138 @@ class DataBaseManager(BaseModel):
         # for validation purposes in  pydantic
         super().__init__(db_path=db_path)
         # Use object.__setattr__ to bypass Pydantic's validation for non-standard types
-        object.__setattr__(self, 'conn', sqlite3.connect(self.db_path, check_same_thread=False))
-        self.conn.execute("PRAGMA foreign_keys = ON;")
-        # for making the outputs like dicts not tuples ( helps in readiablity tuple row[0] , dict is row['thread_id'])
-        self.conn.row_factory = sqlite3.Row
+        object.__setattr__(self, '_local', threading.local())
+        object.__setattr__(self, '_readers', [])
+        object.__setattr__(self, '_readers_lock', threading.Lock())
         self._init_schema()
+        object.__setattr__(self, '_writer', WriteBehindQueue(self.db_path))
+        # queued writes must not die with the daemon writer thread
+        atexit.register(self._writer.close)
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Read-only connection of the calling thread, opened on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = _connect(self.db_path)
+            conn.execute("PRAGMA query_only = ON")
+            # for making the outputs like dicts not tuples ( helps in readiablity tuple row[0] , dict is row['thread_id'])
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+            with self._readers_lock:
+                # threads come and go, their connections are closed with them
+                for thread, reader in [entry for entry in self._readers if not entry[0].is_alive()]:
+                    reader.close()
+                    self._readers.remove((thread, reader))
+                self._readers.append((threading.current_thread(), conn))
+        return conn
+
+    def _read(self) -> sqlite3.Connection:
+        """The thread's connection once the writes it queued are committed"""
+        self._writer.wait(getattr(self._local, "ticket", 0))
+        return self.conn
+
+    def _write(self, sql: str, params: Tuple[Any, ...] = ()) -> None:
+        self._local.ticket = self._writer.submit(sql, params)
 
     def _init_schema(self) -> None:
-        cur = self.conn.cursor()
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS threads (
-                thread_id TEXT PRIMARY KEY,
-                title TEXT,
-                created_at TEXT NOT NULL
-            );
-            """
-        )
-        # Messages table
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS messages (
-                message_id TEXT PRIMARY KEY,
-                thread_id TEXT NOT NULL,
-                role TEXT NOT NULL CHECK(role IN ('human','ai')),
-                content TEXT NOT NULL,
-                created_at TEXT NOT NULL,
-                FOREIGN KEY(thread_id) REFERENCES threads(thread_id) ON DELETE CASCADE
-            );
-            """
-        )
-        self.conn.commit()
+        """Bring the schema up to date, each migration in its own transaction"""
+        conn = _connect(self.db_path)
+        try:
+            # persistent, later connections to the file open in WAL mode too
+            conn.execute("PRAGMA journal_mode = WAL")
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version > len(MIGRATIONS):
+                raise RuntimeError(f"{self.db_path} has schema version {version}, newer than the supported {len(MIGRATIONS)}")
+            for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+                try:
+                    conn.execute("BEGIN")
+                    migration(conn)
+                    conn.execute(f"PRAGMA user_version = {number}")
+                    conn.commit()
+                except BaseException:
+                    conn.rollback()
+                    raise
+        finally:
+            conn.close()
+
+    def schema_version(self) -> int:
+        return self.conn.execute("PRAGMA user_version").fetchone()[0]
+
+    def flush(self) -> None:
+        """Block until every queued write is committed, raises the first write that failed"""
+        self._writer.flush()
 
     def create_thread(self, thread_id: str, title: str) -> None:
         """Create a thread if it doesn't exist."""
-        cur = self.conn.cursor()
-        cur.execute(
+        self._write(
             """
             INSERT OR IGNORE INTO threads (thread_id, title, created_at)
             VALUES (?, ?, ?)
             """,
-            (thread_id, title, datetime.utcnow().isoformat()),
+            (thread_id, title, _now()),
         )
-        self.conn.commit()
         
     def alter_thread_title(self, thread_id: str, title: str) -> None:
-        curr = self.conn.cursor()
-        curr.execute(
+        self._write(
             """
             UPDATE threads SET title = ? WHERE thread_id = ?
             """,
             (title, thread_id)
         )
-        self.conn.commit()
 
     def delete_thread(self, thread_id: str) -> None:
-        cur = self.conn.cursor()
-        cur.execute("DELETE FROM threads WHERE thread_id = ?", (thread_id,))
-        self.conn.commit()
+        self._write("DELETE FROM threads WHERE thread_id = ?", (thread_id,))
 
-    def list_threads(self) -> List[str]:
-        cur = self.conn.cursor()
-        rows = cur.execute(
-            "SELECT thread_id, title FROM threads ORDER BY created_at DESC"
+    def list_threads(self, limit: int = THREAD_PAGE_SIZE, after: Optional[Tuple[str, str]] = None) -> List[ThreadSummary]:
+        """Return a page of threads, newest first, with their message count and last message.
+
+        Pages are keyset paginated, pass the `cursor` of the last thread of a
+        page as `after` to get the next one. Every thread costs two index
+        lookups, so a page takes as long with ten threads as with thousands.
+        """
+        # a separate statement per case, an OR would keep the planner from
+        # seeking to the cursor
+        where, params = ("WHERE (t.created_at, t.thread_id) < (?, ?)", tuple(after)) if after else ("", ())
+        rows = self._read().execute(
+            f"""
+            SELECT t.thread_id, COALESCE(t.title, '') AS title, t.created_at,
+                   (SELECT COUNT(*) FROM messages m WHERE m.thread_id = t.thread_id) AS message_count,
+                   (SELECT substr(m.content, 1, {SNIPPET_LENGTH}) FROM messages m
+                    WHERE m.thread_id = t.thread_id ORDER BY m.seq DESC LIMIT 1) AS last_message
+            FROM threads t
+            {where}
+            ORDER BY t.created_at DESC, t.thread_id DESC
+            LIMIT ?
+            """,
+            (*params, limit),
         ).fetchall()
-        return [f"{row['thread_id']} {row['title']}" for row in rows]
+        return [ThreadSummary(**{**dict(row), "last_message": row["last_message"] or ""}) for row in rows]
+
+    def search_messages(self, query: str, limit: int = SEARCH_PAGE_SIZE, offset: int = 0) -> List[MessageHit]:
+        """Return messages matching every word of `query`, best matches first.
+
+        Ranked by BM25, each hit has a snippet of the message around the
+        matched words, which are marked with **.
+        """
+        match = fts_query(query)
+        if not match:
+            return []
+        rows = self._read().execute(
+            f"""
+            SELECT m.message_id, m.thread_id, COALESCE(t.title, '') AS thread_title, m.role, m.created_at,
+                   snippet(messages_fts, 0, '**', '**', '...', {SEARCH_SNIPPET_TOKENS}) AS snippet,
+                   bm25(messages_fts) AS rank
+            FROM messages_fts
+            JOIN messages m ON m.rowid = messages_fts.rowid
+            JOIN threads t ON t.thread_id = m.thread_id
+            WHERE messages_fts MATCH ?
+            ORDER BY rank
+            LIMIT ? OFFSET ?
+            """,
+            (match, limit, offset),
+        ).fetchall()
+        return [MessageHit(**dict(row)) for row in rows]
 
     def add_human_message(self, thread_id: str, message_id: str, content: str) -> None:
         self._add_message(thread_id, message_id, role="human", content=content)
@@ -92,54 +509,125 @@ class DataBaseManager(BaseModel):
         self._add_message(thread_id, message_id, role="ai", content=content)
 
     def add_message_obj(self, thread_id: str, message_id: str, message: BaseMessage) -> None:
-        if isinstance(message, HumanMessage):
-            self.add_human_message(thread_id, message_id, str(message.content))
-        elif isinstance(message, AIMessage):
-            self.add_ai_message(thread_id, message_id, str(message.content))
-        else:
-            raise ValueError("Unsupported message type. Use HumanMessage or AIMessage.")
-
-    def _add_message(self, thread_id: str, message_id: str, role: str, content: str) -> None:
-        cur = self.conn.cursor()
-        cur.execute(
+        """Store a message of any type with all of its fields, tool calls included."""
+        self._add_message(thread_id, message_id, role=message.type, content=message_text(message), payload=encode_message(message))
+
+    def add_messages(self, thread_id: str, messages: Sequence[BaseMessage]) -> None:
+        """Store messages in order, under their own ids when they have one."""
+        for message in messages:
+            self.add_message_obj(thread_id, message.id or str(uuid4()), message)
+
+    def _add_message(self, thread_id: str, message_id: str, role: str, content: str, payload: Optional[bytes] = None) -> None:
+        self._write(
             """
-            INSERT OR REPLACE INTO messages (message_id, thread_id, role, content, created_at)
-            VALUES (?, ?, ?, ?, ?)
+            INSERT INTO messages (message_id, thread_id, role, content, payload, created_at, seq)
+            VALUES (?, ?, ?, ?, ?, ?, (SELECT COALESCE(MAX(seq), 0) + 1 FROM messages WHERE thread_id = ?))
+            ON CONFLICT(message_id) DO UPDATE SET role = excluded.role, content = excluded.content, payload = excluded.payload
             """,
-            (message_id, thread_id, role, content, datetime.now().isoformat()),
+            (message_id, thread_id, role, content, payload, _now(), thread_id),
         )
-        self.conn.commit()
 
     def get_messages(self, thread_id: str) -> List[BaseMessage]:
-        """Return messages as LangChain message objects (HumanMessage/AIMessage)."""
-        cur = self.conn.cursor()
+        """Return the messages of a thread as LangChain message objects, in one indexed read."""
+        cur = self._read().cursor()
         rows = cur.execute(
             """
-            SELECT role, content
+            SELECT role, content, payload
             FROM messages
             WHERE thread_id = ?
-            ORDER BY created_at ASC
+            ORDER BY seq ASC
             """,
             (thread_id,),
         ).fetchall()
         messages: List[BaseMessage] = []
         for row in rows:
-            if row["role"] == "human":
+            if row["payload"] is not None:
+                messages.append(decode_message(row["payload"]))
+            elif row["role"] == "human":
                 messages.append(HumanMessage(content=row["content"]))
+            elif row["role"] == "system":
+                messages.append(SystemMessage(content=row["content"]))
             else:
                 messages.append(AIMessage(content=row["content"]))
         return messages
 
     def get_raw_messages(self, thread_id: str) -> List[sqlite3.Row]:
         """Return raw message rows for custom needs."""
-        cur = self.conn.cursor()
+        cur = self._read().cursor()
+        return cur.execute(
+            "SELECT * FROM messages WHERE thread_id = ? ORDER BY seq ASC",
+            (thread_id,),
+        ).fetchall()
+
+    def create_checkpoint(self, checkpoint_id: str, thread_id: str, label: str = "") -> None:
+        self._write(
+            """
+            INSERT INTO checkpoints (checkpoint_id, thread_id, label, created_at)
+            VALUES (?, ?, ?, ?)
+            """,
+            (checkpoint_id, thread_id, label, _now()),
+        )
+
+    def add_checkpoint_file(self, checkpoint_id: str, path: str, blob_path: Optional[str]) -> None:
+        self._write(
+            """
+            INSERT OR IGNORE INTO checkpoint_files (checkpoint_id, path, blob_path)
+            VALUES (?, ?, ?)
+            """,
+            (checkpoint_id, path, blob_path),
+        )
+
+    def list_checkpoints(self, thread_id: str) -> List[sqlite3.Row]:
+        """Return checkpoints of a thread, newest first."""
+        cur = self._read().cursor()
         return cur.execute(
-            "SELECT * FROM messages WHERE thread_id = ? ORDER BY created_at ASC",
+            """
+            SELECT c.checkpoint_id, c.label, c.created_at, COUNT(f.path) AS file_count
+            FROM checkpoints c
+            LEFT JOIN checkpoint_files f ON f.checkpoint_id = c.checkpoint_id
+            WHERE c.thread_id = ?
+            GROUP BY c.checkpoint_id
+            ORDER BY c.created_at DESC
+            """,
             (thread_id,),
         ).fetchall()
 
+    def get_checkpoint_files(self, checkpoint_id: str) -> List[sqlite3.Row]:
+        cur = self._read().cursor()
+        return cur.execute(
+            "SELECT path, blob_path FROM checkpoint_files WHERE checkpoint_id = ?",
+            (checkpoint_id,),
+        ).fetchall()
+
     def close(self) -> None:
-        self.conn.close()
+        atexit.unregister(self._writer.close)
+        try:
+            self._writer.close()
+        finally:
+            with self._readers_lock:
+                for _, reader in self._readers:
+                    reader.close()
+                self._readers.clear()
+            self._local = threading.local()
+
+_instance: Optional[DataBaseManager] = None
+
 
 def get_database_manager(db_path: str = "user_space/history.db"):
-    return DataBaseManager(db_path=db_path)
\ No newline at end of file
+    return DataBaseManager(db_path=db_path)
+
+
+def initialize_database(db_path: str = "user_space/history.db") -> DataBaseManager:
+    """Initialize the conversation store singleton instance."""
+    global _instance
+    if _instance is not None:
+        _instance.close()
+    _instance = DataBaseManager(db_path=db_path)
+    return _instance
+
+
+def get_database() -> DataBaseManager:
+    """Get the initialized conversation store instance."""
+    if _instance is None:
+        raise RuntimeError("Database not initialized. Call initialize_database() first.")
+    return _instance
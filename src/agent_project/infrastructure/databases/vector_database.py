@@ -1,105 +1,520 @@
-from typing import List
-from uuid import uuid4
+import hashlib
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from uuid import NAMESPACE_URL, uuid5
 
 from langchain_core.embeddings import Embeddings
 from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, PointStruct, VectorParams
+from qdrant_client.models import (Distance, FieldCondition, Filter,
+                                  HnswConfigDiff, MatchValue, Modifier,
+                                  PayloadSchemaType, PointIdsList, PointStruct,
+                                  QuantizationSearchParams, Range,
+                                  ScalarQuantization, ScalarQuantizationConfig,
+                                  ScalarType, ScoredPoint, SearchParams,
+                                  SparseVectorParams, VectorParams)
+
+from .embedding_cache import CachedEmbeddings
+from .embedding_models import embedding_dimension
+from .numpy_vector_client import NumpyVectorClient
+from .query_cache import QueryCache
+from .sparse_vectors import (bm25_document_vector, bm25_query_vector,
+                             reciprocal_rank_fusion)
+
+# texts embedded per embed_documents call and upserted per request
+DEFAULT_BATCH_SIZE = 64
+# where the points live: a Qdrant server, Qdrant's embedded storage in a
+# local directory, Qdrant in memory or the NumPy brute-force client
+VECTOR_BACKENDS = ("remote", "local", "memory", "numpy")
+# named vectors of a hybrid collection
+DENSE_VECTOR_NAME = "dense"
+SPARSE_VECTOR_NAME = "bm25"
+# candidates taken from each of the dense and sparse rankings before fusion
+HYBRID_PREFETCH = 20
+# structured payload fields next to "text", indexed so filtered searches stay fast
+PAYLOAD_INDEXES = {
+    "kind": PayloadSchemaType.KEYWORD,
+    "file_path": PayloadSchemaType.KEYWORD,
+    "thread_id": PayloadSchemaType.KEYWORD,
+    "timestamp": PayloadSchemaType.FLOAT,
+}
+# embedded Qdrant ignores payload indexes and warns about them
+_BACKENDS_WITH_PAYLOAD_INDEXES = ("remote", "numpy")
+QUANTIZATION_TYPES = ("int8",)
+# int8 range covers this quantile of the vector components, outliers are clipped
+QUANTIZATION_QUANTILE = 0.99
+# candidates fetched with quantized vectors per result, rescored with the originals
+QUANTIZATION_OVERSAMPLING = 2.0
+# embedded Qdrant and the NumPy client search exactly, only a server uses them
+_BACKENDS_WITH_SEARCH_PARAMS = ("remote",)
+DEFAULT_COLLECTION = "app_collection"
+# searches kept by the query cache, 0 disables it
+DEFAULT_QUERY_CACHE_SIZE = 256
+# ids looked up or deleted per request, and points per scroll page
+ID_CHUNK_SIZE = 1000
+_POINT_ID_NAMESPACE = uuid5(NAMESPACE_URL, "agent-project/vector-store")
+
+
+def create_vector_client(backend: str = "remote", host: str = "", api_key: str = "", path: Optional[str] = None):
+    """Client for the given backend, all of them speak the QdrantClient API we use"""
+    if backend == "remote":
+        return QdrantClient(url=host, api_key=api_key or None)
+    if backend == "local":
+        if not path:
+            raise ValueError("The local backend needs a storage path")
+        return QdrantClient(path=path)
+    if backend == "memory":
+        return QdrantClient(location=":memory:")
+    if backend == "numpy":
+        return NumpyVectorClient(path=path)
+    raise ValueError(f"Unknown vector store backend '{backend}', expected one of {', '.join(VECTOR_BACKENDS)}")
+
+
+def collection_options(size: int, quantization: Optional[str] = None, on_disk: bool = False, hnsw_m: Optional[int] = None, hnsw_ef_construct: Optional[int] = None) -> Dict[str, Any]:
+    """Dense vector params and quantization config for a new collection
+    
+    Args:
+        size: Vector size
+        quantization: "int8" keeps a scalar quantized copy of every vector in RAM
+        on_disk: Keep the original float32 vectors on disk instead of in RAM
+        hnsw_m: Edges per node of the HNSW graph, fewer use less memory
+        hnsw_ef_construct: Candidates considered while building the graph
+    
+    Returns:
+        vectors_config and quantization_config for create_collection
+    """
+    if quantization is not None and quantization not in QUANTIZATION_TYPES:
+        raise ValueError(f"Unknown quantization '{quantization}', expected one of {', '.join(QUANTIZATION_TYPES)}")
+    hnsw_config = None
+    if hnsw_m is not None or hnsw_ef_construct is not None:
+        hnsw_config = HnswConfigDiff(m=hnsw_m, ef_construct=hnsw_ef_construct)
+    quantization_config = None
+    if quantization == "int8":
+        quantization_config = ScalarQuantization(
+            scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=QUANTIZATION_QUANTILE, always_ram=True)
+        )
+    return {
+        "vectors_config": VectorParams(size=size, distance=Distance.COSINE, on_disk=on_disk or None, hnsw_config=hnsw_config),
+        "quantization_config": quantization_config,
+    }
+
+
+def point_id(text: str, source: str = "") -> str:
+    """Deterministic point id of a text from a source, adding it twice hits the same point
+    
+    Args:
+        text: The stored text
+        source: Where the text came from, e.g. a file path or thread id,
+            the same text from two sources is stored twice
+    """
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return str(uuid5(_POINT_ID_NAMESPACE, f"{source}\0{digest}"))
+
+
+def build_filter(kind: Optional[str] = None, file_path: Optional[str] = None, thread_id: Optional[str] = None, since: Optional[float] = None, until: Optional[float] = None) -> Optional[Filter]:
+    """Filter on the indexed payload fields, None when nothing is filtered
+    
+    Args:
+        kind: e.g. "memory", "code" or "chat"
+        file_path: Source file of code chunks
+        thread_id: Chat thread the text belongs to
+        since: Earliest timestamp, seconds since the epoch
+        until: Latest timestamp, seconds since the epoch
+    """
+    conditions = [
+        FieldCondition(key=key, match=MatchValue(value=value))
+        for key, value in (("kind", kind), ("file_path", file_path), ("thread_id", thread_id))
+        if value is not None
+    ]
+    if since is not None or until is not None:
+        conditions.append(FieldCondition(key="timestamp", range=Range(gte=since, lte=until)))
+    return Filter(must=conditions) if conditions else None
+
+
+def format_hits(hits: List[ScoredPoint]) -> str:
+    if not hits:
+        return "No similar texts found"
+    return "\n".join(f"ID: {hit.id}, Text: {hit.payload.get('text')}" for hit in hits)
+
+
+def fuse_hits(dense_hits: List[ScoredPoint], sparse_hits: List[ScoredPoint], k: int) -> List[ScoredPoint]:
+    """Top k of the dense and sparse rankings fused with RRF, scored by the fused score"""
+    by_id = {hit.id: hit for hit in sparse_hits + dense_hits}
+    fused = reciprocal_rank_fusion([[hit.id for hit in dense_hits], [hit.id for hit in sparse_hits]])
+    return [
+        by_id[point_id].model_copy(update={"score": score})
+        for point_id, score in list(fused.items())[:k]
+    ]
 
-_instance = None
 
 class QdrantVectorStore:
-    _instance = None
-    collection_name = "app_collection"
-    
-    def __new__(cls, *args, **kwargs):
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-        return cls._instance
-    
-    def __init__(self, host: str, api_key: str, embeddings: Embeddings) -> None:
-        if not hasattr(self, "_initialized"):
-            self.client = QdrantClient(url=host, api_key=api_key)
-            self.embeddings = embeddings
-            self._initialized = True
-            
-            # Initialize collection with sample embedding to get dimension
-            sample_embedding = self.embeddings.embed_query("sample text")
-            self._post_init(len(sample_embedding))
+    """Handle on one collection
+    
+    Standalone it owns its client, from a VectorStoreManager it shares the
+    manager's client, embeddings and query cache with the other collections.
+    """
+    
+    def __init__(self, host: str, api_key: str, embeddings: Embeddings, batch_size: int = DEFAULT_BATCH_SIZE, embedding_cache_path: Optional[str] = None, backend: str = "remote", path: Optional[str] = None, collection_name: str = DEFAULT_COLLECTION, hybrid: bool = False, quantization: Optional[str] = None, on_disk: bool = False, hnsw_m: Optional[int] = None, hnsw_ef_construct: Optional[int] = None, hnsw_ef: Optional[int] = None, query_cache_size: int = DEFAULT_QUERY_CACHE_SIZE, client_factory: Optional[Callable[[], Any]] = None, query_cache: Optional[QueryCache] = None, client_lock: Optional[threading.RLock] = None) -> None:
+        # texts embedded before, e.g. unchanged files on re-index, come from disk
+        if embedding_cache_path:
+            embeddings = CachedEmbeddings(embeddings, embedding_cache_path)
+        self.embeddings = embeddings
+        self.batch_size = batch_size
+        # dense vectors plus BM25 sparse vectors, searched together
+        self.hybrid = hybrid
+        self.collection_name = collection_name
+        # storage options only apply when the collection is created
+        if quantization is not None and quantization not in QUANTIZATION_TYPES:
+            raise ValueError(f"Unknown quantization '{quantization}', expected one of {', '.join(QUANTIZATION_TYPES)}")
+        self._collection_options = {"quantization": quantization, "on_disk": on_disk, "hnsw_m": hnsw_m, "hnsw_ef_construct": hnsw_ef_construct}
+        self._search_params = None
+        if (quantization or hnsw_ef) and backend in _BACKENDS_WITH_SEARCH_PARAMS:
+            self._search_params = SearchParams(
+                hnsw_ef=hnsw_ef,
+                quantization=QuantizationSearchParams(rescore=True, oversampling=QUANTIZATION_OVERSAMPLING) if quantization else None
+            )
+        # repeated searches within a turn skip the embedding and the round trip
+        self.query_cache = query_cache if query_cache is not None else QueryCache(max_entries=query_cache_size)
+        # the client connects and the collection is created on first use
+        self._client_options = {"backend": backend, "host": host, "api_key": api_key, "path": path}
+        self._client_factory = client_factory or (lambda: create_vector_client(**self._client_options))
+        self._client = None
+        self._collection_ready = False
+        self._lock = threading.RLock()
+        # held while the collection is set up, shared with the async facade
+        # of a manager's client since embedded clients are not thread safe
+        self._client_lock = client_lock or threading.RLock()
+    
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._client_factory()
+        return self._client
+    
+    def warm_up(self, background: bool = True) -> Optional[threading.Thread]:
+        """Connect, load the embeddings model and create the collection ahead of first use"""
+        if background:
+            thread = threading.Thread(target=self._warm_up, name="vector-store-warm-up", daemon=True)
+            thread.start()
+            return thread
+        self._warm_up()
+        return None
+    
+    def _warm_up(self) -> None:
+        try:
+            with self._client_lock:
+                self._ensure_collection()
+            load = getattr(self.embeddings, "load", None) or getattr(getattr(self.embeddings, "embeddings", None), "load", None)
+            if load is not None:
+                load()
+        except Exception as e:
+            logging.warning(f"Vector store warm up failed: {e}")
+    
+    def _collection_exists(self) -> bool:
+        if not self._collection_ready:
+            self._collection_ready = self.client.collection_exists(collection_name=self.collection_name)
+            if self._collection_ready:
+                # collections created before the indexes existed get them too
+                self._create_payload_indexes()
+        return self._collection_ready
+    
+    def _ensure_collection(self, size: Optional[int] = None) -> bool:
+        """Create the collection unless it exists, sized from metadata when no vector is at hand
+        
+        Returns:
+            False when the size is not known yet, the collection then waits for the first vector
+        """
+        with self._lock:
+            if self._collection_exists():
+                return True
+            size = size or embedding_dimension(self.embeddings)
+            if not size:
+                return False
+            self._post_init(size)
+            self._collection_ready = True
+            return True
     
     def _post_init(self, size: int):
         if not self.client.collection_exists(collection_name=self.collection_name):
-            self.client.create_collection(
+            options = collection_options(size, **self._collection_options)
+            vectors_config = options["vectors_config"]
+            if self.hybrid:
+                self.client.create_collection(
+                    collection_name=self.collection_name,
+                    vectors_config={DENSE_VECTOR_NAME: vectors_config},
+                    # the collection weights terms by inverse document frequency
+                    sparse_vectors_config={SPARSE_VECTOR_NAME: SparseVectorParams(modifier=Modifier.IDF)},
+                    quantization_config=options["quantization_config"]
+                )
+            else:
+                self.client.create_collection(
+                    collection_name=self.collection_name,
+                    vectors_config=vectors_config,
+                    quantization_config=options["quantization_config"]
+                )
+            self._create_payload_indexes()
+    
+    def _create_payload_indexes(self) -> None:
+        if self._client_options["backend"] not in _BACKENDS_WITH_PAYLOAD_INDEXES:
+            return
+        for field_name, field_schema in PAYLOAD_INDEXES.items():
+            self.client.create_payload_index(
                 collection_name=self.collection_name,
-                vectors_config=VectorParams(size=size, distance=Distance.COSINE)
+                field_name=field_name,
+                field_schema=field_schema
             )
     
-    def add_texts(self, texts: List[str]):
+    def _point_vector(self, text: str, embedding: List[float]):
+        if self.hybrid:
+            return {DENSE_VECTOR_NAME: embedding, SPARSE_VECTOR_NAME: bm25_document_vector(text)}
+        return embedding
+    
+    def add_texts(self, texts: List[str], batch_size: Optional[int] = None, kind: str = "memory", file_path: Optional[str] = None, thread_id: Optional[str] = None):
         if not texts:
             return "No texts provided"
-            
-        encoded: List[tuple] = []
-        for text in texts:
-            embedding = self.embeddings.embed_query(text)
-            encoded.append((text, embedding))
         
+        start = time.perf_counter()
         try:
-            self.client.upsert(
-                collection_name=self.collection_name,
-                points=[
-                    PointStruct(
-                        id=str(uuid4()),
-                        vector=embedding,
-                        payload={"text": text}
-                    )
-                    for text, embedding in encoded
-                ]
-            )
-            return f"Successfully added {len(texts)} new memories"
+            points = self._identify(texts, kind=kind, file_path=file_path, thread_id=thread_id)
+            existing = self._existing_ids([point for point, _ in points])
+            new_points = [(point, text) for point, text in points if point not in existing]
+            self._add(new_points, batch_size, self._payload_fields(kind=kind, file_path=file_path, thread_id=thread_id))
+            self._persist()
         except Exception as e:
             return f"Error occurred while adding texts: {e}"
+        
+        elapsed = time.perf_counter() - start
+        throughput = len(texts) / elapsed if elapsed > 0 else float("inf")
+        logging.info(f"Added {len(new_points)} of {len(texts)} texts in {elapsed:.2f}s ({throughput:.1f} texts/sec)")
+        message = f"Successfully added {len(new_points)} new memories ({throughput:.1f} texts/sec)"
+        if len(new_points) < len(texts):
+            message += f", {len(texts) - len(new_points)} already stored"
+        return message
     
-    def similarity_search(self, text: str, k: int = 2):
-        if not text:
-            return "No search text provided"
-            
+    def reindex(self, texts: List[str], kind: str = "code", file_path: Optional[str] = None, thread_id: Optional[str] = None, batch_size: Optional[int] = None):
+        """Make the stored texts of a source exactly `texts`
+        
+        Unchanged texts keep their points and are not embedded again, new
+        ones are added and texts that vanished from the source are deleted
+        in bulk.
+        
+        Args:
+            texts: Current texts of the source, e.g. the chunks of a file
+            kind: Kind of the texts
+            file_path: The file the texts come from
+            thread_id: The chat thread the texts come from
+        """
+        if file_path is None and thread_id is None:
+            return "A file_path or thread_id is needed to re-index"
+        
         try:
-            encoded: List[float] = self.embeddings.embed_query(text)
-            hits = self.client.search(
+            points = self._identify(texts, kind=kind, file_path=file_path, thread_id=thread_id)
+            current = {point for point, _ in points}
+            stored = self._source_ids(build_filter(kind=kind, file_path=file_path, thread_id=thread_id))
+            new_points = [(point, text) for point, text in points if point not in stored]
+            self._add(new_points, batch_size, self._payload_fields(kind=kind, file_path=file_path, thread_id=thread_id))
+            vanished = list(stored - current)
+            for offset in range(0, len(vanished), ID_CHUNK_SIZE):
+                self.client.delete(
+                    collection_name=self.collection_name,
+                    points_selector=PointIdsList(points=vanished[offset:offset + ID_CHUNK_SIZE])
+                )
+                self.query_cache.invalidate(self.collection_name)
+            self._persist()
+        except Exception as e:
+            return f"Error occurred while re-indexing: {e}"
+        
+        source = file_path or thread_id
+        logging.info(f"Re-indexed {source}: {len(new_points)} added, {len(vanished)} deleted")
+        return f"Re-indexed {source}: {len(new_points)} added, {len(vanished)} deleted, {len(current) - len(new_points)} unchanged"
+    
+    def _identify(self, texts: List[str], kind: str, file_path: Optional[str], thread_id: Optional[str]) -> List[Tuple[str, str]]:
+        """Deterministic ids of texts, without repeats"""
+        source = file_path or thread_id or kind
+        return list({point_id(text, source): text for text in texts}.items())
+    
+    def _existing_ids(self, ids: List[str]) -> Set[str]:
+        if not ids or not self._collection_exists():
+            return set()
+        existing = set()
+        for offset in range(0, len(ids), ID_CHUNK_SIZE):
+            records = self.client.retrieve(
                 collection_name=self.collection_name,
-                query_vector=encoded,
-                limit=k
+                ids=ids[offset:offset + ID_CHUNK_SIZE],
+                with_payload=False
+            )
+            existing.update(str(record.id) for record in records)
+        return existing
+    
+    def _source_ids(self, query_filter: Filter) -> Set[str]:
+        if not self._collection_exists():
+            return set()
+        ids, offset = set(), None
+        while True:
+            records, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=query_filter,
+                limit=ID_CHUNK_SIZE,
+                offset=offset,
+                with_payload=False
+            )
+            ids.update(str(record.id) for record in records)
+            if offset is None:
+                return ids
+    
+    def _add(self, points: List[Tuple[str, str]], batch_size: Optional[int], fields: Dict[str, Any]) -> None:
+        batch_size = batch_size or self.batch_size
+        # embed the next batch while the previous one is being upserted
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="qdrant-upsert") as uploader:
+            pending: Optional[Future] = None
+            for offset in range(0, len(points), batch_size):
+                batch = points[offset:offset + batch_size]
+                embeddings = self.embeddings.embed_documents([text for _, text in batch])
+                if pending is None:
+                    self._ensure_collection(len(embeddings[0]))
+                else:
+                    pending.result()
+                pending = uploader.submit(self._upsert_batch, batch, embeddings, fields)
+            if pending is not None:
+                pending.result()
+    
+    def _payload_fields(self, **fields: Any) -> Dict[str, Any]:
+        payload = {key: value for key, value in fields.items() if value is not None}
+        payload["timestamp"] = time.time()
+        return payload
+    
+    def _upsert_batch(self, points: List[Tuple[str, str]], embeddings: List[List[float]], fields: Dict[str, Any]) -> None:
+        self.client.upsert(
+            collection_name=self.collection_name,
+            points=self._point_structs(points, embeddings, fields)
+        )
+        self.query_cache.invalidate(self.collection_name)
+    
+    def _persist(self) -> None:
+        """Save what a write call changed, for clients that only save on flush
+        
+        Called once at the end of every write call: what was reported as
+        stored survives a crash, and batches are not saved one by one.
+        """
+        if isinstance(self.client, NumpyVectorClient):
+            self.client.flush()
+    
+    def _point_structs(self, points: List[Tuple[str, str]], embeddings: List[List[float]], fields: Dict[str, Any]) -> List[PointStruct]:
+        return [
+            PointStruct(
+                id=point,
+                vector=self._point_vector(text, embedding),
+                payload={"text": text, **fields}
             )
+            for (point, text), embedding in zip(points, embeddings)
+        ]
+    
+    def similarity_search(self, text: str, k: int = 2, kind: Optional[str] = None, file_path: Optional[str] = None, thread_id: Optional[str] = None, since: Optional[float] = None, until: Optional[float] = None):
+        if not text:
+            return "No search text provided"
             
-            if not hits:
+        try:
+            if not self._collection_exists():
+                # nothing was ever added, no need to load the model
                 return "No similar texts found"
-                
-            output = []
-            for hit in hits:
-                output.append(f"ID: {hit.id}, Text: {hit.payload.get('text')}")
-            return "\n".join(output)
+            query_filter = build_filter(kind=kind, file_path=file_path, thread_id=thread_id, since=since, until=until)
+            return format_hits(self._search(text, k, query_filter))
         except Exception as e:
             return f"Error occurred during similarity search: {e}"
 
+    def cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Hit rates of the query cache and, when enabled, the embedding cache"""
+        stats = {"query": self.query_cache.stats()}
+        if isinstance(self.embeddings, CachedEmbeddings):
+            stats["embeddings"] = self.embeddings.stats()
+        return stats
+    
+    def _search(self, text: str, k: int, query_filter: Optional[Filter] = None) -> List[ScoredPoint]:
+        key = self.query_cache.key(self.collection_name, text, k, query_filter)
+        hits = self.query_cache.get(key)
+        if hits is not None:
+            return hits
+        generation = self.query_cache.generation(self.collection_name)
+        hits = self._query(text, k, query_filter)
+        self.query_cache.put(key, hits, generation)
+        return hits
+    
+    def _embed_query(self, text: str) -> List[float]:
+        encoded = self.query_cache.get_embedding(text)
+        if encoded is None:
+            encoded = self.embeddings.embed_query(text)
+            self.query_cache.put_embedding(text, encoded)
+        return encoded
+    
+    def _query(self, text: str, k: int, query_filter: Optional[Filter]) -> List[ScoredPoint]:
+        encoded = self._embed_query(text)
+        if not self.hybrid:
+            return self.client.query_points(
+                collection_name=self.collection_name,
+                query=encoded,
+                query_filter=query_filter,
+                search_params=self._search_params,
+                limit=k
+            ).points
+        
+        # dense finds paraphrases, sparse finds exact identifiers, fuse both rankings
+        prefetch = max(k, HYBRID_PREFETCH)
+        dense_hits = self.client.query_points(
+            collection_name=self.collection_name,
+            query=encoded,
+            using=DENSE_VECTOR_NAME,
+            query_filter=query_filter,
+            search_params=self._search_params,
+            limit=prefetch
+        ).points
+        sparse_hits = self.client.query_points(
+            collection_name=self.collection_name,
+            query=bm25_query_vector(text),
+            using=SPARSE_VECTOR_NAME,
+            query_filter=query_filter,
+            limit=prefetch
+        ).points
+        return fuse_hits(dense_hits, sparse_hits, k)
+    
     def update_text(self, point_id: str, new_text: str):
+        """Replace the text of a point
+        
+        Ids are derived from the text, so the new text is stored under a new
+        point and the old one is deleted, a later re-index of the source
+        then recognizes the text instead of adding it again.
+        """
         if not point_id or not new_text:
             return "Point ID and new text are required"
             
         try:
             new_embedding = self.embeddings.embed_query(new_text)
-            self.client.upsert(
-                collection_name=self.collection_name,
-                points=[
-                    PointStruct(
-                        id=point_id,
-                        vector=new_embedding,
-                        payload={"text": new_text}
-                    )
-                ]
-            )
-            return f"Point {point_id} updated successfully"
+            self._ensure_collection(len(new_embedding))
+            existing = self.client.retrieve(collection_name=self.collection_name, ids=[point_id], with_payload=True)
+            point = self._updated_point(new_text, new_embedding, existing)
+            self.client.upsert(collection_name=self.collection_name, points=[point])
+            if point.id != point_id:
+                self.client.delete(collection_name=self.collection_name, points_selector=[point_id])
+            self.query_cache.invalidate(self.collection_name)
+            self._persist()
+            return f"Point {point_id} updated successfully, new ID: {point.id}"
         except Exception as e:
             return f"Error updating point {point_id}: {e}"
 
+    def _updated_point(self, new_text: str, embedding: List[float], existing: List[Any]) -> PointStruct:
+        # kind, file_path and thread_id stay, the timestamp is refreshed
+        fields = {key: value for key, value in (existing[0].payload or {}).items() if key in PAYLOAD_INDEXES} if existing else {}
+        fields.setdefault("kind", "memory")
+        source = fields.get("file_path") or fields.get("thread_id") or fields["kind"]
+        return PointStruct(
+            id=point_id(new_text, source),
+            vector=self._point_vector(new_text, embedding),
+            payload={"text": new_text, **self._payload_fields(**fields)}
+        )
+    
     def delete_text(self, point_id: str):
         if not point_id:
             return "Point ID is required"
@@ -109,26 +524,122 @@ class QdrantVectorStore:
                 collection_name=self.collection_name,
                 points_selector=[point_id]
             )
+            self.query_cache.invalidate(self.collection_name)
+            self._persist()
             return f"Point {point_id} deleted successfully"
         except Exception as e:
             return f"Error deleting point {point_id}: {e}"
 
 
-def initialize_vector_store(host: str, api_key: str, embeddings: Embeddings, collection_name: str = "app_collection"):
-    """Initialize the vector store singleton instance."""
-    global _instance
-    _instance = QdrantVectorStore(host=host, api_key=api_key, embeddings=embeddings)
-    if collection_name != "app_collection":
-        _instance.collection_name = collection_name
-        # Re-initialize collection with new name if needed
-        sample_embedding = _instance.embeddings.embed_query("sample text")
-        _instance._post_init(len(sample_embedding))
-    return _instance
+class VectorStoreManager:
+    """Per-collection QdrantVectorStore handles over one shared client
+    
+    Memories, code chunks, chat history or the indexes of several
+    workspaces each get their own collection while the process keeps a
+    single connection pool, or a single embedded database which only one
+    client may open. The embeddings model and the query cache, which keys
+    by collection, are shared too. Handles are created on first request
+    and nothing connects before a handle is used.
+    """
+    
+    def __init__(self, host: str, api_key: str, embeddings: Embeddings, batch_size: int = DEFAULT_BATCH_SIZE, embedding_cache_path: Optional[str] = None, backend: str = "remote", path: Optional[str] = None, query_cache_size: int = DEFAULT_QUERY_CACHE_SIZE, default_collection: str = DEFAULT_COLLECTION, **collection_defaults: Any) -> None:
+        """
+        Args:
+            collection_defaults: hybrid, quantization, on_disk, hnsw_m,
+                hnsw_ef_construct and hnsw_ef for every handle, each can be
+                overridden per collection in `get`
+        """
+        if embedding_cache_path:
+            embeddings = CachedEmbeddings(embeddings, embedding_cache_path)
+        self.embeddings = embeddings
+        self.batch_size = batch_size
+        self.default_collection = default_collection
+        self.query_cache = QueryCache(max_entries=query_cache_size)
+        self._client_options = {"backend": backend, "host": host, "api_key": api_key, "path": path}
+        self._collection_defaults = collection_defaults
+        self._client = None
+        self._stores: Dict[str, QdrantVectorStore] = {}
+        self._lock = threading.Lock()
+        # embedded Qdrant is not safe to use from several threads at once,
+        # collection setup and the async facade over the client share this
+        self.client_lock = threading.RLock()
+    
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = create_vector_client(**self._client_options)
+        return self._client
+    
+    @property
+    def client_options(self) -> Dict[str, Any]:
+        """Backend, host, api_key and path the client is created with"""
+        return dict(self._client_options)
+    
+    def get(self, collection_name: Optional[str] = None, **options: Any) -> QdrantVectorStore:
+        """Handle on a collection, the same one on every call
+        
+        Args:
+            collection_name: Defaults to the manager's default collection
+            options: Collection options for a handle that does not exist yet
+        """
+        collection_name = collection_name or self.default_collection
+        with self._lock:
+            store = self._stores.get(collection_name)
+            if store is None:
+                store = QdrantVectorStore(
+                    embeddings=self.embeddings,
+                    batch_size=self.batch_size,
+                    collection_name=collection_name,
+                    client_factory=lambda: self.client,
+                    query_cache=self.query_cache,
+                    client_lock=self.client_lock,
+                    **self._client_options,
+                    **{**self._collection_defaults, **options}
+                )
+                self._stores[collection_name] = store
+            return store
+    
+    def collections(self) -> List[str]:
+        """Names of the collections handed out so far"""
+        with self._lock:
+            return list(self._stores)
+    
+    def close(self) -> None:
+        with self._lock:
+            client, self._client = self._client, None
+            self._stores.clear()
+        if client is not None:
+            client.close()
+
+
+_manager: Optional[VectorStoreManager] = None
 
 
-def get_vector_store():
-    """Get the initialized vector store instance."""
-    global _instance
-    if _instance is None:
+def initialize_vector_store(host: str, api_key: str, embeddings: Embeddings, collection_name: str = DEFAULT_COLLECTION, batch_size: int = DEFAULT_BATCH_SIZE, embedding_cache_path: Optional[str] = None, backend: str = "remote", path: Optional[str] = None, warm_up: bool = False, hybrid: bool = False, quantization: Optional[str] = None, on_disk: bool = False, hnsw_m: Optional[int] = None, hnsw_ef_construct: Optional[int] = None, hnsw_ef: Optional[int] = None, query_cache_size: int = DEFAULT_QUERY_CACHE_SIZE):
+    """Initialize the vector store manager singleton and return its default collection.
+    
+    Nothing is loaded here, with warm_up the client, the collection and the
+    embeddings model are prepared on a background thread.
+    """
+    global _manager
+    if _manager is not None:
+        _manager.close()
+    _manager = VectorStoreManager(host=host, api_key=api_key, embeddings=embeddings, batch_size=batch_size, embedding_cache_path=embedding_cache_path, backend=backend, path=path, query_cache_size=query_cache_size, default_collection=collection_name, hybrid=hybrid, quantization=quantization, on_disk=on_disk, hnsw_m=hnsw_m, hnsw_ef_construct=hnsw_ef_construct, hnsw_ef=hnsw_ef)
+    store = _manager.get()
+    if warm_up:
+        store.warm_up()
+    return store
+
+
+def get_vector_store_manager() -> VectorStoreManager:
+    """Get the initialized vector store manager."""
+    if _manager is None:
         raise RuntimeError("Vector store not initialized. Call initialize_vector_store() first.")
-    return _instance
\ No newline at end of file
+    return _manager
+
+
+def get_vector_store(collection_name: Optional[str] = None) -> QdrantVectorStore:
+    """Get the handle on a collection, the default one unless named."""
+    return get_vector_store_manager().get(collection_name)
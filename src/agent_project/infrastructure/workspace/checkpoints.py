@@ -0,0 +1,178 @@
+import os
+import shutil
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+from uuid import uuid4
+
+from ..databases.sql_database import DataBaseManager
+
+# ioctl number of FICLONE on Linux (copy-on-write clone on btrfs, xfs, ...)
+_FICLONE = 0x40049409
+
+_instance = None
+
+
+def _reflink(src: str, dst: str) -> None:
+    """Clone src into dst sharing extents, raises OSError when unsupported."""
+    if not sys.platform.startswith("linux"):
+        raise OSError("reflinks are only supported on Linux")
+    import fcntl
+
+    with open(src, "rb") as source, open(dst, "wb") as target:
+        fcntl.ioctl(target.fileno(), _FICLONE, source.fileno())
+
+
+def clone_file(src: str, dst: str, hardlink: bool = True) -> str:
+    """Cheapest possible copy of src into dst.
+
+    Tries a reflink first, then a hardlink and finally falls back to a real copy.
+    Hardlinks are only safe because the file tools replace files atomically
+    instead of writing into the existing inode. Pass hardlink=False when dst
+    may be written in place, a hardlink would let those writes reach src.
+
+    Returns:
+        The method used: "reflink", "hardlink" or "copy"
+    """
+    try:
+        _reflink(src, dst)
+        return "reflink"
+    except OSError:
+        if os.path.exists(dst):
+            os.unlink(dst)
+    if not hardlink:
+        shutil.copy2(src, dst)
+        return "copy"
+    try:
+        os.link(src, dst)
+        return "hardlink"
+    except OSError:
+        shutil.copy2(src, dst)
+        return "copy"
+
+
+class WorkspaceCheckpoints:
+    """Undo snapshots that only hold the files the agent is about to modify.
+
+    A checkpoint is opened per agent turn with `begin`, the file tools call
+    `record` before touching a path and `restore` puts every recorded file back.
+    Checkpoint metadata lives in the threads database, file contents under
+    `storage_dir/<thread_id>/<checkpoint_id>/`.
+    """
+
+    def __init__(self, database: DataBaseManager, storage_dir: str = "user_space/checkpoints") -> None:
+        self.database = database
+        self.storage_dir = Path(storage_dir)
+        self.thread_id: Optional[str] = None
+        self.checkpoint_id: Optional[str] = None
+        self._label = ""
+        self._recorded: Dict[str, Optional[str]] = {}
+        self._created = False
+        self._lock = threading.Lock()
+
+    def begin(self, thread_id: str, label: str = "") -> str:
+        """Open a new checkpoint for the thread, it is persisted on the first recorded file."""
+        with self._lock:
+            self.thread_id = thread_id
+            self.checkpoint_id = str(uuid4())
+            self._label = label
+            self._recorded = {}
+            self._created = False
+            return self.checkpoint_id
+
+    def record(self, path: str) -> None:
+        """Snapshot a file before it gets modified, only the first call per path counts."""
+        with self._lock:
+            if self.checkpoint_id is None:
+                return
+            target = os.path.abspath(path)
+            if target in self._recorded:
+                return
+
+            if not self._created:
+                self.database.create_checkpoint(self.checkpoint_id, self.thread_id, self._label)
+                self._created = True
+
+            blob_path = None
+            if os.path.isfile(target):
+                blob_dir = self.storage_dir / self.thread_id / self.checkpoint_id
+                blob_dir.mkdir(parents=True, exist_ok=True)
+                blob_path = str(blob_dir / str(len(self._recorded)))
+                clone_file(target, blob_path)
+
+            self._recorded[target] = blob_path
+            self.database.add_checkpoint_file(self.checkpoint_id, target, blob_path)
+
+    def restore(self, checkpoint_id: str) -> List[str]:
+        """Put every file of a checkpoint back to its recorded state.
+
+        Files that did not exist when they were recorded are deleted again.
+
+        Returns:
+            The restored paths
+        """
+        rows = self.database.get_checkpoint_files(checkpoint_id)
+        restored: List[str] = []
+        for row in rows:
+            path, blob_path = row["path"], row["blob_path"]
+            if blob_path is None:
+                if os.path.isfile(path):
+                    os.unlink(path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                temp_path = f"{path}.{uuid4().hex}.restore"
+                # anything may write into the restored file, e.g. a shell `>>`,
+                # sharing the blob's inode would change the snapshot with it
+                clone_file(blob_path, temp_path, hardlink=False)
+                os.replace(temp_path, path)
+            restored.append(path)
+        return restored
+
+    def list_checkpoints(self, thread_id: Optional[str] = None) -> List[dict]:
+        """Checkpoints of a thread (default: the active one), newest first."""
+        thread_id = thread_id or self.thread_id
+        if thread_id is None:
+            return []
+        return [dict(row) for row in self.database.list_checkpoints(thread_id)]
+
+    def discard_thread(self, thread_id: str) -> None:
+        """Drop the stored file contents of a thread, rows go with the thread itself."""
+        shutil.rmtree(self.storage_dir / thread_id, ignore_errors=True)
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Delete a thread with its messages, checkpoints and their stored files."""
+        with self._lock:
+            if thread_id == self.thread_id:
+                self.checkpoint_id = None
+            self.database.delete_thread(thread_id)
+            self.discard_thread(thread_id)
+
+
+def initialize_checkpoints(database: DataBaseManager, storage_dir: str = "user_space/checkpoints") -> WorkspaceCheckpoints:
+    """Initialize the workspace checkpoints singleton instance."""
+    global _instance
+    _instance = WorkspaceCheckpoints(database=database, storage_dir=storage_dir)
+    return _instance
+
+
+def get_checkpoints() -> WorkspaceCheckpoints:
+    """Get the initialized workspace checkpoints instance."""
+    global _instance
+    if _instance is None:
+        raise RuntimeError("Checkpoints not initialized. Call initialize_checkpoints() first.")
+    return _instance
+
+
+def delete_thread(database: DataBaseManager, thread_id: str) -> None:
+    """Delete a thread, along with its checkpoint files when checkpoints are in use."""
+    if _instance is not None and _instance.database is database:
+        _instance.delete_thread(thread_id)
+    else:
+        database.delete_thread(thread_id)
+
+
+def record_before_write(path: str) -> None:
+    """Record a path into the active checkpoint, a no-op when checkpoints are not in use."""
+    if _instance is not None:
+        _instance.record(path)
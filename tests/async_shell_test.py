@@ -0,0 +1,84 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from src.agent_project.core.tools.async_shell import AsyncShellSession
+
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="needs a pseudo-terminal")
+
+
+def _run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_runs_commands_on_a_tty(tmp_path):
+    async def scenario():
+        async with AsyncShellSession(cwd=str(tmp_path)) as shell:
+            start = time.time()
+            result = await shell.run("test -t 0 && test -t 1 && echo tty")
+            elapsed = time.time() - start
+            moved = await shell.run("mkdir sub && cd sub")
+            failed = await shell.run("false")
+            return result, elapsed, moved, failed
+
+    result, elapsed, moved, failed = _run(scenario())
+    assert result.output == "tty\n"
+    assert result.exit_code == 0
+    assert elapsed < 1
+    assert moved.cwd == str(tmp_path / "sub")
+    assert failed.exit_code == 1
+    assert failed.cwd == str(tmp_path / "sub")
+
+
+def test_timeout_interrupts_and_session_stays_usable(tmp_path):
+    async def scenario():
+        async with AsyncShellSession(cwd=str(tmp_path)) as shell:
+            timed_out = await shell.run("echo started; sleep 30", timeout=0.5)
+            after = await shell.run("echo still here")
+            return timed_out, after
+
+    timed_out, after = _run(scenario())
+    assert timed_out.timed_out
+    assert timed_out.exit_code is None
+    assert timed_out.output == "started\n"
+    assert after.output == "still here\n"
+    assert after.cwd == str(tmp_path)
+
+
+def test_cancellation_interrupts_command():
+    async def scenario():
+        async with AsyncShellSession() as shell:
+            task = asyncio.create_task(shell.run("sleep 30"))
+            await asyncio.sleep(0.3)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            return await shell.run("echo ok", timeout=5)
+
+    assert _run(scenario()).output == "ok\n"
+
+
+def test_send_input_answers_prompt():
+    async def scenario():
+        async with AsyncShellSession() as shell:
+            async def answer():
+                await asyncio.sleep(0.2)
+                await shell.send_input("yes\n")
+
+            answering = asyncio.create_task(answer())
+            result = await shell.run("read reply; echo got $reply", timeout=5)
+            await answering
+            return result
+
+    assert _run(scenario()).output == "got yes\n"
+
+
+def test_concurrent_callers_are_serialized():
+    async def scenario():
+        async with AsyncShellSession() as shell:
+            return await asyncio.gather(*(shell.run(f"echo {i}") for i in range(5)))
+
+    results = _run(scenario())
+    assert [r.output for r in results] == [f"{i}\n" for i in range(5)]
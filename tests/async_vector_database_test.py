@@ -0,0 +1,156 @@
+import asyncio
+import time
+
+import pytest
+
+from src.agent_project.infrastructure.databases import vector_database
+from src.agent_project.infrastructure.databases.async_vector_database import (
+    AsyncVectorStoreManager, ThreadedAsyncClient, get_async_vector_store,
+    run_vector_store_call)
+from src.agent_project.infrastructure.databases.numpy_vector_client import \
+    NumpyVectorClient
+from src.agent_project.infrastructure.databases.vector_database import (
+    VectorStoreManager, initialize_vector_store, point_id)
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+@pytest.fixture(params=["memory", "numpy"])
+def manager(request, embeddings):
+    manager = VectorStoreManager(host="", api_key="", embeddings=embeddings, batch_size=4, backend=request.param)
+    yield manager
+    manager.close()
+
+
+def test_async_store_adds_searches_updates_and_deletes(manager):
+    async def scenario():
+        stores = AsyncVectorStoreManager(manager)
+        store = stores.get()
+        assert isinstance(store.client, ThreadedAsyncClient)
+        texts = [f"note {word}" for word in ("apple", "banana", "cherry", "zebra", "apple pie", "kiwi", "plum", "fig", "lime")]
+        assert (await store.add_texts(texts)).startswith("Successfully added 9 new memories")
+        assert (await store.add_texts(["note apple"])).endswith("1 already stored")
+
+        hits = await store.search_many(["note apple", "note zebra", "note kiwi"], k=1)
+        assert [batch[0].payload["text"] for batch in hits] == ["note apple", "note zebra", "note kiwi"]
+        result = await store.similarity_search("apple", k=2)
+        assert len(result.splitlines()) == 2 and all("apple" in line for line in result.splitlines())
+
+        old_id = str(hits[1][0].id)
+        new_id = point_id("note zebra stripes", "memory")
+        assert await store.update_text(old_id, "note zebra stripes") == f"Point {old_id} updated successfully, new ID: {new_id}"
+        assert "zebra stripes" in await store.similarity_search("zebra stripes", k=1)
+        assert await store.delete_text(new_id) == f"Point {new_id} deleted successfully"
+        assert "zebra" not in await store.similarity_search("zebra stripes", k=3)
+        await stores.close()
+
+    run(scenario())
+    # the sync handle sees the same collection
+    assert manager.client.count(manager.default_collection).count == 8
+
+
+def test_async_writes_survive_without_close(tmp_path, embeddings):
+    path = str(tmp_path / "vectors")
+    manager = VectorStoreManager(host="", api_key="", embeddings=embeddings, batch_size=2, backend="numpy", path=path)
+
+    async def scenario():
+        store = AsyncVectorStoreManager(manager).get()
+        await store.add_texts(["one", "two", "three"])
+        await store.update_text(point_id("two", "memory"), "deux")
+        await store.delete_text(point_id("three", "memory"))
+
+    run(scenario())
+    reopened = NumpyVectorClient(path=path)
+    texts = {record.payload["text"] for record in reopened.scroll(manager.default_collection, limit=10)[0]}
+    assert texts == {"one", "deux"}
+    manager.close()
+
+
+def test_collection_setup_holds_the_embedded_client_lock(manager):
+    store = manager.get("locked")
+    async_store = AsyncVectorStoreManager(manager).get("locked")
+    held = []
+    create_collection = manager.client.create_collection
+
+    def record(*args, **kwargs):
+        held.append(manager.client_lock._is_owned())
+        return create_collection(*args, **kwargs)
+    manager.client.create_collection = record
+
+    async def scenario():
+        assert not await async_store._collection_exists()
+        await async_store._ensure_collection(8)
+        assert await async_store._collection_exists()
+
+    run(scenario())
+    assert held == [True] and store._collection_ready
+
+
+def test_warm_up_shares_the_embedded_client_lock(manager):
+    async_manager = AsyncVectorStoreManager(manager)
+    assert async_manager.client._lock is manager.client_lock
+    store = manager.get("warm")
+    held = []
+    collection_exists = manager.client.collection_exists
+
+    def record(*args, **kwargs):
+        held.append(manager.client_lock._is_owned())
+        return collection_exists(*args, **kwargs)
+    manager.client.collection_exists = record
+
+    store.warm_up(background=False)
+    assert held and all(held)
+
+
+class SlowAsyncClient:
+    """Async client that records how many queries are in flight"""
+
+    def __init__(self, client) -> None:
+        self.client = client
+        self.active = 0
+        self.peak = 0
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    async def query_points(self, *args, **kwargs):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.05)
+        self.active -= 1
+        return await self.client.query_points(*args, **kwargs)
+
+
+def test_async_store_limits_concurrency(manager):
+    async def scenario():
+        stores = AsyncVectorStoreManager(manager, max_concurrency=3)
+        store = stores.get()
+        await store.add_texts([f"text {i}" for i in range(6)])
+        client = store.client = SlowAsyncClient(store.client)
+        start = time.perf_counter()
+        results = await store.search_many([f"query {i}" for i in range(9)], k=1)
+        elapsed = time.perf_counter() - start
+        assert all(len(hits) == 1 for hits in results)
+        return client.peak, elapsed
+
+    peak, elapsed = run(scenario())
+    assert peak == 3
+    # three waves of three parallel searches, not nine in a row
+    assert elapsed < 6 * 0.05
+
+
+def test_sync_adapter_runs_on_the_store_loop(monkeypatch, embeddings):
+    monkeypatch.setattr(vector_database, "_manager", None)
+    initialize_vector_store(host="", api_key="", embeddings=embeddings, backend="memory", collection_name="adapter")
+    try:
+        assert run_vector_store_call(lambda store: store.add_texts(["hello world"])).startswith("Successfully added 1")
+        assert "hello world" in run_vector_store_call(lambda store: store.similarity_search("hello", k=1))
+        assert run_vector_store_call(lambda store: store.similarity_search("hello", k=1), collection_name="empty") == "No similar texts found"
+
+        async def handles():
+            return get_async_vector_store() is get_async_vector_store("adapter")
+        assert run(handles())
+    finally:
+        vector_database.get_vector_store_manager().close()
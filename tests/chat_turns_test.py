@@ -0,0 +1,39 @@
+import pytest
+from langchain_core.messages import (AIMessage, HumanMessage, SystemMessage,
+                                     ToolMessage)
+
+from src.agent_project.application.chat_turns import save_turn, turn_messages
+from src.agent_project.infrastructure.databases.sql_database import \
+    DataBaseManager
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = DataBaseManager(db_path=str(tmp_path / "threads.db"))
+    yield database
+    database.close()
+
+
+def test_turn_with_tool_calls_is_saved_whole(database):
+    earlier = [SystemMessage(content="You are a coding agent"), HumanMessage(content="hi"), AIMessage(content="hello")]
+    turn = [
+        HumanMessage(content="list the files"),
+        AIMessage(content="", id="a1", tool_calls=[{"name": "run_shell", "args": {"command": "ls"}, "id": "call_1"}]),
+        ToolMessage(content="main.py\nREADME.md", tool_call_id="call_1", name="run_shell", id="t1"),
+        AIMessage(content="There are two files", id="a2"),
+    ]
+    database.create_thread("t1", "")
+
+    reply = save_turn(database, "t1", "list the files", {"messages": earlier + turn, "type": "execution_node"})
+
+    assert reply == turn[-1]
+    stored = database.get_messages("t1")
+    assert stored == turn
+    assert stored[1].tool_calls[0]["args"] == {"command": "ls"}
+    assert stored[2].tool_call_id == "call_1"
+
+
+def test_turn_without_an_answer_keeps_the_query():
+    assert turn_messages([SystemMessage(content="You are a coding agent")], "hi") == [HumanMessage(content="hi")]
+    messages = [HumanMessage(content="hi"), AIMessage(content="hello"), HumanMessage(content="hi")]
+    assert turn_messages(messages, "hi") == messages[2:]
@@ -0,0 +1,116 @@
+import os
+import tempfile
+
+import pytest
+
+from src.agent_project.infrastructure.databases.sql_database import \
+    DataBaseManager
+from src.agent_project.infrastructure.workspace.checkpoints import (
+    WorkspaceCheckpoints, clone_file, delete_thread)
+
+
+@pytest.fixture
+def checkpoints():
+    tmp_dir = tempfile.TemporaryDirectory()
+    db = DataBaseManager(db_path=os.path.join(tmp_dir.name, "history.db"))
+    db.create_thread("t1", "Test Thread")
+    yield WorkspaceCheckpoints(database=db, storage_dir=os.path.join(tmp_dir.name, "checkpoints")), tmp_dir.name
+    db.close()
+    tmp_dir.cleanup()
+
+
+def _write(path, content):
+    # replace atomically like the file tools do
+    with open(path + ".tmp", "w") as f:
+        f.write(content)
+    os.replace(path + ".tmp", path)
+
+
+def test_restore_modified_and_deleted_files(checkpoints):
+    manager, root = checkpoints
+    edited = os.path.join(root, "edited.txt")
+    removed = os.path.join(root, "removed.txt")
+    _write(edited, "original")
+    _write(removed, "keep me")
+
+    checkpoint_id = manager.begin("t1", "turn 1")
+    manager.record(edited)
+    _write(edited, "changed")
+    manager.record(edited)  # second record must not overwrite the snapshot
+    _write(edited, "changed again")
+    manager.record(removed)
+    os.unlink(removed)
+
+    restored = manager.restore(checkpoint_id)
+    assert sorted(restored) == sorted([os.path.abspath(edited), os.path.abspath(removed)])
+    with open(edited) as f:
+        assert f.read() == "original"
+    with open(removed) as f:
+        assert f.read() == "keep me"
+
+
+def test_restore_removes_created_files(checkpoints):
+    manager, root = checkpoints
+    created = os.path.join(root, "new.txt")
+
+    checkpoint_id = manager.begin("t1")
+    manager.record(created)
+    _write(created, "new content")
+
+    manager.restore(checkpoint_id)
+    assert not os.path.exists(created)
+
+
+def test_checkpoints_are_tied_to_thread(checkpoints):
+    manager, root = checkpoints
+    path = os.path.join(root, "a.txt")
+    _write(path, "a")
+
+    manager.begin("t1", "untouched turn")
+    checkpoint_id = manager.begin("t1", "edit turn")
+    manager.record(path)
+
+    listed = manager.list_checkpoints("t1")
+    # checkpoints without recorded files are never persisted
+    assert [c["checkpoint_id"] for c in listed] == [checkpoint_id]
+    assert listed[0]["file_count"] == 1
+
+    manager.delete_thread("t1")
+    assert manager.list_checkpoints("t1") == []
+    # the stored file contents go with the thread
+    assert not os.path.exists(os.path.join(root, "checkpoints", "t1"))
+
+
+def test_restore_again_after_in_place_write(checkpoints):
+    manager, root = checkpoints
+    path = os.path.join(root, "log.txt")
+    _write(path, "original")
+
+    checkpoint_id = manager.begin("t1")
+    manager.record(path)
+    _write(path, "changed")
+    manager.restore(checkpoint_id)
+    # written into the restored inode, like a shell `>>` does
+    with open(path, "a") as f:
+        f.write(" + appended")
+
+    manager.restore(checkpoint_id)
+    with open(path) as f:
+        assert f.read() == "original"
+
+
+def test_delete_thread_without_checkpoints_in_use(checkpoints):
+    manager, root = checkpoints
+    manager.database.create_thread("t2", "Other")
+    delete_thread(manager.database, "t2")
+    assert [t.thread_id for t in manager.database.list_threads()] == ["t1"]
+
+
+def test_clone_file_falls_back_gracefully(checkpoints):
+    _, root = checkpoints
+    src = os.path.join(root, "src.txt")
+    dst = os.path.join(root, "dst.txt")
+    _write(src, "data")
+    assert clone_file(src, dst) in {"reflink", "hardlink", "copy"}
+    with open(dst) as f:
+        assert f.read() == "data"
@@ -0,0 +1,33 @@
+from typing import List
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+
+class FakeEmbeddings(Embeddings):
+    """Bag-of-letters vectors, records every call"""
+
+    def __init__(self) -> None:
+        self.document_calls: List[List[str]] = []
+        self.query_calls: List[str] = []
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.document_calls.append(list(texts))
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        self.query_calls.append(text)
+        return self._vector(text)
+
+    def _vector(self, text: str) -> List[float]:
+        vector = [0.0] * 26
+        for char in text.lower():
+            if "a" <= char <= "z":
+                vector[ord(char) - ord("a")] += 1.0
+        vector[0] += 0.01
+        return vector
+
+
+@pytest.fixture
+def embeddings():
+    return FakeEmbeddings()
@@ -1,11 +1,19 @@
 import os
+import sqlite3
 import tempfile
+import threading
+import time
 
 import pytest
-from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.messages import (AIMessage, HumanMessage, SystemMessage,
+                                     ToolMessage)
 
-from src.agent_project.infrastructure.databases.sql_database import \
-    DataBaseManager
+from src.agent_project.core.tools.chat_history_tools import search_chat_history
+from src.agent_project.infrastructure.databases import sql_database
+from src.agent_project.infrastructure.databases.message_codec import \
+    message_text
+from src.agent_project.infrastructure.databases.sql_database import (
+    MIGRATIONS, SNIPPET_LENGTH, DataBaseManager, initialize_database)
 
 
 @pytest.fixture
@@ -22,7 +30,7 @@ def db_manager():
 def test_thread_creation_and_listing(db_manager):
     db_manager.create_thread("t1", "Test Thread")
     threads = db_manager.list_threads()
-    assert any("t1 Test Thread" in t for t in threads)
+    assert [(t.thread_id, t.title, t.message_count, t.last_message) for t in threads] == [("t1", "Test Thread", 0, "")]
 
 
 def test_add_and_get_messages(db_manager):
@@ -60,7 +68,310 @@ def test_delete_thread(db_manager):
     db_manager.add_human_message("t1", "m1", "Hi")
     db_manager.delete_thread("t1")
     threads = db_manager.list_threads()
-    assert not any("t1 ToDelete" in t for t in threads)
+    assert not any(t.thread_id == "t1" for t in threads)
     # Messages should also be deleted due to CASCADE
     rows = db_manager.get_raw_messages("t1")
     assert rows == []
+
+
+def test_messages_keep_insertion_order_per_thread(db_manager):
+    db_manager.create_thread("t1", "One")
+    db_manager.create_thread("t2", "Two")
+    for i in range(5):
+        db_manager.add_human_message("t1", f"a{i}", f"one {i}")
+        db_manager.add_ai_message("t2", f"b{i}", f"two {i}")
+    # rewriting a message keeps its place
+    db_manager.add_ai_message("t1", "a1", "one 1 edited")
+    assert [m.content for m in db_manager.get_messages("t1")] == ["one 0", "one 1 edited", "one 2", "one 3", "one 4"]
+    assert [row["seq"] for row in db_manager.get_raw_messages("t2")] == [1, 2, 3, 4, 5]
+    assert db_manager.get_raw_messages("t1")[0]["created_at"].endswith("+00:00")
+
+    plan = " ".join(row[3] for row in db_manager.conn.execute(
+        "EXPLAIN QUERY PLAN SELECT role, content FROM messages WHERE thread_id = ? ORDER BY seq ASC", ("t1",)
+    ))
+    assert "idx_messages_thread_seq" in plan and "TEMP B-TREE" not in plan
+
+
+def test_migrates_a_database_created_before_versioning(tmp_path):
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE threads (thread_id TEXT PRIMARY KEY, title TEXT, created_at TEXT NOT NULL)")
+    conn.execute(
+        """
+        CREATE TABLE messages (
+            message_id TEXT PRIMARY KEY,
+            thread_id TEXT NOT NULL,
+            role TEXT NOT NULL CHECK(role IN ('human','ai')),
+            content TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            FOREIGN KEY(thread_id) REFERENCES threads(thread_id) ON DELETE CASCADE
+        )
+        """
+    )
+    conn.execute("INSERT INTO threads VALUES ('t1', 'Old', '2024-05-01T10:00:00.000001')")
+    # inserted out of order, the timestamps decide
+    conn.executemany("INSERT INTO messages VALUES (?, 't1', ?, ?, ?)", [
+        ("m2", "ai", "second", "2024-05-01T12:00:01.500000"),
+        ("m1", "human", "first", "2024-05-01T12:00:00.250000"),
+        ("m3", "human", "third", "2024-05-01T12:00:02"),
+    ])
+    conn.commit()
+    conn.close()
+
+    db = DataBaseManager(db_path=path)
+    assert db.schema_version() == len(MIGRATIONS)
+    rows = db.get_raw_messages("t1")
+    assert [(row["content"], row["seq"]) for row in rows] == [("first", 1), ("second", 2), ("third", 3)]
+    assert all(row["created_at"].endswith("+00:00") for row in rows)
+    assert db.conn.execute("SELECT created_at FROM threads").fetchone()[0] == "2024-05-01T10:00:00.000001+00:00"
+    # messages from before the search index are indexed too
+    assert [hit.message_id for hit in db.search_messages("second")] == ["m2"]
+    db.add_ai_message("t1", "m4", "fourth")
+    assert db.get_messages("t1")[-1].content == "fourth"
+    # the rebuilt table takes every role
+    db.add_message_obj("t1", "m5", SystemMessage(content="summary of the thread"))
+    assert db.get_messages("t1")[-1] == SystemMessage(content="summary of the thread")
+    assert [hit.message_id for hit in db.search_messages("summary")] == ["m5"]
+    db.close()
+
+    # reopening runs nothing again
+    reopened = DataBaseManager(db_path=path)
+    assert [m.content for m in reopened.get_messages("t1")] == ["first", "second", "third", "fourth", "summary of the thread"]
+    reopened.close()
+
+
+def test_writes_do_not_wait_for_the_database(db_manager):
+    assert db_manager.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    db_manager.create_thread("t1", "Test Thread")
+    db_manager.flush()
+
+    # another process holds the write lock
+    blocker = sqlite3.connect(db_manager.db_path)
+    blocker.execute("BEGIN IMMEDIATE")
+    start = time.perf_counter()
+    for i in range(50):
+        db_manager.add_human_message("t1", f"m{i}", f"message {i}")
+    assert time.perf_counter() - start < 0.1
+    # readers are not blocked by the lock holder either
+    assert db_manager.conn.execute("SELECT COUNT(*) FROM threads").fetchone()[0] == 1
+    time.sleep(0.2)
+    blocker.rollback()
+    blocker.close()
+
+    db_manager.flush()
+    assert [m.content for m in db_manager.get_messages("t1")] == [f"message {i}" for i in range(50)]
+
+
+def test_failed_write_is_raised_by_flush_and_spares_the_rest(db_manager):
+    db_manager.create_thread("t1", "Test Thread")
+    db_manager.add_human_message("t1", "m1", "kept")
+    # no such thread, the foreign key rejects it
+    db_manager.add_ai_message("missing", "m2", "lost")
+    db_manager.add_ai_message("t1", "m3", "kept too")
+    with pytest.raises(sqlite3.IntegrityError):
+        db_manager.flush()
+    db_manager.flush()
+    assert [m.content for m in db_manager.get_messages("t1")] == ["kept", "kept too"]
+
+
+def test_close_commits_queued_writes(tmp_path):
+    path = str(tmp_path / "history.db")
+    db = DataBaseManager(db_path=path)
+    db.create_thread("t1", "Test Thread")
+    for i in range(20):
+        db.add_ai_message("t1", f"m{i}", f"message {i}")
+    db.close()
+
+    reopened = DataBaseManager(db_path=path)
+    assert len(reopened.get_messages("t1")) == 20
+    reopened.close()
+
+
+def test_list_threads_pages_newest_first_with_stats(db_manager):
+    for i in range(7):
+        db_manager.create_thread(f"t{i}", f"Thread {i}")
+        for j in range(i):
+            db_manager.add_human_message(f"t{i}", f"t{i}m{j}", f"message {j} " + "x" * 200)
+
+    pages, after = [], None
+    while True:
+        page = db_manager.list_threads(limit=3, after=after)
+        if not page:
+            break
+        pages.append([t.thread_id for t in page])
+        after = page[-1].cursor
+    assert pages == [["t6", "t5", "t4"], ["t3", "t2", "t1"], ["t0"]]
+
+    newest = db_manager.list_threads(limit=1)[0]
+    assert newest.message_count == 6
+    assert newest.last_message.startswith("message 5 ") and len(newest.last_message) == SNIPPET_LENGTH
+
+    for after in (None, ("2999-01-01", "")):
+        query = "SELECT t.thread_id FROM threads t {} ORDER BY t.created_at DESC, t.thread_id DESC LIMIT 3".format(
+            "WHERE (t.created_at, t.thread_id) < (?, ?)" if after else "")
+        plan = " ".join(row[3] for row in db_manager.conn.execute("EXPLAIN QUERY PLAN " + query, after or ()))
+        assert "idx_threads_created" in plan and "TEMP B-TREE" not in plan
+
+
+def test_search_messages_ranks_snippets_and_follows_changes(db_manager):
+    db_manager.create_thread("t1", "Parser work")
+    db_manager.create_thread("t2", "Deploy")
+    db_manager.add_human_message("t1", "m1", "The parser crashes on nested brackets when the input is a large file with many lines")
+    db_manager.add_ai_message("t1", "m2", "Fixed the parser: nested brackets are parsed recursively, the parser now handles depth")
+    db_manager.add_human_message("t2", "m3", "How do I deploy to production?")
+
+    hits = db_manager.search_messages("parser")
+    assert [hit.message_id for hit in hits] == ["m2", "m1"]
+    assert hits[0].thread_id == "t1" and hits[0].thread_title == "Parser work"
+    assert "**parser**" in hits[0].snippet
+    # stemmed, prefix matched on the last word and offset paged
+    assert [hit.message_id for hit in db_manager.search_messages("deploying")] == ["m3"]
+    assert [hit.message_id for hit in db_manager.search_messages("nested brack")] == ["m2", "m1"]
+    assert [hit.message_id for hit in db_manager.search_messages("parser", limit=1, offset=1)] == ["m1"]
+    # operators and quotes in user input are searched literally
+    assert db_manager.search_messages('production?" OR (') == []
+    assert db_manager.search_messages("   ") == []
+
+    db_manager.add_human_message("t2", "m3", "How do I roll back a release?")
+    assert db_manager.search_messages("deploy") == []
+    assert [hit.message_id for hit in db_manager.search_messages("release")] == ["m3"]
+    db_manager.delete_thread("t1")
+    assert db_manager.search_messages("parser") == []
+    # the index still matches the table, raises SQLITE_CORRUPT otherwise
+    db_manager.flush()
+    with sqlite3.connect(db_manager.db_path) as conn:
+        conn.execute("INSERT INTO messages_fts(messages_fts, rank) VALUES ('integrity-check', 1)")
+
+
+def test_recall_tool_searches_the_initialized_database(tmp_path, monkeypatch):
+    monkeypatch.setattr(sql_database, "_instance", None)
+    db = initialize_database(str(tmp_path / "history.db"))
+    try:
+        db.create_thread("t1", "Parser work")
+        db.add_ai_message("t1", "m1", "Use a recursive descent parser")
+        assert search_chat_history.invoke({"query": "recursive"}) == (
+            f"Thread: t1 (Parser work), ai at {db.get_raw_messages('t1')[0]['created_at']}: Use a **recursive** descent parser"
+        )
+        assert search_chat_history.invoke({"query": "lexer"}) == "No past messages found for 'lexer'"
+    finally:
+        db.close()
+
+
+def test_concurrent_readers_and_writers(db_manager):
+    writers, readers, per_writer = 8, 8, 60
+    db_manager.create_thread("shared", "Shared")
+    errors = []
+    done = threading.Event()
+
+    def write(index):
+        try:
+            thread_id = f"w{index}"
+            db_manager.create_thread(thread_id, f"Writer {index}")
+            for i in range(per_writer):
+                db_manager.add_human_message(thread_id, f"{thread_id}m{i}", f"writer {index} message {i}")
+                db_manager.add_ai_message("shared", f"{thread_id}s{i}", f"shared from writer {index}")
+                # a thread always reads its own writes
+                if i % 10 == 0:
+                    assert len(db_manager.get_messages(thread_id)) == i + 1
+        except Exception as e:
+            errors.append(e)
+
+    def read():
+        try:
+            while not done.is_set():
+                db_manager.list_threads(limit=5)
+                db_manager.search_messages("writer")
+                db_manager.get_raw_messages("shared")
+        except Exception as e:
+            errors.append(e)
+
+    reader_threads = [threading.Thread(target=read) for _ in range(readers)]
+    writer_threads = [threading.Thread(target=write, args=(index,)) for index in range(writers)]
+    for thread in reader_threads + writer_threads:
+        thread.start()
+    for thread in writer_threads:
+        thread.join()
+    done.set()
+    for thread in reader_threads:
+        thread.join()
+    db_manager.flush()
+
+    assert errors == []
+    assert [row["seq"] for row in db_manager.get_raw_messages("shared")] == list(range(1, writers * per_writer + 1))
+    counts = {t.thread_id: t.message_count for t in db_manager.list_threads(limit=writers + 1)}
+    assert counts == {"shared": writers * per_writer, **{f"w{i}": per_writer for i in range(writers)}}
+
+
+def test_readers_do_not_wait_for_other_threads_writes(db_manager):
+    db_manager.create_thread("t1", "Test Thread")
+    db_manager.flush()
+    blocker = sqlite3.connect(db_manager.db_path)
+    blocker.execute("BEGIN IMMEDIATE")
+    try:
+        # stuck behind the lock until the blocker is done
+        writer = threading.Thread(target=db_manager.add_human_message, args=("t1", "m1", "pending"))
+        writer.start()
+        writer.join()
+        start = time.perf_counter()
+        threads = db_manager.list_threads()
+        assert time.perf_counter() - start < 0.1
+        assert threads[0].message_count == 0
+    finally:
+        blocker.rollback()
+        blocker.close()
+    db_manager.flush()
+    assert db_manager.list_threads()[0].message_count == 1
+
+
+def test_full_messages_round_trip(db_manager):
+    tool_output = "\n".join(f"line {i}: def handler_{i}(request): return respond(request)" for i in range(400))
+    messages = [
+        SystemMessage(content="Summary: the user is refactoring the parser", id="s1"),
+        HumanMessage(content="Read parser.py", id="h1"),
+        AIMessage(
+            content="",
+            id="a1",
+            tool_calls=[{"name": "read_file", "args": {"path": "parser.py", "lines": [1, 400]}, "id": "call_1"}],
+            usage_metadata={"input_tokens": 120, "output_tokens": 20, "total_tokens": 140},
+            response_metadata={"model_name": "test-model", "finish_reason": "tool_calls"},
+        ),
+        ToolMessage(content=tool_output, tool_call_id="call_1", name="read_file", id="t1"),
+        AIMessage(content=[{"type": "text", "text": "The parser has 400 handlers"}], id="a2"),
+    ]
+    db_manager.create_thread("t1", "Test Thread")
+    db_manager.add_human_message("t1", "m0", "plain text message")
+    db_manager.add_messages("t1", messages)
+
+    assert db_manager.get_messages("t1") == [HumanMessage(content="plain text message")] + messages
+    rows = {row["message_id"]: row for row in db_manager.get_raw_messages("t1")}
+    assert [rows[message_id]["role"] for message_id in ("s1", "h1", "a1", "t1")] == ["system", "human", "ai", "tool"]
+    # large tool outputs are compressed, text stays searchable
+    assert rows["t1"]["payload"][:1] == b"\x01" and len(rows["t1"]["payload"]) < len(tool_output) / 4
+    assert rows["a2"]["content"] == "The parser has 400 handlers"
+    assert [hit.message_id for hit in db_manager.search_messages("handler_399")] == ["t1"]
+
+    # rewriting a message replaces the whole object
+    edited = messages[4].model_copy(update={"content": "The parser has 401 handlers"})
+    db_manager.add_message_obj("t1", "a2", edited)
+    assert db_manager.get_messages("t1")[-1] == edited
+
+    plan = " ".join(row[3] for row in db_manager.conn.execute(
+        "EXPLAIN QUERY PLAN SELECT role, content, payload FROM messages WHERE thread_id = ? ORDER BY seq ASC", ("t1",)
+    ))
+    assert "idx_messages_thread_seq" in plan and "TEMP B-TREE" not in plan
+
+
+def test_list_content_is_stored_and_searched_as_its_text(db_manager):
+    message = AIMessage(content=[
+        {"type": "text", "text": "Here is the chart "},
+        {"type": "image_url", "image_url": {"url": "data:image/png;base64,AAAA"}},
+        "of weekly signups",
+        {"type": "tool_use", "id": "call_1", "name": "plot", "input": {"kind": "bar"}},
+    ], id="a1")
+    assert message_text(message) == "Here is the chart of weekly signups"
+
+    db_manager.create_thread("t1", "Charts")
+    db_manager.add_messages("t1", [message])
+    assert db_manager.get_raw_messages("t1")[0]["content"] == "Here is the chart of weekly signups"
+    assert [hit.message_id for hit in db_manager.search_messages("weekly signups")] == ["a1"]
+    assert db_manager.search_messages("bound method") == []
@@ -0,0 +1,123 @@
+import os
+
+import pytest
+
+from src.agent_project.core.tools import shell_cache
+from src.agent_project.core.tools.create_or_delete_files import create_file
+from src.agent_project.core.tools.shell import CommandResult
+from src.agent_project.core.tools.shell_cache import (ShellResultCache,
+                                                      is_cacheable)
+from src.agent_project.core.tools.shell_pool import (initialize_shell_pool,
+                                                     run_cached_shell_command,
+                                                     shutdown_shell_pool)
+
+
+def _result(output="a\n", exit_code=0, cwd="/"):
+    return CommandResult(output=output, exit_code=exit_code, cwd=cwd)
+
+
+def test_allowlist_accepts_plain_read_only_commands():
+    assert is_cacheable("ls -la")
+    assert not is_cacheable("git status --short")
+    assert is_cacheable("git log --oneline -5")
+    assert not is_cacheable("pip list")
+    assert not is_cacheable("tree")
+    assert not is_cacheable("ls -laR")
+    assert not is_cacheable("ls --recursive src")
+    assert not is_cacheable("git commit -m x")
+    assert not is_cacheable("ls > files.txt")
+    assert not is_cacheable("ls; rm -rf build")
+    assert not is_cacheable("ls $(touch x)")
+    assert not is_cacheable("rm -rf build")
+
+
+def test_cache_is_opt_in(tmp_path):
+    cache = ShellResultCache(root=str(tmp_path))
+    cache.put("ls", str(tmp_path), _result())
+    assert cache.get("ls", str(tmp_path)) is None
+
+
+def test_cache_hits_until_workspace_changes(tmp_path):
+    cache = ShellResultCache(enabled=True, root=str(tmp_path))
+    cwd = str(tmp_path)
+    cache.put("ls", cwd, _result())
+    assert cache.get("ls", cwd).output == "a\n"
+    assert cache.get("ls", str(tmp_path.parent)) is None
+
+    # a new file changes the directory's mtime and so the fingerprint
+    (tmp_path / "new.txt").write_text("x")
+    os.utime(tmp_path, ns=(0, 0))
+    assert cache.get("ls", cwd) is None
+    assert cache.stats() == {"entries": 1, "hits": 1, "misses": 2}
+
+
+def test_listing_a_subdirectory_sees_files_added_to_it(tmp_path):
+    cache = ShellResultCache(enabled=True, root=str(tmp_path))
+    cwd = str(tmp_path)
+    (tmp_path / "src").mkdir()
+    os.utime(tmp_path / "src", ns=(0, 0))
+    cache.put("ls src", cwd, _result())
+    assert cache.get("ls src", cwd).output == "a\n"
+
+    # the workspace root is untouched, only src changes
+    (tmp_path / "src" / "new.py").write_text("x")
+    assert cache.get("ls src", cwd) is None
+
+
+def test_failed_or_invalidated_results_are_not_reused(tmp_path):
+    cache = ShellResultCache(enabled=True, root=str(tmp_path))
+    cwd = str(tmp_path)
+    cache.put("git log", cwd, _result(exit_code=128))
+    assert cache.get("git log", cwd) is None
+
+    generation = cache.generation()
+    cache.invalidate()
+    cache.put("ls", cwd, _result(), generation=generation)
+    assert cache.get("ls", cwd) is None
+
+
+def test_expired_entries_are_dropped(tmp_path):
+    cache = ShellResultCache(enabled=True, ttl=0, root=str(tmp_path))
+    cache.put("ls", str(tmp_path), _result())
+    assert cache.get("ls", str(tmp_path)) is None
+
+
+@pytest.mark.skipif(os.name == "nt", reason="needs a pseudo-terminal")
+def test_tool_layer_reuses_results_and_invalidates_on_writes(tmp_path, monkeypatch):
+    monkeypatch.setattr(shell_cache, "_cache", ShellResultCache(enabled=True, root=str(tmp_path)))
+    initialize_shell_pool(cwd=str(tmp_path))
+    try:
+        (tmp_path / "a.txt").write_text("a")
+        first, cached = run_cached_shell_command("ls -1", session="main")
+        assert (first.output, cached) == ("a.txt\n", False)
+        second, cached = run_cached_shell_command("ls -1", session="main")
+        assert (second.output, cached) == ("a.txt\n", True)
+
+        # write tools clear the cache
+        create_file.invoke({"path": str(tmp_path / "sub" / "b.txt"), "content": "b"})
+        third, cached = run_cached_shell_command("ls -1", session="main")
+        assert (third.output, cached) == ("a.txt\nsub\n", False)
+
+        # so does any command outside the allowlist
+        run_cached_shell_command("echo c > a.txt", session="main")
+        assert shell_cache.get_shell_cache().stats()["entries"] == 0
+    finally:
+        shutdown_shell_pool()
+
+
+def test_git_diff_sees_edits_made_outside_the_tools(tmp_path, monkeypatch):
+    monkeypatch.setattr(shell_cache, "_cache", ShellResultCache(enabled=True, root=str(tmp_path)))
+    initialize_shell_pool(cwd=str(tmp_path))
+    try:
+        (tmp_path / "a.txt").write_text("one\n")
+        run_cached_shell_command("git init -q && git add a.txt && git -c user.name=t -c user.email=t@t commit -qm init && export GIT_PAGER=cat", session="main")
+        (tmp_path / "a.txt").write_text("two\n")
+        first, _ = run_cached_shell_command("git diff --no-color", session="main")
+        assert "+two" in first.output
+
+        # written in place by another session or an editor, nothing invalidates
+        (tmp_path / "a.txt").write_text("three\n")
+        second, cached = run_cached_shell_command("git diff --no-color", session="main")
+        assert not cached and "+three" in second.output
+    finally:
+        shutdown_shell_pool()
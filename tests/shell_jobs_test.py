@@ -0,0 +1,97 @@
+import os
+import time
+
+import pytest
+
+from src.agent_project.core.tools import shell_jobs, shell_output
+from src.agent_project.core.tools.shell_jobs import JobManager, tail_job_output
+from src.agent_project.core.tools.shell_output import read_shell_log
+
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="uses a POSIX shell")
+
+
+@pytest.fixture(autouse=True)
+def log_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(shell_output, "_log_dir", str(tmp_path / "logs"))
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    manager = JobManager(cwd=str(tmp_path), shell_type="/bin/sh")
+    monkeypatch.setattr(shell_jobs, "_manager", manager)
+    yield manager
+    manager.kill_all()
+
+
+def _wait_for(predicate, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_job_runs_in_background_and_finishes(manager, tmp_path):
+    start = time.time()
+    job_id = manager.start("sleep 0.5; pwd; echo done")
+    assert time.time() - start < 0.5
+    assert manager.status(job_id).status == "running"
+
+    assert manager.get(job_id).wait(timeout=10)
+    info = manager.status(job_id)
+    assert info.status == "finished"
+    assert info.exit_code == 0
+    assert manager.tail(job_id) == f"{tmp_path}\ndone\n"
+    # the job log doubles as a shell log
+    assert "2: done" in read_shell_log.invoke({"log_id": job_id})
+
+
+def test_failed_job_reports_exit_code(manager):
+    job_id = manager.start("echo oops; exit 3")
+    manager.get(job_id).wait(timeout=10)
+    info = manager.status(job_id)
+    assert info.status == "failed"
+    assert info.exit_code == 3
+
+
+def test_tail_follows_running_job(manager):
+    job_id = manager.start("for i in $(seq 1 5000); do echo line $i; done; sleep 30")
+    assert _wait_for(lambda: manager.tail(job_id, 1) == "line 5000\n")
+    assert manager.tail(job_id, 3) == "line 4998\nline 4999\nline 5000\n"
+    assert "running" in tail_job_output.func(job_id=job_id, num_lines=2)
+
+
+def test_kill_stops_job_and_its_children(manager, tmp_path):
+    marker = tmp_path / "child.pid"
+    job_id = manager.start(f"sleep 60 & echo $! > {marker}; wait")
+    assert _wait_for(marker.exists)
+    assert _wait_for(lambda: marker.read_text().strip() != "")
+    child = int(marker.read_text())
+
+    assert manager.kill(job_id)
+    assert manager.get(job_id).wait(timeout=10)
+    assert manager.status(job_id).status == "killed"
+    assert _wait_for(lambda: not os.path.exists(f"/proc/{child}") or _is_zombie(child))
+    # killing a finished job is a no-op
+    assert not manager.kill(job_id)
+
+
+def test_large_output_is_only_written_to_the_job_log(manager, tmp_path):
+    job_id = manager.start("i=0; while [ $i -lt 3000 ]; do echo \"line $i of a long running job\"; i=$((i+1)); done")
+    assert manager.get(job_id).wait(timeout=10)
+    assert os.listdir(tmp_path / "logs") == [f"{job_id}.log"]
+    assert manager.get(job_id).tail(1) == "line 2999 of a long running job\n"
+
+
+def test_unknown_job(manager):
+    with pytest.raises(KeyError):
+        manager.status("0" * 32)
+
+
+def _is_zombie(pid):
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().split()[2] == "Z"
+    except FileNotFoundError:
+        return True
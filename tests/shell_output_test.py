@@ -0,0 +1,97 @@
+import os
+
+import pytest
+
+from src.agent_project.core.tools import shell_output
+from src.agent_project.core.tools.shell_output import (OutputCapture,
+                                                       read_shell_log)
+
+
+@pytest.fixture(autouse=True)
+def log_dir(tmp_path):
+    previous = shell_output._log_dir
+    shell_output.set_shell_log_dir(str(tmp_path))
+    yield tmp_path
+    shell_output.set_shell_log_dir(previous)
+
+
+def _capture(text, chunk_size=7, **kwargs):
+    capture = OutputCapture(**kwargs)
+    for i in range(0, len(text), chunk_size):
+        capture.write(text[i:i + chunk_size])
+    capture.close()
+    return capture
+
+
+def test_small_output_is_returned_verbatim(log_dir):
+    for text in ["", "one\n", "one\ntwo", "a\n\nb\n"]:
+        capture = _capture(text)
+        assert capture.summary() == text
+        assert capture.log_id is None
+    assert os.listdir(log_dir) == []
+
+
+def test_keeps_head_and_tail_and_spills_full_log():
+    text = "".join(f"line {i}\n" for i in range(1000))
+    capture = _capture(text, chunk_size=100, head_lines=3, tail_lines=2)
+    summary = capture.summary()
+    assert summary.startswith("line 0\nline 1\nline 2\n... [995 lines omitted, 1000 lines in total] ...\nline 998\nline 999\n")
+    assert capture.log_id in summary
+    with open(shell_output.get_shell_log_path(capture.log_id)) as f:
+        assert f.read() == text
+
+
+def test_collapses_repeated_lines():
+    capture = _capture("start\n" + "tick\n" * 500 + "end\n")
+    assert capture.summary().startswith("start\ntick  [repeated 500 times]\nend\n")
+    # two identical lines are not worth collapsing
+    assert _capture("a\na\nb\n").summary() == "a\na\nb\n"
+
+
+def test_cuts_long_lines():
+    capture = _capture("x" * 5000 + "\nnext\n", chunk_size=1000, max_line_length=100)
+    assert capture.summary().startswith("x" * 100 + "… [+4900 chars]\nnext\n")
+    assert capture.log_id is not None
+
+
+def test_long_last_line_without_newline_is_logged():
+    text = "start\n" + "x" * 5000
+    capture = _capture(text, chunk_size=100)
+    assert f"… [+{5000 - shell_output.MAX_LINE_LENGTH} chars]" in capture.summary()
+    assert capture.log_id is not None
+    with open(shell_output.get_shell_log_path(capture.log_id)) as f:
+        assert f.read() == text
+
+
+def test_memory_stays_bounded_for_huge_output():
+    capture = OutputCapture(head_lines=5, tail_lines=5)
+    for i in range(100000):
+        capture.write(f"row {i}\n")
+    capture.close()
+    assert len(capture.head) == 5
+    assert len(capture.tail) == 5
+    assert capture.total_lines == 100000
+
+
+def test_read_shell_log_pages_through_output():
+    capture = _capture("".join(f"line {i}\n" for i in range(500)), head_lines=2, tail_lines=2)
+    page = read_shell_log.invoke({"log_id": capture.log_id, "start_line": 11, "num_lines": 3})
+    assert page == "Showing lines 11-13 of 500\n11: line 10\n12: line 11\n13: line 12\n"
+    assert "Invalid log id" in read_shell_log.invoke({"log_id": "../../etc/passwd"})
+
+
+@pytest.mark.skipif(os.name == "nt", reason="uses a POSIX shell")
+def test_shell_results_are_summarized():
+    from src.agent_project.core.tools.shell import PersistentShell
+
+    shell = PersistentShell("/bin/sh")
+    shell.start_session()
+    try:
+        result = shell.execute_command("seq 1 200000", interactive=False)
+    finally:
+        shell.stop_session()
+    assert result.exit_code == 0
+    assert result.log_id is not None
+    assert len(result.output) < 5000
+    assert result.output.startswith("1\n2\n3\n")
+    assert "200000\n" in result.output
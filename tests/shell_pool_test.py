@@ -0,0 +1,96 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from src.agent_project.core.tools.shell_pool import ShellSessionPool
+
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="needs a pseudo-terminal")
+
+
+def _run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_sessions_run_in_parallel(tmp_path):
+    async def scenario():
+        pool = ShellSessionPool(max_parallel=4, cwd=str(tmp_path))
+        try:
+            start = time.time()
+            results = await asyncio.gather(*(pool.run("sleep 0.5; echo done", session=f"s{i}") for i in range(3)))
+            return results, time.time() - start
+        finally:
+            await pool.close()
+
+    results, elapsed = _run(scenario())
+    assert all(r.output == "done\n" for r in results)
+    assert elapsed < 1.2
+
+
+def test_parallelism_is_capped(tmp_path):
+    async def scenario():
+        pool = ShellSessionPool(max_parallel=1, cwd=str(tmp_path))
+        try:
+            start = time.time()
+            await asyncio.gather(*(pool.run("sleep 0.3", session=f"s{i}") for i in range(3)))
+            return time.time() - start
+        finally:
+            await pool.close()
+
+    assert _run(scenario()) >= 0.9
+
+
+def test_sessions_have_isolated_state(tmp_path):
+    (tmp_path / "a").mkdir()
+
+    async def scenario():
+        pool = ShellSessionPool(cwd=str(tmp_path))
+        try:
+            await pool.run("cd a; export FLAVOUR=mint", session="first")
+            first = await pool.run('echo "$FLAVOUR"', session="first")
+            second = await pool.run('echo "$FLAVOUR"', session="second")
+            return first, second
+        finally:
+            await pool.close()
+
+    first, second = _run(scenario())
+    assert first.output == "mint\n"
+    assert first.cwd == str(tmp_path / "a")
+    assert second.output == "\n"
+    assert second.cwd == str(tmp_path)
+
+
+def test_idle_sessions_are_reaped_and_keep_their_directory(tmp_path):
+    (tmp_path / "a").mkdir()
+
+    async def scenario():
+        pool = ShellSessionPool(idle_timeout=0.2, cwd=str(tmp_path))
+        try:
+            await pool.run("cd a", session="main")
+            await pool.run("true")
+            await asyncio.sleep(0.3)
+            reaped = await pool.reap_idle()
+            sessions_after_reap = pool.stats()["sessions"]
+            result = await pool.run("pwd", session="main")
+            return reaped, sessions_after_reap, result
+        finally:
+            await pool.close()
+
+    reaped, sessions_after_reap, result = _run(scenario())
+    assert reaped == 2
+    assert sessions_after_reap == 0
+    assert result.output == f"{tmp_path / 'a'}\n"
+
+
+def test_anonymous_leases_reuse_idle_sessions(tmp_path):
+    async def scenario():
+        pool = ShellSessionPool(cwd=str(tmp_path))
+        try:
+            for _ in range(3):
+                await pool.run("true")
+            return pool.stats()["sessions"]
+        finally:
+            await pool.close()
+
+    assert _run(scenario()) == 1
@@ -0,0 +1,77 @@
+import os
+import time
+
+import pytest
+
+from src.agent_project.core.tools.shell import PersistentShell
+
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="uses a POSIX shell")
+
+
+@pytest.fixture
+def shell():
+    shell = PersistentShell("/bin/sh")
+    shell.start_session()
+    yield shell
+    shell.stop_session()
+
+
+def _read_until(shell, expected_length, timeout=10):
+    output = ""
+    deadline = time.time() + timeout
+    while len(output) < expected_length and time.time() < deadline:
+        output += "".join(shell._drain_output())
+    return output
+
+
+def test_reader_delivers_large_output_in_chunks(shell):
+    shell._write_input("yes 0123456789 | head -n 200000\n")
+    expected_length = len("0123456789\n") * 200000
+    output = _read_until(shell, expected_length)
+    assert len(output) == expected_length
+    assert output.count("\n") == 200000
+
+
+def test_reader_decodes_multibyte_characters(shell):
+    text = "héllo wörld ✓ " * 10000
+    shell._write_input(f"printf '%s' '{text}'\n")
+    assert _read_until(shell, len(text)) == text
+
+
+def test_command_returns_exit_code_and_cwd(shell, tmp_path):
+    result = shell.execute_command(f'cd "{tmp_path}" && echo moved', interactive=False)
+    assert result.output == "moved\n"
+    assert result.exit_code == 0
+    assert result.cwd == str(tmp_path)
+
+    failed = shell.execute_command("ls /definitely/not/here", interactive=False)
+    assert failed.exit_code != 0
+    # the working directory survives across commands
+    assert failed.cwd == str(tmp_path)
+
+
+def test_command_completes_without_idle_wait(shell):
+    start = time.time()
+    result = shell.execute_command("echo fast", interactive=False)
+    assert result.output == "fast\n"
+    assert time.time() - start < 0.5
+
+
+def test_slow_command_is_not_cut_off(shell):
+    result = shell.execute_command("echo start; sleep 1.5; echo end", interactive=False)
+    assert result.output == "start\nend\n"
+    assert result.exit_code == 0
+
+
+def test_output_without_trailing_newline(shell):
+    result = shell.execute_command("printf abc; false", interactive=False, timeout=5)
+    assert result.output == "abc"
+    assert result.exit_code == 1
+
+
+def test_timeout_restarts_session_in_same_directory(shell, tmp_path):
+    shell.execute_command(f'cd "{tmp_path}"', interactive=False)
+    result = shell.execute_command("sleep 5", interactive=False, timeout=0.5)
+    assert result.timed_out
+    assert result.exit_code is None
+    assert shell.execute_command("pwd", interactive=False).output.strip() == str(tmp_path)
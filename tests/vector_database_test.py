@@ -0,0 +1,501 @@
+import os
+import threading
+
+import numpy as np
+import pytest
+from qdrant_client.models import FieldCondition, Filter, MatchValue
+
+from src.agent_project.infrastructure.databases import vector_database
+from src.agent_project.infrastructure.databases.embedding_cache import \
+    CachedEmbeddings
+from src.agent_project.infrastructure.databases.embedding_models import (
+    LazyEmbeddings, embedding_dimension)
+from src.agent_project.infrastructure.databases.numpy_vector_client import \
+    NumpyVectorClient
+from src.agent_project.infrastructure.databases.sparse_vectors import (
+    reciprocal_rank_fusion, tokenize)
+from src.agent_project.infrastructure.databases.vector_database import (
+    QdrantVectorStore, VectorStoreManager, build_filter, collection_options,
+    create_vector_client, get_vector_store, initialize_vector_store, point_id)
+
+
+@pytest.fixture(params=["memory", "numpy"])
+def store(request, embeddings):
+    store = QdrantVectorStore(host="", api_key="", embeddings=embeddings, batch_size=4, backend=request.param)
+    yield store
+    store.client.close()
+
+
+def _count(store):
+    return store.client.count(store.collection_name).count
+
+
+def test_add_texts_embeds_in_batches(store, embeddings):
+    texts = [f"text number {i}" for i in range(10)]
+    message = store.add_texts(texts)
+    assert message.startswith("Successfully added 10 new memories")
+    assert "texts/sec" in message
+    assert [len(batch) for batch in embeddings.document_calls] == [4, 4, 2]
+    assert _count(store) == 10
+
+
+def test_upserts_overlap_with_embedding(store, embeddings, monkeypatch):
+    upsert_started = threading.Event()
+    release_upsert = threading.Event()
+    upsert = store.client.upsert
+
+    def slow_upsert(*args, **kwargs):
+        upsert_started.set()
+        release_upsert.wait(5)
+        return upsert(*args, **kwargs)
+
+    embed_documents = embeddings.embed_documents
+
+    def embed_while_uploading(texts):
+        if embeddings.document_calls:
+            # the first batch is still being upserted while this one is embedded
+            assert upsert_started.wait(5)
+            assert not release_upsert.is_set()
+            release_upsert.set()
+        return embed_documents(texts)
+
+    monkeypatch.setattr(store.client, "upsert", slow_upsert)
+    monkeypatch.setattr(embeddings, "embed_documents", embed_while_uploading)
+    assert store.add_texts([f"t{i}" for i in range(8)]).startswith("Successfully added 8")
+    assert _count(store) == 8
+
+
+def test_add_texts_reports_errors(store, monkeypatch):
+    def broken_upsert(*args, **kwargs):
+        raise ConnectionError("qdrant is down")
+
+    monkeypatch.setattr(store.client, "upsert", broken_upsert)
+    assert store.add_texts(["a", "b"]) == "Error occurred while adding texts: qdrant is down"
+    assert store.add_texts([]) == "No texts provided"
+
+
+def test_embedding_cache_skips_known_texts(tmp_path, embeddings):
+    path = str(tmp_path / "embeddings.db")
+    cached = CachedEmbeddings(embeddings, path, model_name="fake")
+    first = cached.embed_documents(["alpha", "beta", "alpha"])
+    assert embeddings.document_calls == [["alpha", "beta"]]
+    assert first[0] == first[2]
+
+    # a new instance reads the same vectors back from disk
+    reopened = CachedEmbeddings(embeddings, path, model_name="fake")
+    again = reopened.embed_documents(["beta", "gamma", "alpha"])
+    assert embeddings.document_calls[-1] == ["gamma"]
+    assert again[0] == first[1] and again[2] == first[0]
+    assert isinstance(again[0][0], float)
+    assert reopened.stats() == {"entries": 3, "hits": 2, "misses": 1}
+
+
+def test_embedding_cache_counts_concurrent_lookups(tmp_path, embeddings):
+    cached = CachedEmbeddings(embeddings, str(tmp_path / "embeddings.db"), model_name="fake")
+    cached.embed_documents(["alpha", "beta"])
+
+    def lookup():
+        for _ in range(200):
+            cached.embed_documents(["alpha", "beta"])
+    threads = [threading.Thread(target=lookup) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cached.stats() == {"entries": 2, "hits": 8 * 200 * 2, "misses": 2}
+
+
+def test_embedding_cache_is_per_model_and_kind(tmp_path, embeddings):
+    path = str(tmp_path / "embeddings.db")
+    CachedEmbeddings(embeddings, path, model_name="a").embed_documents(["text"])
+    CachedEmbeddings(embeddings, path, model_name="b").embed_documents(["text"])
+    assert len(embeddings.document_calls) == 2
+
+    cached = CachedEmbeddings(embeddings, path, model_name="a")
+    vector = cached.embed_query("text")
+    assert cached.embed_query("text") == vector
+    assert embeddings.query_calls == ["text"]
+
+
+def test_vector_store_uses_embedding_cache(tmp_path, embeddings):
+    store = QdrantVectorStore(host="", api_key="", embeddings=embeddings, embedding_cache_path=str(tmp_path / "e.db"), backend="memory")
+    assert isinstance(store.embeddings, CachedEmbeddings)
+    store.add_texts(["one", "two"])
+    store.add_texts(["one", "two"])
+    assert embeddings.document_calls == [["one", "two"]]
+    store.client.close()
+
+
+def test_search_update_and_delete(store):
+    store.add_texts(["apple pie recipe", "zebra crossing", "apple tart"])
+    result = store.similarity_search("apple", k=2)
+    lines = result.splitlines()
+    assert len(lines) == 2
+    assert all("apple" in line for line in lines)
+
+    old_id = lines[0].split(",")[0].removeprefix("ID: ")
+    new_id = point_id("zebra stripes", "memory")
+    assert store.update_text(old_id, "zebra stripes") == f"Point {old_id} updated successfully, new ID: {new_id}"
+    assert _count(store) == 3
+    assert store.client.retrieve(store.collection_name, ids=[old_id]) == []
+    assert "zebra stripes" in store.similarity_search("zebra stripes", k=1)
+
+    assert store.delete_text(new_id) == f"Point {new_id} deleted successfully"
+    assert _count(store) == 2
+    assert "zebra stripes" not in store.similarity_search("zebra stripes", k=3)
+
+
+@pytest.mark.parametrize("backend", ["local", "numpy"])
+def test_embedded_backends_persist_to_disk(tmp_path, embeddings, backend):
+    path = str(tmp_path / "vectors")
+    store = QdrantVectorStore(host="", api_key="", embeddings=embeddings, backend=backend, path=path)
+    store.add_texts(["persisted memory", "another one"])
+    store.client.close()
+
+    client = create_vector_client(backend=backend, path=path)
+    try:
+        assert client.count(store.collection_name).count == 2
+        hits = client.query_points(store.collection_name, query=embeddings.embed_query("persisted memory"), limit=1).points
+        assert hits[0].payload["text"] == "persisted memory"
+    finally:
+        client.close()
+
+
+def test_numpy_backend_ranks_like_cosine_search():
+    from qdrant_client.models import Distance, PointStruct, VectorParams
+
+    client = NumpyVectorClient()
+    client.create_collection("c", vectors_config=VectorParams(size=2, distance=Distance.COSINE))
+    client.upsert("c", points=[PointStruct(id=i, vector=vector) for i, vector in enumerate([[1, 0], [0, 1], [1, 1], [10, 1]])])
+    hits = client.query_points("c", query=[1, 0], limit=3).points
+    assert [hit.id for hit in hits] == [0, 3, 2]
+    assert hits[0].score == pytest.approx(1.0)
+
+    client.delete("c", points_selector=[3, 0])
+    assert [hit.id for hit in client.query_points("c", query=[1, 0], limit=3).points] == [2, 1]
+    assert client.count("c").count == 2
+
+
+def test_similarity_search_filters_on_payload_fields(store):
+    store.add_texts(["apple pie", "apple tart"], kind="memory")
+    store.add_texts(["apple crumble"], kind="code", file_path="src/fruit.py")
+    store.add_texts(["apple juice"], kind="chat", thread_id="t1")
+
+    assert "apple crumble" in store.similarity_search("apple", k=5, kind="code")
+    assert len(store.similarity_search("apple", k=5, kind="memory").splitlines()) == 2
+    assert "apple juice" in store.similarity_search("apple", k=5, thread_id="t1")
+    assert store.similarity_search("apple", k=5, file_path="missing.py") == "No similar texts found"
+
+    crumble_id = store.similarity_search("apple crumble", k=1, kind="code").split(",")[0].removeprefix("ID: ")
+    store.update_text(crumble_id, "apple strudel")
+    assert "apple strudel" in store.similarity_search("apple", k=5, kind="code", file_path="src/fruit.py")
+
+
+def test_reindex_after_update_keeps_the_updated_text(store):
+    store.reindex(["def a(): pass", "def b(): pass"], file_path="src/m.py")
+    old_id = point_id("def b(): pass", "src/m.py")
+    assert store.update_text(old_id, "def c(): pass").endswith(f"new ID: {point_id('def c(): pass', 'src/m.py')}")
+
+    # the file now holds the updated text, nothing is added or deleted
+    result = store.reindex(["def a(): pass", "def c(): pass"], file_path="src/m.py")
+    assert result == "Re-indexed src/m.py: 0 added, 0 deleted, 2 unchanged"
+    hits = store.similarity_search("def", k=5, file_path="src/m.py")
+    assert "def c(): pass" in hits and "def b(): pass" not in hits
+    assert _count(store) == 2
+
+
+def test_numpy_payload_indexes_follow_writes():
+    from qdrant_client.models import Distance, PointStruct, VectorParams
+
+    client = NumpyVectorClient()
+    client.create_collection("c", vectors_config=VectorParams(size=2, distance=Distance.COSINE))
+    client.upsert("c", points=[PointStruct(id=i, vector=[1, i], payload={"kind": "a" if i % 2 else "b", "timestamp": float(i)}) for i in range(10)])
+    client.create_payload_index("c", "kind", "keyword")
+    client.create_payload_index("c", "timestamp", "float")
+    client.upsert("c", points=[PointStruct(id=10, vector=[1, 10], payload={"kind": "a", "timestamp": 10.0})])
+    client.delete("c", points_selector=[1])
+    client.upsert("c", points=[PointStruct(id=3, vector=[1, 3], payload={"kind": "b", "timestamp": 3.0})])
+
+    kind_a = build_filter(kind="a")
+    assert sorted(hit.id for hit in client.query_points("c", query=[1, 0], query_filter=kind_a, limit=20).points) == [5, 7, 9, 10]
+    recent = build_filter(kind="a", since=6, until=9.5)
+    assert sorted(hit.id for hit in client.query_points("c", query=[1, 0], query_filter=recent, limit=20).points) == [7, 9]
+    assert client.count("c", count_filter=build_filter(since=8)).count == 3
+
+    # indexed and scanned fields give the same answer
+    client.upsert("c", points=[PointStruct(id=11, vector=[1, 1], payload={"kind": "a", "timestamp": 11.0, "tag": "x"})])
+    assert client.count("c", count_filter=build_filter(kind="a")).count == 5
+    client.delete("c", points_selector=build_filter(kind="a"))
+    assert client.count("c").count == 6
+
+
+def test_adding_the_same_text_twice_keeps_one_point(store, embeddings):
+    assert store.add_texts(["remember this", "and this", "remember this"]).startswith("Successfully added 2 new memories")
+    message = store.add_texts(["remember this", "something new"])
+    assert message.startswith("Successfully added 1 new memories") and message.endswith("1 already stored")
+    assert embeddings.document_calls[-1] == ["something new"]
+    assert _count(store) == 3
+    # the same text from another source is a different point
+    store.add_texts(["remember this"], kind="code", file_path="notes.md")
+    assert _count(store) == 4
+    assert point_id("remember this", "notes.md") != point_id("remember this", "memory")
+    assert point_id("remember this", "notes.md") == point_id("remember this", "notes.md")
+
+
+def test_reindex_only_touches_changed_chunks(store, embeddings, monkeypatch):
+    assert store.reindex(["def a(): pass", "def b(): pass", "def c(): pass"], file_path="src/m.py") == "Re-indexed src/m.py: 3 added, 0 deleted, 0 unchanged"
+    store.add_texts(["def a(): pass"], kind="code", file_path="src/other.py")
+    deletes = []
+    delete = store.client.delete
+    monkeypatch.setattr(store.client, "delete", lambda *args, **kwargs: deletes.append(kwargs) or delete(*args, **kwargs))
+
+    embeddings.document_calls.clear()
+    message = store.reindex(["def a(): pass", "def c(): return 1", "def d(): pass"], file_path="src/m.py")
+    assert message == "Re-indexed src/m.py: 2 added, 2 deleted, 1 unchanged"
+    assert embeddings.document_calls == [["def c(): return 1", "def d(): pass"]]
+    assert len(deletes) == 1 and len(deletes[0]["points_selector"].points) == 2
+    assert _count(store) == 4
+    assert "def b" not in store.similarity_search("def b(): pass", k=5, file_path="src/m.py")
+    # other sources are left alone
+    assert "def a(): pass" in store.similarity_search("def a(): pass", k=1, file_path="src/other.py")
+
+    assert store.reindex([], file_path="src/m.py") == "Re-indexed src/m.py: 0 added, 3 deleted, 0 unchanged"
+    assert store.reindex(["x"]) == "A file_path or thread_id is needed to re-index"
+
+
+def test_numpy_scroll_pages_through_filtered_points():
+    from qdrant_client.models import Distance, PointStruct, VectorParams
+
+    client = NumpyVectorClient()
+    client.create_collection("c", vectors_config=VectorParams(size=2, distance=Distance.COSINE))
+    client.upsert("c", points=[PointStruct(id=i, vector=[1, i], payload={"even": i % 2 == 0}) for i in range(25)])
+    seen, offset = [], None
+    while True:
+        records, offset = client.scroll("c", scroll_filter=Filter(must=[FieldCondition(key="even", match=MatchValue(value=True))]), limit=5, offset=offset)
+        seen.extend(record.id for record in records)
+        if offset is None:
+            break
+    assert seen == list(range(0, 25, 2))
+
+
+def test_query_cache_serves_repeats_until_a_write(store, embeddings, monkeypatch):
+    store.add_texts(["apple pie", "zebra crossing"])
+    queries = []
+    query_points = store.client.query_points
+    monkeypatch.setattr(store.client, "query_points", lambda *args, **kwargs: queries.append(1) or query_points(*args, **kwargs))
+
+    first = store.similarity_search("apple  pie", k=1)
+    assert store.similarity_search(" apple pie ", k=1) == first
+    assert len(queries) == 1 and embeddings.query_calls == ["apple  pie"]
+    # k and filters are part of the key
+    store.similarity_search("apple pie", k=2)
+    store.similarity_search("apple pie", k=1, kind="code")
+    assert len(queries) == 3 and len(embeddings.query_calls) == 1
+
+    store.add_texts(["apple pie recipe"])
+    store.similarity_search("apple pie", k=2)
+    assert len(queries) == 4
+    point = first.split(",")[0].removeprefix("ID: ")
+    store.delete_text(point)
+    assert point not in store.similarity_search("apple pie", k=1)
+
+    stats = store.cache_stats()["query"]
+    assert stats["hits"] == 1 and stats["misses"] == 5
+    assert stats["hit_rate"] == pytest.approx(1 / 6)
+    assert stats["embedding_hits"] == 4 and stats["embedding_misses"] == 1
+
+
+def test_query_cache_drops_hits_of_a_search_that_raced_a_write():
+    from src.agent_project.infrastructure.databases.query_cache import \
+        QueryCache
+
+    cache = QueryCache(max_entries=2)
+    key = cache.key("c", "query", 2)
+    generation = cache.generation("c")
+    cache.invalidate("c")
+    cache.put(key, [], generation)
+    assert cache.get(key) is None
+    cache.put(key, [], cache.generation("c"))
+    assert cache.get(key) == []
+    cache.invalidate("other")
+    assert cache.get(key) == []
+    for text in ("a", "b"):
+        cache.put(cache.key("c", text, 2), [])
+    assert cache.get(key) is None
+    assert QueryCache(max_entries=0).get(key) is None
+
+
+def test_collection_options_map_to_qdrant_config():
+    options = collection_options(8, quantization="int8", on_disk=True, hnsw_m=8, hnsw_ef_construct=64)
+    assert options["vectors_config"].on_disk
+    assert options["vectors_config"].hnsw_config.m == 8
+    assert options["quantization_config"].scalar.type.value == "int8"
+    plain = collection_options(8)
+    assert plain["quantization_config"] is None and plain["vectors_config"].hnsw_config is None
+    with pytest.raises(ValueError):
+        collection_options(8, quantization="binary")
+
+
+def test_numpy_backend_ignores_storage_options():
+    from qdrant_client.models import PointStruct
+
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(200, 32)).astype(np.float32)
+    client = NumpyVectorClient()
+    client.create_collection("q", **collection_options(32, quantization="int8", on_disk=True, hnsw_m=8))
+    client.create_collection("f", **collection_options(32))
+    for name in ("q", "f"):
+        client.upsert(name, points=[PointStruct(id=i, vector=vector.tolist()) for i, vector in enumerate(vectors)])
+
+    # both collections are scanned exactly
+    query = rng.normal(size=32).tolist()
+    assert client.query_points("q", query=query, limit=10).points == client.query_points("f", query=query, limit=10).points
+
+
+def test_numpy_writes_are_saved_on_flush_not_per_batch(tmp_path, monkeypatch):
+    from qdrant_client.models import Distance, PointStruct, VectorParams
+
+    path = str(tmp_path / "vectors")
+    client = NumpyVectorClient(path=path)
+    saves = []
+    save = client._save
+    monkeypatch.setattr(client, "_save", lambda name: (saves.append(name), save(name)))
+    client.create_collection("c", vectors_config=VectorParams(size=2, distance=Distance.DOT))
+    for i in range(50):
+        client.upsert("c", points=[PointStruct(id=i, vector=[1.0, float(i)], payload={"i": i})])
+    client.delete("c", points_selector=[0])
+    assert saves == [] and not os.path.exists(os.path.join(path, "c.json"))
+
+    client.flush()
+    client.flush()
+    assert saves == ["c"]
+    assert NumpyVectorClient(path=path).count("c").count == 49
+
+    client.upsert("c", points=[PointStruct(id=100, vector=[0.0, 1.0])])
+    client.close()
+    reopened = NumpyVectorClient(path=path)
+    assert reopened.count("c").count == 50
+    assert reopened.retrieve("c", [49])[0].payload == {"i": 49}
+
+
+def test_numpy_store_writes_survive_without_close(tmp_path, embeddings):
+    path = str(tmp_path / "vectors")
+    store = QdrantVectorStore(host="", api_key="", embeddings=embeddings, backend="numpy", path=path, batch_size=2)
+    saves = []
+    save = store.client._save
+    store.client._save = lambda name: (saves.append(name), save(name))
+
+    assert store.add_texts(["one", "two", "three", "four", "five"]).startswith("Successfully added 5")
+    # one save for the call, not one per batch
+    assert saves == [store.collection_name]
+    store.update_text(point_id("two", "memory"), "deux")
+    store.delete_text(point_id("three", "memory"))
+    store.reindex(["def a(): pass"], file_path="a.py")
+
+    # a new client on the path, as after a crash, sees every reported write
+    reopened = NumpyVectorClient(path=path)
+    texts = {record.payload["text"] for record in reopened.scroll(store.collection_name, limit=10)[0]}
+    assert texts == {"one", "deux", "four", "five", "def a(): pass"}
+    store.client.close()
+
+
+@pytest.mark.parametrize("backend", ["local", "numpy"])
+def test_manager_serves_collections_over_one_client(tmp_path, embeddings, backend):
+    manager = VectorStoreManager(host="", api_key="", embeddings=embeddings, backend=backend, path=str(tmp_path / "vectors"), default_collection="memories")
+    memories = manager.get()
+    code = manager.get("code", hybrid=True)
+    assert manager.get("memories") is memories and manager.get("code") is code
+    assert manager.collections() == ["memories", "code"]
+
+    memories.add_texts(["shared client"])
+    code.add_texts(["def shared_client(): pass"], kind="code", file_path="a.py")
+    # embedded Qdrant locks its folder, a second client would fail here
+    assert memories.client is code.client
+    assert memories.client.count("memories").count == 1 and code.client.count("code").count == 1
+    assert "def shared_client" not in memories.similarity_search("shared client", k=5)
+    assert code.hybrid and not memories.hybrid
+    manager.close()
+
+
+def test_module_level_store_is_the_default_collection(monkeypatch, embeddings):
+    monkeypatch.setattr(vector_database, "_manager", None)
+    with pytest.raises(RuntimeError):
+        get_vector_store()
+    store = initialize_vector_store(host="", api_key="", embeddings=embeddings, backend="memory", collection_name="app")
+    assert get_vector_store() is store and store.collection_name == "app"
+    assert get_vector_store("other").collection_name == "other"
+    assert get_vector_store("other").client is store.client
+    vector_database.get_vector_store_manager().close()
+
+
+def test_store_is_lazy_until_first_use(embeddings):
+    loads = []
+
+    def factory():
+        loads.append(1)
+        return embeddings
+
+    lazy = LazyEmbeddings(factory, model_name="fake")
+    store = QdrantVectorStore(host="", api_key="", embeddings=lazy, backend="numpy", collection_name="lazy")
+    assert store._client is None and not lazy.loaded
+
+    # nothing stored yet, so the model is not needed to answer
+    assert store.similarity_search("anything") == "No similar texts found"
+    assert not lazy.loaded and not store.client.collection_exists("lazy")
+
+    # the collection is sized from the first embedded batch
+    store.add_texts(["first text"])
+    assert loads == [1]
+    assert store.client.count("lazy").count == 1
+    assert embeddings.query_calls == []
+
+
+def test_warm_up_loads_model_and_creates_collection(embeddings):
+    lazy = LazyEmbeddings(lambda: embeddings, model_name="fake", dimension=26)
+    store = QdrantVectorStore(host="", api_key="", embeddings=lazy, backend="numpy")
+    store.warm_up().join(5)
+    assert lazy.loaded
+    assert store.client.collection_exists(store.collection_name)
+    assert embeddings.document_calls == [] and embeddings.query_calls == []
+
+
+def test_embedding_dimension_comes_from_metadata(tmp_path, embeddings):
+    FakeEmbeddings = type(embeddings)
+
+    class NamedEmbeddings(FakeEmbeddings):
+        model_name = "sentence-transformers/all-mpnet-base-v2"
+
+    class SizedEmbeddings(FakeEmbeddings):
+        dimensions = 256
+
+    assert embedding_dimension(NamedEmbeddings()) == 768
+    assert embedding_dimension(SizedEmbeddings()) == 256
+    assert embedding_dimension(CachedEmbeddings(NamedEmbeddings(), str(tmp_path / "e.db"))) == 768
+    assert embedding_dimension(LazyEmbeddings(FakeEmbeddings, model_name="text-embedding-3-small")) == 1536
+
+
+def test_tokenize_splits_identifiers():
+    assert tokenize("parseHTTPResponse(load_user)") == [
+        "parsehttpresponse", "parse", "http", "response", "load_user", "load", "user",
+    ]
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "b", "d"]], k=1)
+    assert list(fused) == ["c", "b", "a", "d"]
+    assert fused["c"] == pytest.approx(1 / 4 + 1 / 2)
+
+
+@pytest.mark.parametrize("backend", ["memory", "numpy"])
+def test_hybrid_search_finds_exact_identifiers(embeddings, backend):
+    store = QdrantVectorStore(host="", api_key="", embeddings=embeddings, backend=backend, hybrid=True)
+    # bag-of-letters vectors cannot tell these apart, BM25 can
+    texts = [f"def {name}(): pass" for name in ("load_config", "config_load", "load_cnofig", "dolan_config")]
+    store.add_texts(texts)
+    hits = store._search("config_load", 2)
+    assert hits[0].payload["text"] == "def config_load(): pass"
+    assert "config_load" in store.similarity_search("config_load", k=1)
+
+    store.update_text(hits[0].id, "def renamed_function(): pass")
+    assert store._search("renamed_function", 1)[0].id == point_id("def renamed_function(): pass", "memory")
+    store.client.close()